@@ -0,0 +1,171 @@
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from engine_pool import ENGINE_WORKERS, get_engine_pool
+
+logger = logging.getLogger(__name__)
+
+# Потоков для ходов ИИ в фоне; запросы HTTP их не ждут. 0 - по умолчанию: 2 без пула
+# движка, с пулом - вдвое больше его емкости (потоки только ждут процессы, а лишние
+# ходы должны дойти до пула и получить его ответ на переполнение)
+AI_JOB_THREADS = int(os.environ.get('GOMOKU_AI_JOB_THREADS', 0))
+# Сколько последних заданий помнится для опроса
+JOB_HISTORY = 1024
+# Наибольшее ожидание при long-poll: меньше timeout gunicorn (30 с)
+LONG_POLL_MAX = 25.0
+
+# Состояния задания
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+CANCELLED = 'cancelled'
+FAILED = 'failed'
+
+
+class AIJob:
+    """Ход ИИ, который считается в фоне; результат забирается опросом"""
+
+    def __init__(self, game_id):
+        self.job_id = secrets.token_hex(8)
+        self.game_id = game_id
+        self.status = PENDING
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        # Когда задание закончилось (time.monotonic())
+        self.finished_at = None
+        self.stop_event = threading.Event()
+        self._finished = threading.Event()
+
+    @property
+    def finished(self):
+        return self._finished.is_set()
+
+    def wait(self, timeout):
+        """Дождаться окончания не дольше timeout секунд; True, если задание закончено"""
+        return self._finished.wait(timeout)
+
+    def finish(self, status, result=None, error=None):
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished_at = time.monotonic()
+        self._finished.set()
+
+    def to_dict(self):
+        data = {'job_id': self.job_id, 'status': self.status}
+        if self.result:
+            data.update(self.result)
+        if self.error:
+            data['error'] = self.error
+        return data
+
+
+class AIJobManager:
+    """Задания ходов ИИ в пуле потоков
+
+    У партии одновременно не больше одного задания: новое задание отменяет
+    прежнее (его stop_event останавливает поиск, а результат не применяется).
+    """
+
+    def __init__(self, threads=2, history=JOB_HISTORY):
+        self.history = history
+        self.submitted = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+        self._executor = ThreadPoolExecutor(threads, thread_name_prefix='ai-job')
+        self._jobs = OrderedDict()
+        self._by_game = {}
+        self._lock = threading.Lock()
+
+    def submit(self, game_id, function):
+        """Запустить function(stop_event) для партии game_id
+
+        function возвращает результат хода (dict) или None, если ход уже не нужен.
+        """
+        job = AIJob(game_id)
+        with self._lock:
+            self._cancel_game(game_id)
+            self._jobs[job.job_id] = job
+            self._by_game[game_id] = job
+            self.submitted += 1
+            while len(self._jobs) > self.history:
+                _, old = self._jobs.popitem(last=False)
+                old.stop_event.set()
+                if self._by_game.get(old.game_id) is old:
+                    del self._by_game[old.game_id]
+        self._executor.submit(self._run, job, function)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Отменить задание; False, если его нет или оно уже закончено"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            job.stop_event.set()
+            return True
+
+    def cancel_game(self, game_id):
+        """Отменить текущее задание партии (новая партия, ход вне очереди)"""
+        with self._lock:
+            self._cancel_game(game_id)
+
+    def _cancel_game(self, game_id):
+        job = self._by_game.pop(game_id, None)
+        if job is not None and not job.finished:
+            job.stop_event.set()
+
+    def _run(self, job, function):
+        if job.stop_event.is_set():
+            self._finish(job, CANCELLED)
+            return
+        job.status = RUNNING
+        try:
+            result = function(job.stop_event)
+        except Exception as e:
+            logger.error(f"❌ Ошибка задания ИИ {job.job_id}: {e}")
+            self._finish(job, FAILED, error=str(e))
+            return
+        self._finish(job, DONE if result is not None else CANCELLED, result)
+
+    def _finish(self, job, status, result=None, error=None):
+        with self._lock:
+            if status == DONE:
+                self.completed += 1
+            elif status == CANCELLED:
+                self.cancelled += 1
+            else:
+                self.failed += 1
+            if self._by_game.get(job.game_id) is job:
+                del self._by_game[job.game_id]
+        job.finish(status, result, error)
+        logger.info(f"🧾 Задание ИИ {job.job_id}: {status} за {time.time() - job.created:.2f}с")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'cancelled': self.cancelled,
+                'failed': self.failed,
+                'active': len(self._by_game),
+            }
+
+
+@lru_cache(maxsize=None)
+def get_job_manager():
+    """Общий для процесса пул заданий ИИ"""
+    threads = AI_JOB_THREADS or (2 * get_engine_pool().capacity if ENGINE_WORKERS else 2)
+    return AIJobManager(threads)
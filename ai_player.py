@@ -1,12 +1,94 @@
 import random
-import time
 import logging
+import os
 from typing import List, Tuple, Dict, Optional, Set
 
+from line_tables import LINE_TABLES, get_line_tables
+from numpy_eval import NUMPY_AVAILABLE, scan_for
+from opening_book import get_opening_book
+from move_ordering import HistoryTable, MoveOrdering, get_game_history
+from parallel_search import SEARCH_WORKERS, ParallelSearch
+from search import SearchEngine
+from threat_search import VCF_DEPTH, VCT_DEPTH, WIN, ThreatSpaceSearch
+from time_manager import TimeManager
+from transposition import get_transposition_table
+from patterns import (FEATURE_BITS, FEATURE_MASK, FIVE, FOUR, LINE_THREATS, OPEN_FOUR, OPEN_THREE,
+                      OPEN_THREE_THROUGH, RUN_FOUR, RUN_THREE, THREAT)
+
 logger = logging.getLogger(__name__)
 
+# Источник оценок окон: 'python' - инкрементальная оценка GameLogic, 'numpy' - пакетный
+# просмотр всей доски (numpy_eval.py, нужен установленный NumPy)
+EVAL_BACKEND = os.environ.get('GOMOKU_EVAL_BACKEND', 'python')
+
+# Число критических уровней, проверяемых по записям угроз (победа ... двойная тройка)
+CRITICAL_TIER_COUNT = 8
+
+# Доля мягкого бюджета хода на поиск угроз (VCF/VCT): остальное остается alpha-beta
+THREAT_SHARE = 0.25
+
+# Версия выбора хода: увеличивать при изменениях, после которых ходы из кэша
+# результатов (result_cache.py) больше не годятся
+ENGINE_VERSION = 3
+
+class ThreatRecord:
+    """Угрозы, которые создает ход игрока в клетку (считаются один раз за get_move)
+
+    Хранит сумму упакованных признаков по четырем направлениям (таблица
+    threat_features в patterns.py); поля раскрываются только при обращении.
+    """
+    
+    __slots__ = ('features',)
+    
+    def __init__(self, features):
+        self.features = features
+    
+    def _count(self, field):
+        return (self.features >> (field * FEATURE_BITS)) & FEATURE_MASK
+    
+    @property
+    def five(self):
+        """Ход собирает пятерку"""
+        return self._count(FIVE) > 0
+    
+    @property
+    def open_four(self):
+        """Ход создает открытую четверку"""
+        return self._count(OPEN_FOUR) > 0
+    
+    @property
+    def fours(self):
+        """Число направлений с четверкой"""
+        return self._count(FOUR)
+    
+    @property
+    def four_three(self):
+        """Комбинация 4+3: ряд ровно из 4 и ряд ровно из 3 в разных направлениях"""
+        return self._count(RUN_FOUR) > 0 and self._count(RUN_THREE) > 0
+    
+    @property
+    def open_threes(self):
+        """Число открытых троек"""
+        return self._count(OPEN_THREE)
+    
+    @property
+    def threats(self):
+        """Число троек любого вида (линии 7 клеток)"""
+        return self._count(THREAT)
+    
+    @property
+    def line_threats(self):
+        """Число угроз в линиях 9 клеток (старшее поле)"""
+        return self.features >> (LINE_THREATS * FEATURE_BITS)
+    
+    @property
+    def open_three_through(self):
+        """Открытая тройка игрока проходит через эту клетку (ход соперника ее закрывает)"""
+        return self._count(OPEN_THREE_THROUGH) > 0
+
 class AIPlayer:
-    def __init__(self, symbol, max_depth=6):
+    def __init__(self, symbol, max_depth=6, backend=None, transposition_table=None, game_id=None,
+                 workers=None, stop_event=None, time_used=0.0, opening_book=None):
         self.symbol = symbol
         self.opponent_symbol = 'X' if symbol == 'O' else 'O'
         self.max_depth = max_depth
@@ -40,19 +122,50 @@ class AIPlayer:
         
         # Направления для анализа линий
         self.directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
-        
-        # Стратегические позиции для первых ходов
-        self.opening_book = {
-            # Центральные дебюты
-            (7, 7): [(6, 6), (6, 7), (6, 8), (7, 6), (7, 8), (8, 6), (8, 7), (8, 8)],
-            # Диагональные дебюты
-            (6, 6): [(7, 7), (5, 5), (8, 8), (7, 6), (6, 7)],
-            (8, 8): [(7, 7), (9, 9), (6, 6), (7, 8), (8, 7)],
-        }
-        
-    def get_move(self, game) -> Optional[Tuple[int, int]]:
-        """Получить лучший ход для ИИ используя выигрышную стратегию"""
-        start_time = time.time()
+        # Таблицы окон линий: по ним читаются все линии вокруг хода
+        self.tables = LINE_TABLES
+        
+        # Источник оценок окон паттернов
+        self.backend = backend or EVAL_BACKEND
+        if self.backend == 'numpy' and not NUMPY_AVAILABLE:
+            logger.warning("⚠️ NumPy не установлен, используется оценка на Python")
+            self.backend = 'python'
+        self._board_scan = None
+        # Результат последнего поиска (глубина, узлы, узлы/с) для логов и бенчмарков
+        self.last_search = None
+        # Результаты поиска угроз (VCF/VCT) последнего хода
+        self.last_threat_searches = []
+        # Таблица транспозиций поиска; общая для процесса, чтобы переживать между ходами
+        self.transposition_table = transposition_table or get_transposition_table()
+        # Таблица истории порядка ходов: общая для всех ходов партии game_id
+        self.history = get_game_history(game_id) if game_id else HistoryTable()
+        # Процессов поиска: больше 1 - ходы корня делятся между процессами пула
+        self.workers = workers or SEARCH_WORKERS
+        # Остановка поиска из другого потока (обдумывание на ходу соперника)
+        self.stop_event = stop_event
+        # Время, уже потраченное ИИ в партии: из него TimeManager выводит бюджет хода
+        self.time_used = time_used
+        # Срок последнего хода (мягкий и жесткий) для логов и бенчмарков
+        self.last_deadline = None
+        # Дебютная книга (opening_book.py): общий для процесса файл, отображенный в память
+        self.opening_book = opening_book if opening_book is not None else get_opening_book()
+        
+    @property
+    def config_key(self) -> str:
+        """Настройки, от которых зависит выбор хода (ключ кэша результатов)"""
+        return f"v{ENGINE_VERSION}:d{self.max_depth}:t{self.max_time}:{self.backend}:w{self.workers}"
+        
+    def get_move(self, game, deadline=None) -> Optional[Tuple[int, int]]:
+        """Получить лучший ход для ИИ используя выигрышную стратегию
+
+        deadline (Deadline) - срок хода; по умолчанию его выдает TimeManager по
+        оставшемуся времени партии и остроте позиции. Все этапы укладываются в
+        жесткий срок и возвращают лучший ход, найденный к нему.
+        """
+        deadline = deadline or TimeManager(self.max_time).deadline(game, self.time_used)
+        self.last_deadline = deadline
+        if game.board_size != self.tables.board_size:
+            self.tables = get_line_tables(game.board_size)
         
         try:
             valid_moves = game.get_valid_moves()
@@ -63,40 +176,56 @@ class AIPlayer:
             logger.info(f"🤖 ИИ выбирает из {len(valid_moves)} возможных ходов")
             
             # Дебютная книга для первых ходов
-            opening_move = self._get_opening_move(game, valid_moves)
+            opening_move = self._get_opening_move(game)
             if opening_move:
                 logger.info(f"📚 Дебютный ход: {opening_move}")
                 return opening_move
             
+            # Угрозы всех кандидатов для обоих игроков - один проход по доске
+            threats = self._classify_threats(game, valid_moves)
+            
             # ПРИОРИТЕТ 1: Критические ходы (победа/защита)
-            critical_move = self._find_critical_move(game, valid_moves)
+            critical_move = self._find_critical_move(game, threats)
             if critical_move:
                 logger.info(f"🎯 Найден критический ход: {critical_move}")
                 return critical_move
             
-            # ПРИОРИТЕТ 2: Агрессивные выигрышные комбинации
-            aggressive_move = self._find_aggressive_move(game, valid_moves)
+            # ПРИОРИТЕТ 2: Форсированная победа или защита по пространству угроз (VCF/VCT)
+            if self.max_depth > 1:
+                threat_move = self._find_threat_space_move(game, deadline.portion(THREAT_SHARE))
+                if threat_move:
+                    logger.info(f"⚔️ Ход по поиску угроз: {threat_move}")
+                    return threat_move
+            
+            # ПРИОРИТЕТ 3: Поиск alpha-beta на max_depth полуходов (глубина 1 - эвристики ниже)
+            if self.max_depth > 1:
+                search_move = self._find_search_move(game, valid_moves, deadline)
+                if search_move:
+                    logger.info(f"🔍 Ход по результату поиска: {search_move}")
+                    return search_move
+            
+            # ПРИОРИТЕТ 4: Агрессивные выигрышные комбинации
+            aggressive_move = self._find_aggressive_move(game, threats, deadline)
             if aggressive_move:
                 logger.info(f"⚔️ Агрессивный ход: {aggressive_move}")
                 return aggressive_move
             
-            # ПРИОРИТЕТ 3: Поиск форсированных выигрышных комбинаций
-            winning_move = self._find_winning_sequence(game, valid_moves)
+            # ПРИОРИТЕТ 5: Поиск форсированных выигрышных комбинаций
+            winning_move = self._find_winning_sequence(game, threats)
             if winning_move:
                 logger.info(f"🏆 Найдена выигрышная комбинация: {winning_move}")
                 return winning_move
             
-            # ПРИОРИТЕТ 4: Защита от медленных угроз (понижен приоритет)
-            slow_threat_defense = self._find_slow_threat_defense(game, valid_moves)
+            # ПРИОРИТЕТ 6: Защита от медленных угроз (понижен приоритет)
+            slow_threat_defense = self._find_slow_threat_defense(game, valid_moves, deadline)
             if slow_threat_defense:
                 logger.info(f"🛡️ Защита от медленной угрозы: {slow_threat_defense}")
                 return slow_threat_defense
             
             # Стратегический анализ позиции
-            best_move = self._find_strategic_move(game, valid_moves, start_time)
+            best_move = self._find_strategic_move(game, valid_moves, deadline)
             
-            elapsed_time = time.time() - start_time
-            logger.info(f"🤖 ИИ выбрал ход {best_move} за {elapsed_time:.2f}с")
+            logger.info(f"🤖 ИИ выбрал ход {best_move} за {deadline.elapsed():.2f}с ({deadline})")
             
             return best_move
             
@@ -104,293 +233,201 @@ class AIPlayer:
             logger.error(f"❌ Ошибка ИИ: {e}")
             return random.choice(valid_moves) if valid_moves else None
     
-    def _get_opening_move(self, game, valid_moves) -> Optional[Tuple[int, int]]:
-        """Дебютные ходы из книги"""
+    def _find_threat_space_move(self, game, deadline) -> Optional[Tuple[int, int]]:
+        """Первый ход своей форсированной победы или ход, ломающий VCF соперника"""
+        solver = ThreatSpaceSearch(stop_event=self.stop_event)
+        self.last_threat_searches = []
+        
+        for depth, threes in ((VCF_DEPTH, False), (VCT_DEPTH, True)):
+            result = self._solve_threats(solver, game, self.symbol, depth, deadline, threes)
+            if result.status == WIN:
+                return result.move
+        
+        # Соперник выиграл бы серией четверок, если бы ходил сейчас: ищем ход из его линии,
+        # после которого серии больше нет
+        threat = self._solve_threats(solver, game, self.opponent_symbol, VCF_DEPTH, deadline)
+        if threat.status != WIN:
+            return None
+        for row, col in dict.fromkeys(threat.line):
+            if game.get_cell(row, col) != '.':
+                continue
+            if deadline.expired():
+                break
+            with game.temporary_move(row, col, self.symbol):
+                result = self._solve_threats(solver, game, self.opponent_symbol, VCF_DEPTH, deadline)
+            if result.status != WIN:
+                logger.info(f"🛡️ Ход {(row, col)} ломает серию четверок соперника {threat.line}")
+                return (row, col)
+        return None
+    
+    def _solve_threats(self, solver, game, attacker, depth, deadline, threes=False):
+        """Один запуск поиска угроз; результат сохраняется в last_threat_searches"""
+        result = solver.solve(game, attacker, depth, threes, deadline)
+        self.last_threat_searches.append(result)
+        return result
+    
+    def _find_search_move(self, game, valid_moves, deadline) -> Optional[Tuple[int, int]]:
+        """Лучший ход итеративного углубления alpha-beta в пределах max_depth и срока хода"""
+        ordering = MoveOrdering(self.history)
+        if self.workers > 1:
+            engine = ParallelSearch(self.max_depth, self.max_time, self.workers,
+                                    table=self.transposition_table, ordering=ordering, stop_event=self.stop_event)
+        else:
+            engine = SearchEngine(self.max_depth, self.max_time, table=self.transposition_table,
+                                  ordering=ordering, stop_event=self.stop_event)
+        result = engine.search(game, valid_moves, deadline)
+        self.last_search = result
+        return result.move
+    
+    def _get_opening_move(self, game) -> Optional[Tuple[int, int]]:
+        """Ход из дебютной книги (позиция ищется с точностью до симметрий доски)"""
         if game.move_count == 0:
             # Первый ход - всегда центр
             center = game.board_size // 2
             return (center, center)
         
-        if game.move_count <= 4:
-            # Ищем последний ход соперника
-            last_opponent_move = self._find_last_opponent_move(game.board)
-            if last_opponent_move and last_opponent_move in self.opening_book:
-                candidates = [move for move in self.opening_book[last_opponent_move] 
-                            if move in valid_moves]
-                if candidates:
-                    return random.choice(candidates)
-        
+        move = self.opening_book.lookup(game)
+        if move and game.is_valid_move(*move):
+            return move
         return None
     
-    def _find_last_opponent_move(self, board) -> Optional[Tuple[int, int]]:
-        """Находит последний ход соперника"""
-        for row in range(len(board)):
-            for col in range(len(board[0])):
-                if board[row][col] == self.opponent_symbol:
-                    return (row, col)
-        return None
+    def _index(self, row, col) -> int:
+        """Номер клетки в плоском массиве GameLogic.cells"""
+        return self.tables.geometry.index(row, col)
     
-    def _find_winning_sequence(self, game, valid_moves) -> Optional[Tuple[int, int]]:
+    def _window_values(self, game, name, row, col, symbol) -> Tuple[int, ...]:
+        """Значения таблицы паттернов по четырем направлениям для хода symbol в (row, col)
+
+        Читаются из кэша инкрементальной оценки GameLogic, пробный ход не нужен.
+        """
+        return self._evaluation(game).window_values(name, symbol, self._index(row, col))
+    
+    def _evaluation(self, game):
+        """Источник оценок окон для текущей позиции game"""
+        if self.backend == 'numpy':
+            self._board_scan = scan_for(game, self._board_scan)
+            return self._board_scan
+        return game.evaluator
+    
+    def _classify_threats(self, game, valid_moves) -> List[Tuple[int, int, ThreatRecord, ThreatRecord]]:
+        """Угрозы каждого кандидата: (row, col, угрозы ИИ, угрозы соперника)
+
+        Все уровни выбора хода читают эти записи вместо повторных проб доски.
+        """
+        indices = [self._index(row, col) for row, col in valid_moves]
+        evaluation = self._evaluation(game)
+        own = evaluation.window_sums('threat_features', self.symbol, indices)
+        opponent = evaluation.window_sums('threat_features', self.opponent_symbol, indices)
+        return [(row, col, ThreatRecord(own_features), ThreatRecord(opponent_features))
+                for (row, col), own_features, opponent_features in zip(valid_moves, own, opponent)]
+    
+    def _find_winning_sequence(self, game, threats) -> Optional[Tuple[int, int]]:
         """Поиск форсированных выигрышных последовательностей"""
-        board = game.board
-        
         # Ищем ходы, создающие множественные угрозы
-        for row, col in valid_moves:
-            threats_count = self._count_threats_after_move(board, row, col, self.symbol)
-            
+        for row, col, own, _ in threats:
             # Если создаем 2+ угрозы одновременно - это выигрышная комбинация
-            if threats_count >= 2:
+            if own.line_threats >= 2:
                 return (row, col)
             
             # Проверяем комбинацию 4+3 (четверка + тройка)
-            if self._creates_four_three_combo(board, row, col, self.symbol):
+            if own.four_three:
                 return (row, col)
         
         return None
     
-    def _count_threats_after_move(self, board, row, col, symbol) -> int:
-        """Подсчитывает количество угроз после хода"""
-        board[row][col] = symbol
-        threats = 0
-        
-        # Проверяем все направления от данной позиции
-        for dr, dc in self.directions:
-            # Анализируем линию в обе стороны
-            line_threats = self._analyze_line_threats(board, row, col, dr, dc, symbol)
-            threats += line_threats
-        
-        board[row][col] = '.'
-        return threats
-    
-    def _analyze_line_threats(self, board, row, col, dr, dc, symbol) -> int:
-        """Анализирует угрозы в конкретном направлении"""
-        threats = 0
-        
-        # Собираем линию длиной 9 (4 в каждую сторону + центр)
-        line = []
-        for i in range(-4, 5):
-            r, c = row + i * dr, col + i * dc
-            if 0 <= r < len(board) and 0 <= c < len(board[0]):
-                line.append(board[r][c])
-            else:
-                line.append('#')  # Граница доски
-        
-        # Ищем паттерны угроз
-        line_str = ''.join(line)
-        
-        # Открытая четверка: .XXXX.
-        if f'.{symbol * 4}.' in line_str:
-            threats += 2  # Открытая четверка = 2 угрозы
-        
-        # Четверка с одной стороны: XXXX.
-        elif f'{symbol * 4}.' in line_str or f'.{symbol * 4}' in line_str:
-            threats += 1
-        
-        # Открытая тройка: .XXX.
-        elif f'.{symbol * 3}.' in line_str:
-            threats += 1
-        
-        return threats
-    
-    def _creates_four_three_combo(self, board, row, col, symbol) -> bool:
-        """Проверяет создание комбинации 4+3"""
-        board[row][col] = symbol
-        
-        has_four = False
-        has_three = False
-        
-        for dr, dc in self.directions:
-            pattern = self._get_line_pattern(board, row, col, dr, dc, symbol)
-            
-            if 'FOUR' in pattern:
-                has_four = True
-            elif 'THREE' in pattern:
-                has_three = True
-        
-        board[row][col] = '.'
-        return has_four and has_three
-    
-    def _get_line_pattern(self, board, row, col, dr, dc, symbol) -> str:
-        """Определяет паттерн в линии"""
-        # Подсчитываем последовательные символы
-        count = 1
-        
-        # В одну сторону
-        r, c = row + dr, col + dc
-        while 0 <= r < len(board) and 0 <= c < len(board[0]) and board[r][c] == symbol:
-            count += 1
-            r, c = r + dr, c + dc
-        
-        # В другую сторону
-        r, c = row - dr, col - dc
-        while 0 <= r < len(board) and 0 <= c < len(board[0]) and board[r][c] == symbol:
-            count += 1
-            r, c = r - dr, c - dc
-        
-        if count >= 5:
-            return 'FIVE'
-        elif count == 4:
-            return 'FOUR'
-        elif count == 3:
-            return 'THREE'
-        else:
-            return 'TWO'
-    
-    def _find_critical_move(self, game, valid_moves) -> Optional[Tuple[int, int]]:
+    def _find_critical_move(self, game, threats) -> Optional[Tuple[int, int]]:
         """Поиск критических ходов (победа или защита от поражения)"""
-        board = game.board
-        
-        # 1. Проверяем возможность выиграть немедленно
-        for row, col in valid_moves:
-            if self._check_winning_move(board, row, col, self.symbol):
-                return (row, col)
-        
-        # 2. КРИТИЧНО: Защищаемся от немедленного поражения
-        for row, col in valid_moves:
-            if self._check_winning_move(board, row, col, self.opponent_symbol):
-                return (row, col)
-        
-        # 3. Блокируем открытую четверку соперника (высший приоритет защиты)
-        for row, col in valid_moves:
-            if self._creates_open_four(board, row, col, self.opponent_symbol):
-                return (row, col)
-        
-        # 4. Создаем открытую четверку (ПОВЫШЕН ПРИОРИТЕТ)
-        for row, col in valid_moves:
-            if self._creates_open_four(board, row, col, self.symbol):
-                return (row, col)
-        
-        # 5. Блокируем четверку соперника (любую)
-        for row, col in valid_moves:
-            if self._creates_four_threat(board, row, col, self.opponent_symbol):
-                return (row, col)
-        
-        # 6. Создаем четверку
-        for row, col in valid_moves:
-            if self._creates_four_threat(board, row, col, self.symbol):
-                return (row, col)
-        
-        # 7. Блокируем двойную тройку соперника
-        for row, col in valid_moves:
-            if self._creates_double_three(board, row, col, self.opponent_symbol):
-                return (row, col)
-        
-        # 8. Создаем двойную тройку
-        for row, col in valid_moves:
-            if self._creates_double_three(board, row, col, self.symbol):
-                return (row, col)
+        # Уровни 1-8 проверяются за один проход: выбирается ход с самым приоритетным
+        # уровнем, а среди равных - первый по порядку, как при отдельных проходах
+        best_move = None
+        best_tier = CRITICAL_TIER_COUNT
+        for row, col, own, opponent in threats:
+            tier = self._critical_tier(own, opponent)
+            if tier < best_tier:
+                best_tier = tier
+                best_move = (row, col)
+                if tier == 0:
+                    break
+        if best_move:
+            return best_move
         
         # 9. УЛУЧШЕННАЯ защита от критических угроз
-        critical_defense = self._find_critical_defense(board, valid_moves)
+        critical_defense = self._find_critical_defense(game, threats)
         if critical_defense:
             return critical_defense
         
         # 10. Блокируем открытую тройку соперника (только если критично)
-        dangerous_three = self._find_dangerous_open_three(board, valid_moves)
+        dangerous_three = self._find_dangerous_open_three(game, threats)
         if dangerous_three:
             return dangerous_three
         
         return None
     
-    def _creates_double_three(self, board, row, col, symbol) -> bool:
-        """Проверяет создание двойной тройки"""
-        board[row][col] = symbol
-        
-        three_count = 0
-        for dr, dc in self.directions:
-            if self._has_open_three_in_direction(board, row, col, dr, dc, symbol):
-                three_count += 1
-        
-        board[row][col] = '.'
-        return three_count >= 2
-    
-    def _has_open_three_in_direction(self, board, row, col, dr, dc, symbol) -> bool:
-        """Проверяет наличие открытой тройки в направлении"""
-        # Собираем линию 7 клеток
-        line = []
-        for i in range(-3, 4):
-            r, c = row + i * dr, col + i * dc
-            if 0 <= r < len(board) and 0 <= c < len(board[0]):
-                line.append(board[r][c])
-            else:
-                line.append('#')
-        
-        line_str = ''.join(line)
-        return f'.{symbol * 3}.' in line_str
-    
-    def _creates_four_threat(self, board, row, col, symbol) -> bool:
-        """Проверяет, создает ли ход угрозу четверки"""
-        board[row][col] = symbol
-        
-        for dr, dc in self.directions:
-            count = 1
-            
-            # В одну сторону
-            r, c = row + dr, col + dc
-            while 0 <= r < len(board) and 0 <= c < len(board[0]) and board[r][c] == symbol:
-                count += 1
-                r, c = r + dr, c + dc
-            
-            # В другую сторону
-            r, c = row - dr, col - dc
-            while 0 <= r < len(board) and 0 <= c < len(board[0]) and board[r][c] == symbol:
-                count += 1
-                r, c = r - dr, c - dc
-            
-            if count >= 4:
-                board[row][col] = '.'
-                return True
-        
-        board[row][col] = '.'
-        return False
-    
-    def _blocks_open_three(self, board, row, col, symbol) -> bool:
+    def _critical_tier(self, own, opponent) -> int:
+        """Номер самого приоритетного критического уровня хода (CRITICAL_TIER_COUNT - ни одного)"""
+        # 1. Выигрываем немедленно
+        if own.five:
+            return 0
+        # 2. КРИТИЧНО: Защищаемся от немедленного поражения
+        if opponent.five:
+            return 1
+        # 3. Блокируем открытую четверку соперника (высший приоритет защиты)
+        if opponent.open_four:
+            return 2
+        # 4. Создаем открытую четверку (ПОВЫШЕН ПРИОРИТЕТ)
+        if own.open_four:
+            return 3
+        # 5. Блокируем четверку соперника (любую)
+        if opponent.fours > 0:
+            return 4
+        # 6. Создаем четверку
+        if own.fours > 0:
+            return 5
+        # 7. Блокируем двойную тройку соперника
+        if opponent.open_threes >= 2:
+            return 6
+        # 8. Создаем двойную тройку
+        if own.open_threes >= 2:
+            return 7
+        return CRITICAL_TIER_COUNT
+    def _blocks_open_three(self, game, row, col, symbol) -> bool:
         """Проверяет, блокирует ли ход открытую тройку"""
         # Временно ставим фигуру соперника
-        board[row][col] = self.opponent_symbol if symbol == self.symbol else self.symbol
-        
-        # Проверяем, была ли открытая тройка до этого хода
-        for dr, dc in self.directions:
-            if self._check_open_three_pattern(board, row, col, dr, dc, symbol):
-                board[row][col] = '.'
-                return True
+        blocker = self.opponent_symbol if symbol == self.symbol else self.symbol
+        with game.temporary_move(row, col, blocker):
+            cells = game.cells
+            # Проверяем, была ли открытая тройка до этого хода
+            for window in self.tables.windows[5][self._index(row, col)]:
+                if self._check_open_three_pattern(cells, window, symbol):
+                    return True
         
-        board[row][col] = '.'
         return False
     
-    def _check_open_three_pattern(self, board, row, col, dr, dc, symbol) -> bool:
+    def _check_open_three_pattern(self, cells, window, symbol) -> bool:
         """Проверяет паттерн открытой тройки в направлении"""
-        # Проверяем несколько позиций для паттерна .XXX.
-        for start_offset in range(-4, 2):
-            pattern = []
-            for i in range(5):
-                r = row + (start_offset + i) * dr
-                c = col + (start_offset + i) * dc
-                
-                if 0 <= r < len(board) and 0 <= c < len(board[0]):
-                    pattern.append(board[r][c])
-                else:
-                    pattern.append('#')
+        # Окно 11 клеток: пятерки со смещениями -4..+5 от центра
+        for start in range(6):
+            pattern = [cells[i] for i in window[start + 1:start + 6]]
             
             # Проверяем паттерн .XXX.
-            if (len(pattern) == 5 and 
-                pattern[0] == '.' and 
+            if (pattern[0] == '.' and 
                 pattern[4] == '.' and
                 all(pattern[i] == symbol for i in range(1, 4))):
                 return True
         
         return False
     
-    def _find_strategic_move(self, game, valid_moves, start_time) -> Tuple[int, int]:
-        """Стратегический анализ позиции"""
+    def _find_strategic_move(self, game, valid_moves, deadline) -> Tuple[int, int]:
+        """Стратегический анализ позиции; к жесткому сроку - лучший из оцененных ходов"""
         best_score = float('-inf')
         best_moves = []
         
         for row, col in valid_moves:
-            if time.time() - start_time > self.max_time:
+            if deadline.expired():
+                logger.info(f"⏱️ Срок хода истек: выбор из {len(best_moves)} лучших оцененных ходов")
                 break
                 
-            score = self._evaluate_strategic_move(game.board, row, col)
+            score = self._evaluate_strategic_move(game, row, col)
             
             if score > best_score:
                 best_score = score
@@ -400,19 +437,17 @@ class AIPlayer:
         
         return random.choice(best_moves) if best_moves else random.choice(valid_moves)
     
-    def _evaluate_strategic_move(self, board, row, col) -> float:
+    def _evaluate_strategic_move(self, game, row, col) -> float:
         """Стратегическая оценка хода"""
         score = 0
+        idx = self._index(row, col)
+        cells = game.cells
         
         # Оценка для ИИ
-        board[row][col] = self.symbol
-        ai_score = self._evaluate_position_advanced(board, row, col, self.symbol)
+        ai_score = self._evaluate_position_advanced(game, row, col, self.symbol)
         
         # Оценка защиты
-        board[row][col] = self.opponent_symbol
-        defense_score = self._evaluate_position_advanced(board, row, col, self.opponent_symbol)
-        
-        board[row][col] = '.'
+        defense_score = self._evaluate_position_advanced(game, row, col, self.opponent_symbol)
         
         # Комбинированная оценка (атака + защита)
         # Защита важнее атаки для предотвращения поражений
@@ -421,132 +456,42 @@ class AIPlayer:
         # НОВЫЕ КРИТЕРИИ ОЦЕНКИ:
         
         # 1. Контроль пространства
-        space_control = self._evaluate_space_control(board, row, col)
+        space_control = self._evaluate_space_control(cells, idx)
         score += space_control
         
         # 2. Потенциал развития
-        development_potential = self._evaluate_development_potential(board, row, col)
+        development_potential = self._evaluate_development_potential(cells, idx)
         score += development_potential
         
         # 3. Избегание "мертвых" позиций
-        dead_position_penalty = self._evaluate_dead_position(board, row, col)
+        dead_position_penalty = self._evaluate_dead_position(cells, idx)
         score -= dead_position_penalty
         
         # 4. Бонус за центральные позиции (уменьшен)
-        center = len(board) // 2
+        center = self.tables.center
         distance_from_center = abs(row - center) + abs(col - center)
         score += max(0, 30 - distance_from_center * 3)  # Уменьшен бонус
         
         # 5. Связность с существующими фигурами
-        connectivity_bonus = self._evaluate_connectivity(board, row, col)
+        connectivity_bonus = self._evaluate_connectivity(cells, idx)
         score += connectivity_bonus
         
         return score
     
-    def _evaluate_position_advanced(self, board, row, col, symbol) -> float:
-        """Продвинутая оценка позиции"""
-        score = 0
-        
-        for dr, dc in self.directions:
-            line_score = self._evaluate_line_advanced(board, row, col, dr, dc, symbol)
-            score += line_score
-        
-        return score
-    
-    def _evaluate_line_advanced(self, board, row, col, dr, dc, symbol) -> float:
-        """Продвинутая оценка линии"""
-        # Собираем расширенную линию
-        line = []
-        for i in range(-6, 7):
-            r, c = row + i * dr, col + i * dc
-            if 0 <= r < len(board) and 0 <= c < len(board[0]):
-                line.append(board[r][c])
-            else:
-                line.append('#')
-        
-        score = 0
-        line_str = ''.join(line)
-        
-        # Паттерны для оценки
-        patterns = {
-            f'{symbol * 5}': 100000,  # Пятерка
-            f'.{symbol * 4}.': 50000,  # Открытая четверка
-            f'{symbol * 4}.': 10000,   # Четверка
-            f'.{symbol * 4}': 10000,   # Четверка
-            f'.{symbol * 3}.': 5000,   # Открытая тройка
-            f'{symbol * 3}.': 1000,    # Тройка
-            f'.{symbol * 3}': 1000,    # Тройка
-            f'.{symbol * 2}.': 200,    # Открытая двойка
-            f'{symbol * 2}': 50,       # Двойка
-        }
-        
-        for pattern, value in patterns.items():
-            score += line_str.count(pattern) * value
-        
-        return score
-    
-    def _check_winning_move(self, board, row, col, symbol) -> bool:
-        """Проверяет, создает ли данный ход выигрышную комбинацию"""
-        board[row][col] = symbol
-        
-        for dr, dc in self.directions:
-            count = 1
-            
-            # В одну сторону
-            r, c = row + dr, col + dc
-            while 0 <= r < len(board) and 0 <= c < len(board[0]) and board[r][c] == symbol:
-                count += 1
-                r, c = r + dr, c + dc
-            
-            # В другую сторону
-            r, c = row - dr, col - dc
-            while 0 <= r < len(board) and 0 <= c < len(board[0]) and board[r][c] == symbol:
-                count += 1
-                r, c = r - dr, c - dc
-            
-            if count >= 5:
-                board[row][col] = '.'
-                return True
-        
-        board[row][col] = '.'
-        return False
-    
-    def _creates_open_four(self, board, row, col, symbol) -> bool:
-        """Проверяет, создает ли ход открытую четверку"""
-        board[row][col] = symbol
-        
-        for dr, dc in self.directions:
-            for start_offset in range(-5, 1):
-                sequence = []
-                for i in range(6):
-                    r = row + (start_offset + i) * dr
-                    c = col + (start_offset + i) * dc
-                    
-                    if 0 <= r < len(board) and 0 <= c < len(board[0]):
-                        sequence.append(board[r][c])
-                    else:
-                        sequence.append('#')
-                
-                if (len(sequence) == 6 and 
-                    sequence[0] == '.' and 
-                    sequence[5] == '.' and
-                    all(sequence[i] == symbol for i in range(1, 5))):
-                    board[row][col] = '.'
-                    return True
-        
-        board[row][col] = '.'
-        return False
+    def _evaluate_position_advanced(self, game, row, col, symbol) -> float:
+        """Продвинутая оценка позиции: линии 13 клеток по таблице паттернов"""
+        return sum(self._window_values(game, 'line_advanced', row, col, symbol))
     
-    def _find_slow_threat_defense(self, game, valid_moves) -> Optional[Tuple[int, int]]:
+    def _find_slow_threat_defense(self, game, valid_moves, deadline) -> Optional[Tuple[int, int]]:
         """Поиск защиты от медленно развивающихся угроз"""
-        board = game.board
-        
         # Ищем позиции соперника, которые могут стать опасными
         dangerous_positions = []
         
         for row, col in valid_moves:
+            if deadline.expired():
+                break
             # Проверяем, создает ли соперник потенциальную угрозу на этой позиции
-            threat_level = self._evaluate_potential_threat(board, row, col, self.opponent_symbol)
+            threat_level = self._evaluate_potential_threat(game, row, col, self.opponent_symbol)
             
             if threat_level > 2000:  # Высокий уровень потенциальной угрозы
                 dangerous_positions.append((row, col, threat_level))
@@ -560,44 +505,32 @@ class AIPlayer:
         
         return None
     
-    def _evaluate_potential_threat(self, board, row, col, symbol) -> float:
+    def _evaluate_potential_threat(self, game, row, col, symbol) -> float:
         """Оценивает потенциальную угрозу позиции"""
-        board[row][col] = symbol
-        
         threat_score = 0
         
-        # Анализируем все направления
-        for dr, dc in self.directions:
-            # Проверяем развитие в каждом направлении
-            line_potential = self._analyze_line_potential(board, row, col, dr, dc, symbol)
-            threat_score += line_potential
-        
-        # Бонус за создание множественных линий развития
-        development_lines = self._count_development_lines(board, row, col, symbol)
-        if development_lines >= 2:
-            threat_score += 1500  # Бонус за множественное развитие
+        with game.temporary_move(row, col, symbol):
+            cells = game.cells
+            idx = self._index(row, col)
+            # Анализируем все направления
+            for window in self.tables.windows[7][idx]:
+                # Проверяем развитие в каждом направлении
+                line_potential = self._analyze_line_potential(cells, window, symbol)
+                threat_score += line_potential
+            
+            # Бонус за создание множественных линий развития
+            development_lines = self._count_development_lines(cells, idx, symbol)
+            if development_lines >= 2:
+                threat_score += 1500  # Бонус за множественное развитие
         
-        board[row][col] = '.'
         return threat_score
     
-    def _analyze_line_potential(self, board, row, col, dr, dc, symbol) -> float:
+    def _analyze_line_potential(self, cells, window, symbol) -> float:
         """Анализирует потенциал развития линии"""
         potential = 0
         
-        # Собираем расширенную линию (7 клеток в каждую сторону)
-        line = []
-        positions = []
-        
-        for i in range(-7, 8):
-            r, c = row + i * dr, col + i * dc
-            if 0 <= r < len(board) and 0 <= c < len(board[0]):
-                line.append(board[r][c])
-                positions.append((r, c))
-            else:
-                line.append('#')
-                positions.append(None)
-        
-        line_str = ''.join(line)
+        # Расширенная линия (7 клеток в каждую сторону)
+        line_str = ''.join([cells[i] for i in window])
         
         # Ищем паттерны потенциального развития
         patterns = {
@@ -618,104 +551,86 @@ class AIPlayer:
         
         return potential
     
-    def _count_development_lines(self, board, row, col, symbol) -> int:
+    def _count_development_lines(self, cells, idx, symbol) -> int:
         """Подсчитывает количество линий развития"""
         development_count = 0
         
-        for dr, dc in self.directions:
-            if self._has_development_potential(board, row, col, dr, dc, symbol):
+        for window in self.tables.windows[5][idx]:
+            if self._has_development_potential(cells, window, symbol):
                 development_count += 1
         
         return development_count
     
-    def _has_development_potential(self, board, row, col, dr, dc, symbol) -> bool:
+    def _has_development_potential(self, cells, window, symbol) -> bool:
         """Проверяет наличие потенциала развития в направлении"""
-        # Проверяем 5 клеток в каждую сторону
+        # Проверяем 5 клеток в каждую сторону (центр окна пропускаем)
         empty_count = 0
         symbol_count = 0
         
-        for i in range(-5, 6):
-            if i == 0:
+        for k, i in enumerate(window):
+            if k == 5:
                 continue
-            r, c = row + i * dr, col + i * dc
-            if 0 <= r < len(board) and 0 <= c < len(board[0]):
-                if board[r][c] == '.':
-                    empty_count += 1
-                elif board[r][c] == symbol:
-                    symbol_count += 1
+            if cells[i] == '.':
+                empty_count += 1
+            elif cells[i] == symbol:
+                symbol_count += 1
         
         # Потенциал есть, если достаточно места и есть свои фигуры
         return empty_count >= 3 and symbol_count >= 1
     
-    def _evaluate_space_control(self, board, row, col) -> float:
+    def _evaluate_space_control(self, cells, idx) -> float:
         """Оценивает контроль пространства"""
         control_score = 0
         
         # Проверяем область 5x5 вокруг позиции
-        for dr in range(-2, 3):
-            for dc in range(-2, 3):
-                r, c = row + dr, col + dc
-                if 0 <= r < len(board) and 0 <= c < len(board[0]):
-                    if board[r][c] == '.':
-                        # Пустые клетки дают контроль
-                        distance = abs(dr) + abs(dc)
-                        control_score += max(0, 50 - distance * 10)
-                    elif board[r][c] == self.symbol:
-                        # Свои фигуры усиливают контроль
-                        control_score += 30
+        for i, distance in self.tables.areas[idx]:
+            if cells[i] == '.':
+                # Пустые клетки дают контроль
+                control_score += max(0, 50 - distance * 10)
+            elif cells[i] == self.symbol:
+                # Свои фигуры усиливают контроль
+                control_score += 30
         
         return control_score
     
-    def _evaluate_development_potential(self, board, row, col) -> float:
+    def _evaluate_development_potential(self, cells, idx) -> float:
         """Оценивает потенциал развития позиции"""
         potential_score = 0
         
         # Проверяем каждое направление
-        for dr, dc in self.directions:
+        for window in self.tables.windows[4][idx]:
             line_potential = 0
             
             # Анализируем линию 9 клеток
-            for i in range(-4, 5):
-                r, c = row + i * dr, col + i * dc
-                if 0 <= r < len(board) and 0 <= c < len(board[0]):
-                    if board[r][c] == '.':
-                        line_potential += 10
-                    elif board[r][c] == self.symbol:
-                        line_potential += 20
-                    elif board[r][c] == self.opponent_symbol:
-                        line_potential -= 15  # Блокировка развития
+            for i in window:
+                if cells[i] == '.':
+                    line_potential += 10
+                elif cells[i] == self.symbol:
+                    line_potential += 20
+                elif cells[i] == self.opponent_symbol:
+                    line_potential -= 15  # Блокировка развития
             
             potential_score += max(0, line_potential)
         
         return potential_score
     
-    def _evaluate_dead_position(self, board, row, col) -> float:
+    def _evaluate_dead_position(self, cells, idx) -> float:
         """Оценивает "мертвость" позиции (закрытые линии)"""
         dead_penalty = 0
         
-        for dr, dc in self.directions:
+        for window in self.tables.windows[4][idx]:
             # Проверяем, заблокирована ли линия с обеих сторон
             blocked_count = 0
             
-            # Проверяем блокировку в положительном направлении
-            for i in range(1, 5):
-                r, c = row + i * dr, col + i * dc
-                if (r < 0 or r >= len(board) or c < 0 or c >= len(board[0]) or 
-                    board[r][c] == self.opponent_symbol):
-                    blocked_count += 1
-                    break
-                elif board[r][c] == self.symbol:
-                    break
-            
-            # Проверяем блокировку в отрицательном направлении
-            for i in range(1, 5):
-                r, c = row - i * dr, col - i * dc
-                if (r < 0 or r >= len(board) or c < 0 or c >= len(board[0]) or 
-                    board[r][c] == self.opponent_symbol):
-                    blocked_count += 1
-                    break
-                elif board[r][c] == self.symbol:
-                    break
+            # Проверяем блокировку в положительном и отрицательном направлениях;
+            # край доски ('#') блокирует так же, как фигура соперника
+            for side in (window[5:], window[3::-1]):
+                for i in side:
+                    if cells[i] == self.opponent_symbol or cells[i] == '#':
+                        blocked_count += 1
+                        break
+                    elif cells[i] == self.symbol:
+                        break
             
             # Если заблокировано с обеих сторон - штраф
             if blocked_count >= 2:
@@ -723,38 +638,28 @@ class AIPlayer:
         
         return dead_penalty
     
-    def _evaluate_connectivity(self, board, row, col) -> float:
+    def _evaluate_connectivity(self, cells, idx) -> float:
         """Оценивает связность с существующими фигурами"""
         connectivity_score = 0
         
         # Проверяем соседние клетки
-        for dr in [-1, 0, 1]:
-            for dc in [-1, 0, 1]:
-                if dr == 0 and dc == 0:
-                    continue
-                
-                r, c = row + dr, col + dc
-                if 0 <= r < len(board) and 0 <= c < len(board[0]):
-                    if board[r][c] == self.symbol:
-                        connectivity_score += 100
-                    elif board[r][c] == self.opponent_symbol:
-                        connectivity_score += 50  # Даже соперник дает связность
+        for i in self.tables.geometry.neighbor_indices[idx]:
+            if cells[i] == self.symbol:
+                connectivity_score += 100
+            elif cells[i] == self.opponent_symbol:
+                connectivity_score += 50  # Даже соперник дает связность
         
         return connectivity_score
     
-    def _find_forced_sequence_defense(self, board, valid_moves) -> Optional[Tuple[int, int]]:
+    def _find_forced_sequence_defense(self, game, valid_moves) -> Optional[Tuple[int, int]]:
         """Поиск защиты от форсированных последовательностей"""
         # Ищем ходы соперника, которые создают неостановимые угрозы
         critical_defenses = []
         
         for row, col in valid_moves:
-            # Проверяем, что произойдет, если соперник сходит сюда
-            board[row][col] = self.opponent_symbol
-            
-            # Анализируем создаваемые угрозы
-            threat_level = self._analyze_forced_threats(board, row, col, self.opponent_symbol)
-            
-            board[row][col] = '.'
+            # Проверяем, что произойдет, если соперник сходит сюда:
+            # анализируем создаваемые угрозы
+            threat_level = self._analyze_forced_threats(game, row, col, self.opponent_symbol)
             
             if threat_level > 3000:  # Критический уровень угрозы
                 critical_defenses.append((row, col, threat_level))
@@ -766,15 +671,14 @@ class AIPlayer:
         
         return None
     
-    def _analyze_forced_threats(self, board, row, col, symbol) -> float:
+    def _analyze_forced_threats(self, game, row, col, symbol) -> float:
         """Анализирует форсированные угрозы от позиции"""
         threat_score = 0
         
         # Подсчитываем количество направлений с угрозами
         threat_directions = 0
         
-        for dr, dc in self.directions:
-            direction_threat = self._evaluate_direction_threat(board, row, col, dr, dc, symbol)
+        for direction_threat in self._window_values(game, 'direction_threat', row, col, symbol):
             threat_score += direction_threat
             
             if direction_threat > 1000:  # Серьезная угроза в этом направлении
@@ -786,43 +690,16 @@ class AIPlayer:
         
         return threat_score
     
-    def _evaluate_direction_threat(self, board, row, col, dr, dc, symbol) -> float:
-        """Оценивает угрозу в конкретном направлении"""
-        threat = 0
-        
-        # Собираем линию 9 клеток
-        line = []
-        for i in range(-4, 5):
-            r, c = row + i * dr, col + i * dc
-            if 0 <= r < len(board) and 0 <= c < len(board[0]):
-                line.append(board[r][c])
-            else:
-                line.append('#')
-        
-        line_str = ''.join(line)
-        
-        # Анализируем угрозы
-        if f'{symbol * 4}' in line_str:
-            threat += 5000  # Четверка - критическая угроза
-        elif f'.{symbol * 3}.' in line_str:
-            threat += 3000  # Открытая тройка - серьезная угроза
-        elif f'{symbol * 3}.' in line_str or f'.{symbol * 3}' in line_str:
-            threat += 1500  # Тройка - умеренная угроза
-        elif f'.{symbol * 2}.' in line_str:
-            threat += 800   # Открытая двойка - потенциальная угроза
-        
-        return threat
-    
-    def _find_aggressive_move(self, game, valid_moves) -> Optional[Tuple[int, int]]:
+    def _find_aggressive_move(self, game, threats, deadline) -> Optional[Tuple[int, int]]:
         """Поиск агрессивных ходов для создания угроз"""
-        board = game.board
-        
         # Ищем ходы, которые создают максимальные угрозы
         aggressive_moves = []
         
-        for row, col in valid_moves:
+        for row, col, own, _ in threats:
+            if deadline.expired():
+                break
             # Оценка агрессивности хода
-            aggression_score = self._evaluate_aggression(board, row, col, self.symbol)
+            aggression_score = self._evaluate_aggression(game, row, col, self.symbol, own)
             
             if aggression_score > 1500:  # Высокий уровень агрессии
                 aggressive_moves.append((row, col, aggression_score))
@@ -834,17 +711,12 @@ class AIPlayer:
         
         return None
     
-    def _evaluate_aggression(self, board, row, col, symbol) -> float:
-        """Оценивает агрессивность хода"""
-        board[row][col] = symbol
-        
+    def _evaluate_aggression(self, game, row, col, symbol, record) -> float:
+        """Оценивает агрессивность хода по его записи угроз"""
         aggression_score = 0
         
         # 1. Создание множественных угроз
-        threat_count = 0
-        for dr, dc in self.directions:
-            if self._creates_threat_in_direction(board, row, col, dr, dc, symbol):
-                threat_count += 1
+        threat_count = record.threats
         
         if threat_count >= 2:
             aggression_score += 2000  # Множественные угрозы
@@ -852,82 +724,26 @@ class AIPlayer:
             aggression_score += 800   # Одна угроза
         
         # 2. Создание открытых троек
-        open_threes = self._count_open_threes(board, row, col, symbol)
+        open_threes = record.open_threes
         aggression_score += open_threes * 1200
         
         # 3. Создание четверок
-        fours = self._count_fours(board, row, col, symbol)
+        fours = record.fours
         aggression_score += fours * 3000
         
         # 4. Контроль центральных линий
-        center_control = self._evaluate_center_control(board, row, col, symbol)
+        center_control = self._evaluate_center_control(row, col)
         aggression_score += center_control
         
         # 5. Создание "вилок" (двойных угроз)
-        fork_potential = self._evaluate_fork_potential(board, row, col, symbol)
+        fork_potential = self._evaluate_fork_potential(game, row, col, symbol)
         aggression_score += fork_potential
         
-        board[row][col] = '.'
         return aggression_score
     
-    def _creates_threat_in_direction(self, board, row, col, dr, dc, symbol) -> bool:
-        """Проверяет создание угрозы в направлении"""
-        # Собираем линию 7 клеток
-        line = []
-        for i in range(-3, 4):
-            r, c = row + i * dr, col + i * dc
-            if 0 <= r < len(board) and 0 <= c < len(board[0]):
-                line.append(board[r][c])
-            else:
-                line.append('#')
-        
-        line_str = ''.join(line)
-        
-        # Проверяем различные угрозы
-        threats = [
-            f'.{symbol * 3}.',  # Открытая тройка
-            f'{symbol * 3}.',   # Тройка с одной стороны
-            f'.{symbol * 3}',   # Тройка с другой стороны
-            f'.{symbol * 2}.{symbol}.', # Разорванная тройка
-            f'.{symbol}.{symbol * 2}.', # Разорванная тройка
-        ]
-        
-        return any(threat in line_str for threat in threats)
-    
-    def _count_open_threes(self, board, row, col, symbol) -> int:
-        """Подсчитывает открытые тройки"""
-        count = 0
-        for dr, dc in self.directions:
-            if self._has_open_three_in_direction(board, row, col, dr, dc, symbol):
-                count += 1
-        return count
-    
-    def _count_fours(self, board, row, col, symbol) -> int:
-        """Подсчитывает четверки"""
-        count = 0
-        for dr, dc in self.directions:
-            line_count = 1
-            
-            # В одну сторону
-            r, c = row + dr, col + dc
-            while 0 <= r < len(board) and 0 <= c < len(board[0]) and board[r][c] == symbol:
-                line_count += 1
-                r, c = r + dr, c + dc
-            
-            # В другую сторону
-            r, c = row - dr, col - dc
-            while 0 <= r < len(board) and 0 <= c < len(board[0]) and board[r][c] == symbol:
-                line_count += 1
-                r, c = r - dr, c - dc
-            
-            if line_count >= 4:
-                count += 1
-        
-        return count
-    
-    def _evaluate_center_control(self, board, row, col, symbol) -> float:
+    def _evaluate_center_control(self, row, col) -> float:
         """Оценивает контроль центральных линий"""
-        center = len(board) // 2
+        center = self.tables.center
         distance_from_center = abs(row - center) + abs(col - center)
         
         # Бонус за близость к центру
@@ -943,16 +759,15 @@ class AIPlayer:
         
         return center_bonus
     
-    def _evaluate_fork_potential(self, board, row, col, symbol) -> float:
+    def _evaluate_fork_potential(self, game, row, col, symbol) -> float:
         """Оценивает потенциал создания вилок (двойных угроз)"""
         fork_score = 0
         
         # Проверяем, создает ли ход потенциал для будущих вилок
         potential_lines = 0
         
-        for dr, dc in self.directions:
-            # Анализируем потенциал линии
-            line_potential = self._analyze_line_fork_potential(board, row, col, dr, dc, symbol)
+        # Потенциал линий 9 клеток
+        for line_potential in self._window_values(game, 'fork_potential', row, col, symbol):
             if line_potential > 0:
                 potential_lines += 1
                 fork_score += line_potential
@@ -965,60 +780,27 @@ class AIPlayer:
         
         return fork_score
     
-    def _analyze_line_fork_potential(self, board, row, col, dr, dc, symbol) -> float:
-        """Анализирует потенциал вилки в линии"""
-        potential = 0
-        
-        # Собираем линию 9 клеток
-        line = []
-        for i in range(-4, 5):
-            r, c = row + i * dr, col + i * dc
-            if 0 <= r < len(board) and 0 <= c < len(board[0]):
-                line.append(board[r][c])
-            else:
-                line.append('#')
-        
-        line_str = ''.join(line)
-        
-        # Паттерны потенциала вилки
-        patterns = {
-            f'..{symbol}..': 100,    # Одиночка с пространством
-            f'.{symbol}.{symbol}.': 200,  # Разорванная двойка
-            f'..{symbol}{symbol}.': 150,  # Двойка с пространством
-            f'.{symbol}{symbol}..': 150,  # Двойка с пространством
-        }
-        
-        for pattern, value in patterns.items():
-            potential += line_str.count(pattern) * value
-        
-        return potential
-    
-    def _find_critical_defense(self, board, valid_moves) -> Optional[Tuple[int, int]]:
+    def _find_critical_defense(self, game, threats) -> Optional[Tuple[int, int]]:
         """Улучшенная защита от критических угроз"""
         critical_threats = []
         
-        for row, col in valid_moves:
-            # Анализируем, что произойдет, если соперник сходит сюда
-            board[row][col] = self.opponent_symbol
-            
+        # Анализируем, что произойдет, если соперник сходит сюда
+        for row, col, _, opponent in threats:
             threat_level = 0
             
             # 1. Проверяем создание множественных угроз
-            multiple_threats = self._count_multiple_threats(board, row, col, self.opponent_symbol)
-            threat_level += multiple_threats * 1000
+            threat_level += opponent.threats * 1000
             
             # 2. Проверяем создание неблокируемых комбинаций
-            unblockable = self._creates_unblockable_threat(board, row, col, self.opponent_symbol)
+            unblockable = self._creates_unblockable_threat(opponent)
             if unblockable:
                 threat_level += 2000
             
             # 3. Проверяем создание выигрышных последовательностей
-            winning_sequence = self._creates_winning_sequence(board, row, col, self.opponent_symbol)
+            winning_sequence = self._creates_winning_sequence(opponent)
             if winning_sequence:
                 threat_level += 1500
             
-            board[row][col] = '.'
-            
             if threat_level > 1500:  # Критический уровень
                 critical_threats.append((row, col, threat_level))
         
@@ -1028,32 +810,16 @@ class AIPlayer:
         
         return None
     
-    def _count_multiple_threats(self, board, row, col, symbol) -> int:
-        """Подсчитывает количество создаваемых угроз"""
-        threat_count = 0
-        
-        for dr, dc in self.directions:
-            if self._creates_threat_in_direction(board, row, col, dr, dc, symbol):
-                threat_count += 1
-        
-        return threat_count
-    
-    def _creates_unblockable_threat(self, board, row, col, symbol) -> bool:
+    def _creates_unblockable_threat(self, record) -> bool:
         """Проверяет создание неблокируемой угрозы"""
         # Проверяем создание двух открытых троек одновременно
-        open_three_count = 0
-        
-        for dr, dc in self.directions:
-            if self._has_open_three_in_direction(board, row, col, dr, dc, symbol):
-                open_three_count += 1
-        
-        return open_three_count >= 2
+        return record.open_threes >= 2
     
-    def _creates_winning_sequence(self, board, row, col, symbol) -> bool:
+    def _creates_winning_sequence(self, record) -> bool:
         """Проверяет создание выигрышной последовательности"""
         # Проверяем комбинации типа 4+3, 3+3+3 и т.д.
-        fours = self._count_fours(board, row, col, symbol)
-        threes = self._count_open_threes(board, row, col, symbol)
+        fours = record.fours
+        threes = record.open_threes
         
         # Комбинация четверка + тройка = выигрыш
         if fours >= 1 and threes >= 1:
@@ -1065,14 +831,14 @@ class AIPlayer:
         
         return False
     
-    def _find_dangerous_open_three(self, board, valid_moves) -> Optional[Tuple[int, int]]:
+    def _find_dangerous_open_three(self, game, threats) -> Optional[Tuple[int, int]]:
         """Находит опасные открытые тройки для блокировки"""
         dangerous_threes = []
         
-        for row, col in valid_moves:
-            # Проверяем, блокирует ли ход опасную открытую тройку
-            if self._blocks_dangerous_open_three(board, row, col):
-                danger_level = self._evaluate_three_danger(board, row, col)
+        for row, col, _, opponent in threats:
+            # Проверяем, блокирует ли ход опасную открытую тройку соперника
+            if opponent.open_three_through:
+                danger_level = self._evaluate_three_danger(game.cells, row, col)
                 dangerous_threes.append((row, col, danger_level))
         
         if dangerous_threes:
@@ -1081,44 +847,7 @@ class AIPlayer:
         
         return None
     
-    def _blocks_dangerous_open_three(self, board, row, col) -> bool:
-        """Проверяет, блокирует ли ход опасную открытую тройку"""
-        # Ставим свою фигуру
-        board[row][col] = self.symbol
-        
-        # Проверяем, была ли здесь открытая тройка соперника
-        for dr, dc in self.directions:
-            if self._check_blocked_open_three(board, row, col, dr, dc, self.opponent_symbol):
-                board[row][col] = '.'
-                return True
-        
-        board[row][col] = '.'
-        return False
-    
-    def _check_blocked_open_three(self, board, row, col, dr, dc, symbol) -> bool:
-        """Проверяет, была ли заблокирована открытая тройка"""
-        # Проверяем паттерны вокруг заблокированной позиции
-        for offset in range(-2, 3):
-            pattern = []
-            for i in range(5):
-                r = row + (offset + i - 2) * dr
-                c = col + (offset + i - 2) * dc
-                
-                if r == row and c == col:
-                    pattern.append('.')  # Представляем как пустую для проверки
-                elif 0 <= r < len(board) and 0 <= c < len(board[0]):
-                    pattern.append(board[r][c])
-                else:
-                    pattern.append('#')
-            
-            # Проверяем, был ли здесь паттерн .XXX.
-            pattern_str = ''.join(pattern)
-            if f'.{symbol * 3}.' in pattern_str:
-                return True
-        
-        return False
-    
-    def _evaluate_three_danger(self, board, row, col) -> float:
+    def _evaluate_three_danger(self, cells, row, col) -> float:
         """Оценивает опасность открытой тройки"""
         danger = 0
         
@@ -1126,19 +855,13 @@ class AIPlayer:
         danger += 500
         
         # Дополнительная опасность, если рядом есть другие фигуры соперника
-        for dr in [-1, 0, 1]:
-            for dc in [-1, 0, 1]:
-                if dr == 0 and dc == 0:
-                    continue
-                
-                r, c = row + dr, col + dc
-                if (0 <= r < len(board) and 0 <= c < len(board[0]) and 
-                    board[r][c] == self.opponent_symbol):
-                    danger += 100
+        for i in self.tables.geometry.neighbor_indices[self._index(row, col)]:
+            if cells[i] == self.opponent_symbol:
+                danger += 100
         
         # Опасность в зависимости от позиции на доске
-        center = len(board) // 2
+        center = self.tables.center
         distance_from_center = abs(row - center) + abs(col - center)
         danger += max(0, 200 - distance_from_center * 20)
         
-        return danger 
\ No newline at end of file
+        return danger 
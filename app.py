@@ -1,11 +1,20 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Response, render_template, request, jsonify, session
 import json
 import os
 from game_logic import GameLogic
 from ai_player import AIPlayer
+from ai_jobs import LONG_POLL_MAX, get_job_manager
+from engine_pool import ENGINE_WORKERS, RETRY_AFTER, EngineBusy, get_engine_pool
+from game_channel import ChannelFull, get_game_channel, parse_event_id
+from game_store import GameRecord, get_game_store
+from parallel_search import decode_position, encode_position
+from ponder import PONDER_ENABLED, get_ponderer
+from result_cache import get_result_cache
+from time_manager import TimeManager
 import logging
 import secrets
 import datetime
+import time
 import glob
 
 # Настройка логирования
@@ -17,10 +26,14 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', secrets.token_hex(32))
 
 # Создаем директорию для логов если её нет
-LOGS_DIR = 'game_logs'
+LOGS_DIR = os.environ.get('GOMOKU_LOGS_DIR', 'game_logs')
 if not os.path.exists(LOGS_DIR):
     os.makedirs(LOGS_DIR)
 
+# Ход ИИ в фоне для всех запросов (иначе - только по 'async': true в запросе):
+# ответ приходит сразу с job_id, ход забирается через /api/ai_job/<job_id>
+AI_ASYNC = os.environ.get('GOMOKU_AI_ASYNC', '0') == '1'
+
 def get_next_game_index(winner_type):
     """Получить следующий индекс для файла лога"""
     pattern = os.path.join(LOGS_DIR, f"{winner_type}-*.json")
@@ -66,6 +79,7 @@ def save_game_log(game, winner, user_symbol, ai_symbol):
             'ai_symbol': ai_symbol,
             'total_moves': game.move_count,
             'final_board': game.board,
+            'position_hash': f"{game.position_hash:016x}",
             'game_duration_moves': game.move_count,
             'result': {
                 'human_won': winner == user_symbol,
@@ -88,35 +102,162 @@ def save_game_log(game, winner, user_symbol, ai_symbol):
         logger.error(f"❌ Ошибка сохранения лога игры: {e}")
         return None
 
-def init_game():
-    """Инициализация новой игры"""
-    session['game_board'] = [['.'] * 15 for _ in range(15)]
-    session['current_player'] = 'X'
-    session['move_count'] = 0
-    session['game_over'] = False
-    session['winner'] = None
+def init_game(user_symbol):
+    """Инициализация новой игры: партия живет в хранилище, в сессии только ее идентификатор"""
+    record = GameRecord(user_symbol)
+    get_game_store().put(record)
+    session.clear()
+    session['game_id'] = record.game_id
     logger.info("🎮 Новая игра инициализирована")
+    return record
 
-def get_game_logic():
-    """Получить объект GameLogic из сессии"""
-    if 'game_board' not in session:
-        init_game()
-    
-    game = GameLogic()
-    game.board = session['game_board']
-    game.current_player = session['current_player']
-    game.move_count = session['move_count']
-    game.game_over = session['game_over']
-    game.winner = session['winner']
-    return game
-
-def save_game_state(game):
-    """Сохранить состояние игры в сессию"""
-    session['game_board'] = game.board
-    session['current_player'] = game.current_player
-    session['move_count'] = game.move_count
-    session['game_over'] = game.game_over
-    session['winner'] = game.winner
+def current_game():
+    """Партия текущей сессии из хранилища или None"""
+    game_id = session.get('game_id')
+    return get_game_store().get(game_id) if game_id else None
+
+def start_pondering(record):
+    """Обдумывать ответы на ход человека, пока он думает (GOMOKU_PONDER=1)"""
+    if PONDER_ENABLED and not record.game.game_over:
+        get_ponderer().start(record.game_id, record.game, record.ai_symbol)
+
+def pondered_move(record, game=None):
+    """Ход ИИ, обдуманный заранее для этой позиции, или None; остальное обдумывание останавливается"""
+    if not PONDER_ENABLED:
+        return None
+    ponderer = get_ponderer()
+    ponderer.stop(record.game_id)
+    game = game or record.game
+    move = ponderer.take(record.game_id, game.position_hash)
+    if move and game.is_valid_move(*move):
+        logger.info(f"⚡ Ход ИИ {move} взят из обдумывания")
+        return move
+    return None
+
+def compute_ai_move(record, game=None, stop_event=None):
+    """Ход ИИ в пределах его времени на партию; потраченное время копится в партии
+
+    Ход, уже выбранный в этой позиции в любой сессии, берется из общего кэша без поиска;
+    в кэш попадают только ходы, найденные с полным бюджетом хода (TimeManager.full_budget).
+    game - позиция для поиска (по умолчанию живая партия, для фонового хода - ее копия).
+    """
+    game = game or record.game
+    ai = AIPlayer(record.ai_symbol, game_id=record.game_id, stop_event=stop_event, time_used=record.ai_time_used)
+    cache = get_result_cache()
+    move = cache.get(game, ai.symbol, ai.config_key)
+    if move:
+        logger.info(f"♻️ Ход ИИ {move} взят из кэша результатов")
+        return move
+    start = time.monotonic()
+    time_manager = TimeManager(ai.max_time)
+    deadline = time_manager.deadline(game, ai.time_used)
+    if ENGINE_WORKERS:
+        # Поиск в процессе пула движка; при переполнении - облегченный ход или EngineBusy
+        move, score, degraded = get_engine_pool().get_move(game, ai.symbol, deadline, game_id=record.game_id,
+                                                           time_used=ai.time_used, stop_event=stop_event)
+    else:
+        move = ai.get_move(game, deadline)
+        score, degraded = (ai.last_search.score if ai.last_search else None), False
+    with record.lock:
+        record.ai_time_used += time.monotonic() - start
+    # Ход, найденный за урезанное временем партии время, слабее того, что ищут по ключу кэша
+    if (move and not degraded and not (stop_event and stop_event.is_set())
+            and time_manager.full_budget(game, deadline)):
+        cache.put(game, ai.symbol, ai.config_key, move, score)
+    return move
+
+def busy_response(record, error):
+    """Ответ 503, когда движок перегружен: ход человека принят, ход ИИ - повторить через /api/ai_move"""
+    game = record.game
+    response = jsonify({
+        'success': False,
+        'busy': True,
+        **position_fields(record),
+        'current_player': game.current_player,
+        'move_count': game.move_count,
+        'ai_move': None,
+        'error': str(error),
+        'retry_after': RETRY_AFTER
+    })
+    response.headers['Retry-After'] = str(RETRY_AFTER)
+    return response, 503
+
+def position_fields(record):
+    """Позиция для ответа: вся доска или, в протоколе дельт, только ходы после хода клиента
+
+    Клиент присылает since (сколько ходов у него уже есть) и checksum своей позиции
+    в теле запроса или в параметрах URL (см. GameRecord.position).
+    """
+    data = request.get_json(silent=True) or {}
+    since = data.get('since', request.args.get('since', type=int))
+    checksum = data.get('checksum', request.args.get('checksum'))
+    return record.position(since, checksum)
+
+def async_requested(data):
+    """Считать ли ход ИИ в фоне для этого запроса"""
+    return bool((data or {}).get('async', AI_ASYNC))
+
+def submit_ai_turn(record, **fields):
+    """Поставить ход ИИ в очередь заданий; ответ 202 с job_id и полями fields (вызывается под record.lock)"""
+    if ENGINE_WORKERS and get_engine_pool().overflow == 'reject' and get_engine_pool().full():
+        return busy_response(record, EngineBusy('Движок ИИ перегружен, повторите ход позже'))
+    expected_moves = len(record.moves)
+    job = get_job_manager().submit(record.game_id, lambda stop_event: run_ai_turn(record, expected_moves, stop_event))
+    game = record.game
+    return jsonify({
+        'success': True,
+        **position_fields(record),
+        'current_player': game.current_player,
+        'move_count': game.move_count,
+        'ai_move': None,
+        'ai_job': job.job_id,
+        **fields
+    }), 202
+
+def run_ai_turn(record, expected_moves, stop_event):
+    """Ход ИИ в задании: поиск на копии позиции без блокировки партии, затем ход в партии
+
+    Возвращает ответ хода (как у синхронного /api/make_move) или None, если ход
+    больше не нужен: задание отменено или партия за это время изменилась.
+    """
+    with record.lock:
+        if len(record.moves) != expected_moves or record.game.game_over:
+            return None
+        game = decode_position(encode_position(record.game))
+
+    move = pondered_move(record, game) or compute_ai_move(record, game, stop_event)
+
+    with record.lock:
+        if stop_event.is_set() or len(record.moves) != expected_moves:
+            return None
+        if not move:
+            raise RuntimeError('ИИ не может сделать ход')
+        row, col = move
+        if not record.play(row, col, record.ai_symbol):
+            raise RuntimeError(f'ИИ не смог сделать ход на ({row}, {col})')
+        save_game_state(record)
+        game = record.game
+        logger.info(f"✅ Фоновый ход {record.ai_symbol} на ({row}, {col}), счетчик: {game.move_count}")
+        result = {
+            'success': True,
+            'current_player': game.current_player,
+            'ai_move': [row, col],
+            'move_count': game.move_count
+        }
+        if game.check_winner():
+            save_game_log(game, record.ai_symbol, record.user_symbol, record.ai_symbol)
+            result.update(winner=record.ai_symbol, game_over=True)
+        elif game.is_board_full():
+            save_game_log(game, None, record.user_symbol, record.ai_symbol)
+            result.update(winner=None, game_over=True)
+        else:
+            start_pondering(record)
+        return result
+
+def save_game_state(record):
+    """Сохранить партию в хранилище и разбудить ее потоки событий"""
+    get_game_store().put(record)
+    get_game_channel().notify(record.game_id)
 
 @app.route('/')
 def index():
@@ -128,40 +269,52 @@ def new_game():
         data = request.get_json()
         user_choice = data.get('symbol', 'X')
         
-        session['user_symbol'] = user_choice
-        session['ai_symbol'] = 'O' if user_choice == 'X' else 'X'
-        
-        init_game()
-        game = get_game_logic()
-        ai = AIPlayer(session['ai_symbol'])
-        
-        # Если ИИ играет за X (пользователь выбрал O), ИИ ходит первым
-        ai_move = None
-        if session['ai_symbol'] == 'X':
-            logger.info("🤖 ИИ играет за X, делает первый ход")
-            ai_move_result = ai.get_move(game)
-            if ai_move_result:
-                ai_row, ai_col = ai_move_result
-                logger.info(f"🤖 ИИ делает первый ход на ({ai_row}, {ai_col})")
-                success = game.make_move(ai_row, ai_col, session['ai_symbol'])
-                if success:
-                    ai_move = [ai_row, ai_col]
-                    save_game_state(game)
-                    logger.info(f"✅ Первый ход ИИ {session['ai_symbol']} на ({ai_row}, {ai_col}), счетчик: {game.move_count}")
-                else:
-                    logger.error(f"❌ ИИ не смог сделать первый ход на ({ai_row}, {ai_col})")
-        
-        response = {
-            'success': True,
-            'board': game.board,
-            'current_player': game.current_player,
-            'user_symbol': session['user_symbol'],
-            'ai_symbol': session['ai_symbol'],
-            'move_count': game.move_count,
-            'ai_move': ai_move
-        }
+        # Прошлая партия и ее обдумывание больше не нужны
+        old_game_id = session.get('game_id')
+        if old_game_id:
+            if PONDER_ENABLED:
+                get_ponderer().cancel(old_game_id)
+            get_job_manager().cancel_game(old_game_id)
+            get_game_store().delete(old_game_id)
+            get_game_channel().notify(old_game_id)
+        record = init_game(user_choice)
+        game = record.game
+        
+        with record.lock:
+            # Если ИИ играет за X (пользователь выбрал O), ИИ ходит первым
+            ai_move = None
+            if record.ai_symbol == 'X' and async_requested(data):
+                logger.info("🤖 ИИ играет за X, первый ход - в фоне")
+                return submit_ai_turn(record, user_symbol=record.user_symbol, ai_symbol=record.ai_symbol)
+            if record.ai_symbol == 'X':
+                logger.info("🤖 ИИ играет за X, делает первый ход")
+                try:
+                    ai_move_result = compute_ai_move(record)
+                except EngineBusy as e:
+                    return busy_response(record, e)
+                if ai_move_result:
+                    ai_row, ai_col = ai_move_result
+                    logger.info(f"🤖 ИИ делает первый ход на ({ai_row}, {ai_col})")
+                    success = record.play(ai_row, ai_col, record.ai_symbol)
+                    if success:
+                        ai_move = [ai_row, ai_col]
+                        save_game_state(record)
+                        start_pondering(record)
+                        logger.info(f"✅ Первый ход ИИ {record.ai_symbol} на ({ai_row}, {ai_col}), счетчик: {game.move_count}")
+                    else:
+                        logger.error(f"❌ ИИ не смог сделать первый ход на ({ai_row}, {ai_col})")
+            
+            response = {
+                'success': True,
+                **position_fields(record),
+                'current_player': game.current_player,
+                'user_symbol': record.user_symbol,
+                'ai_symbol': record.ai_symbol,
+                'move_count': game.move_count,
+                'ai_move': ai_move
+            }
         
-        logger.info(f"✅ Новая игра: пользователь={user_choice}, ИИ={session['ai_symbol']}")
+        logger.info(f"✅ Новая игра: пользователь={user_choice}, ИИ={record.ai_symbol}")
         return jsonify(response)
         
     except Exception as e:
@@ -171,7 +324,8 @@ def new_game():
 @app.route('/api/make_move', methods=['POST'])
 def make_move():
     try:
-        if 'user_symbol' not in session:
+        record = current_game()
+        if record is None:
             return jsonify({'success': False, 'error': 'Игра не инициализирована'})
         
         data = request.get_json()
@@ -181,86 +335,97 @@ def make_move():
         if row is None or col is None:
             return jsonify({'success': False, 'error': 'Неверные координаты'})
         
-        game = get_game_logic()
-        
-        # Проверяем, что ход игрока
-        if game.current_player != session['user_symbol']:
-            return jsonify({'success': False, 'error': 'Сейчас не ваш ход'})
-        
-        # Делаем ход игрока
-        success = game.make_move(row, col, session['user_symbol'])
-        if not success:
-            return jsonify({'success': False, 'error': 'Неверный ход'})
-        
-        save_game_state(game)
-        logger.info(f"✅ Ход игрока {session['user_symbol']} на ({row}, {col}), счетчик: {game.move_count}")
-        
-        # Проверяем победу игрока
-        if game.check_winner():
-            # Сохраняем лог игры
-            save_game_log(game, session['user_symbol'], session['user_symbol'], session['ai_symbol'])
-            return jsonify({
-                'success': True,
-                'board': game.board,
-                'winner': session['user_symbol'],
-                'game_over': True,
-                'move_count': game.move_count
-            })
-        
-        # Проверяем ничью
-        if game.is_board_full():
-            # Сохраняем лог игры (ничья)
-            save_game_log(game, None, session['user_symbol'], session['ai_symbol'])
-            return jsonify({
-                'success': True,
-                'board': game.board,
-                'winner': None,
-                'game_over': True,
-                'move_count': game.move_count
-            })
-        
-        # Ход ИИ
-        ai = AIPlayer(session['ai_symbol'])
-        ai_move = ai.get_move(game)
-        if ai_move:
-            ai_row, ai_col = ai_move
-            logger.info(f"🤖 ИИ пытается сделать ход на ({ai_row}, {ai_col})")
-            logger.info(f"📊 Состояние клетки [{ai_row}][{ai_col}]: '{game.board[ai_row][ai_col]}'")
-            ai_success = game.make_move(ai_row, ai_col, session['ai_symbol'])
+        with record.lock:
+            game = record.game
             
-            if not ai_success:
-                logger.error(f"❌ ИИ не смог сделать ход на ({ai_row}, {ai_col})")
-                return jsonify({
-                    'success': True,
-                    'board': game.board,
-                    'current_player': game.current_player,
-                    'ai_move': None,
-                    'move_count': game.move_count,
-                    'error': f'ИИ не смог сделать ход на ({ai_row}, {ai_col})'
-                })
+            # Проверяем, что ход игрока
+            if game.current_player != record.user_symbol:
+                return jsonify({'success': False, 'error': 'Сейчас не ваш ход'})
+            
+            # Делаем ход игрока
+            success = record.play(row, col, record.user_symbol)
+            if not success:
+                return jsonify({'success': False, 'error': 'Неверный ход'})
             
-            save_game_state(game)
+            save_game_state(record)
+            logger.info(f"✅ Ход игрока {record.user_symbol} на ({row}, {col}), счетчик: {game.move_count}")
             
-            # Проверяем победу ИИ
+            # Проверяем победу игрока
             if game.check_winner():
                 # Сохраняем лог игры
-                save_game_log(game, session['ai_symbol'], session['user_symbol'], session['ai_symbol'])
+                save_game_log(game, record.user_symbol, record.user_symbol, record.ai_symbol)
                 return jsonify({
                     'success': True,
-                    'board': game.board,
-                    'winner': session['ai_symbol'],
+                    **position_fields(record),
+                    'winner': record.user_symbol,
                     'game_over': True,
-                    'ai_move': [ai_row, ai_col],
                     'move_count': game.move_count
                 })
-        
-        return jsonify({
-            'success': True,
-            'board': game.board,
-            'current_player': game.current_player,
-            'ai_move': ai_move,
-            'move_count': game.move_count
-        })
+            
+            # Проверяем ничью
+            if game.is_board_full():
+                # Сохраняем лог игры (ничья)
+                save_game_log(game, None, record.user_symbol, record.ai_symbol)
+                return jsonify({
+                    'success': True,
+                    **position_fields(record),
+                    'winner': None,
+                    'game_over': True,
+                    'move_count': game.move_count
+                })
+            
+            # Ход ИИ в фоне: ход человека подтверждается сразу
+            if async_requested(data):
+                return submit_ai_turn(record)
+            
+            # Ход ИИ: готовый из обдумывания или новый поиск
+            ai_move = pondered_move(record)
+            if not ai_move:
+                try:
+                    ai_move = compute_ai_move(record)
+                except EngineBusy as e:
+                    return busy_response(record, e)
+            if ai_move:
+                ai_row, ai_col = ai_move
+                logger.info(f"🤖 ИИ пытается сделать ход на ({ai_row}, {ai_col})")
+                logger.info(f"📊 Состояние клетки [{ai_row}][{ai_col}]: '{game.board[ai_row][ai_col]}'")
+                ai_success = record.play(ai_row, ai_col, record.ai_symbol)
+                
+                if not ai_success:
+                    logger.error(f"❌ ИИ не смог сделать ход на ({ai_row}, {ai_col})")
+                    return jsonify({
+                        'success': True,
+                        **position_fields(record),
+                        'current_player': game.current_player,
+                        'ai_move': None,
+                        'move_count': game.move_count,
+                        'error': f'ИИ не смог сделать ход на ({ai_row}, {ai_col})'
+                    })
+                
+                save_game_state(record)
+                
+                # Проверяем победу ИИ
+                if game.check_winner():
+                    # Сохраняем лог игры
+                    save_game_log(game, record.ai_symbol, record.user_symbol, record.ai_symbol)
+                    return jsonify({
+                        'success': True,
+                        **position_fields(record),
+                        'winner': record.ai_symbol,
+                        'game_over': True,
+                        'ai_move': [ai_row, ai_col],
+                        'move_count': game.move_count
+                    })
+                
+                start_pondering(record)
+            
+            return jsonify({
+                'success': True,
+                **position_fields(record),
+                'current_player': game.current_player,
+                'ai_move': ai_move,
+                'move_count': game.move_count
+            })
         
     except Exception as e:
         logger.error(f"❌ Ошибка хода: {e}")
@@ -270,79 +435,151 @@ def make_move():
 def ai_move():
     """Запросить ход ИИ"""
     try:
-        if 'ai_symbol' not in session:
+        record = current_game()
+        if record is None:
             return jsonify({'success': False, 'error': 'Игра не инициализирована'})
         
-        game = get_game_logic()
-        
-        if game.game_over:
-            return jsonify({'success': False, 'error': 'Игра уже окончена'})
-        
-        # Проверяем, что сейчас ход ИИ
-        if game.current_player != session['ai_symbol']:
-            return jsonify({'success': False, 'error': 'Сейчас не ход ИИ'})
-        
-        # Получаем ход ИИ
-        ai = AIPlayer(session['ai_symbol'])
-        ai_move = ai.get_move(game)
-        
-        if not ai_move:
-            return jsonify({'success': False, 'error': 'ИИ не может сделать ход'})
-        
-        # Делаем ход
-        row, col = ai_move
-        success = game.make_move(row, col, session['ai_symbol'])
-        
-        if not success:
-            return jsonify({'success': False, 'error': 'Невозможно сделать ход ИИ'})
-        
-        save_game_state(game)
-        logger.info(f"✅ Ход {session['ai_symbol']} на ({row}, {col}), счетчик: {game.move_count}")
-        
-        # Проверяем победу
-        if game.check_winner():
-            logger.info(f"🏆 Победа игрока {session['ai_symbol']}!")
-            # Сохраняем лог игры
-            save_game_log(game, session['ai_symbol'], session['user_symbol'], session['ai_symbol'])
+        with record.lock:
+            game = record.game
+            
+            if game.game_over:
+                return jsonify({'success': False, 'error': 'Игра уже окончена'})
+            
+            # Проверяем, что сейчас ход ИИ
+            if game.current_player != record.ai_symbol:
+                return jsonify({'success': False, 'error': 'Сейчас не ход ИИ'})
+            
+            if async_requested(request.get_json(silent=True)):
+                return submit_ai_turn(record)
+            
+            # Синхронный ход заменяет фоновый, если он еще идет
+            get_job_manager().cancel_game(record.game_id)
+            
+            # Получаем ход ИИ
+            try:
+                ai_move = compute_ai_move(record)
+            except EngineBusy as e:
+                return busy_response(record, e)
+            
+            if not ai_move:
+                return jsonify({'success': False, 'error': 'ИИ не может сделать ход'})
+            
+            # Делаем ход
+            row, col = ai_move
+            success = record.play(row, col, record.ai_symbol)
+            
+            if not success:
+                return jsonify({'success': False, 'error': 'Невозможно сделать ход ИИ'})
+            
+            save_game_state(record)
+            logger.info(f"✅ Ход {record.ai_symbol} на ({row}, {col}), счетчик: {game.move_count}")
+            
+            # Проверяем победу
+            if game.check_winner():
+                logger.info(f"🏆 Победа игрока {record.ai_symbol}!")
+                # Сохраняем лог игры
+                save_game_log(game, record.ai_symbol, record.user_symbol, record.ai_symbol)
+                return jsonify({
+                    'success': True,
+                    **position_fields(record),
+                    'current_player': game.current_player,
+                    'move_count': game.move_count,
+                    'winner': record.ai_symbol,
+                    'game_over': True
+                })
+            
             return jsonify({
                 'success': True,
-                'board': game.board,
+                **position_fields(record),
                 'current_player': game.current_player,
-                'move_count': game.move_count,
-                'winner': session['ai_symbol'],
-                'game_over': True
+                'move_count': game.move_count
             })
         
-        return jsonify({
-            'success': True,
-            'board': game.board,
-            'current_player': game.current_player,
-            'move_count': game.move_count
-        })
-        
     except Exception as e:
         logger.error(f"❌ Ошибка хода ИИ: {e}")
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/ai_job/<job_id>', methods=['GET'])
+def get_ai_job(job_id):
+    """Состояние фонового хода ИИ; ?wait=секунды - ждать окончания (long-poll)"""
+    try:
+        job = get_job_manager().get(job_id)
+        if job is None or job.game_id != session.get('game_id'):
+            return jsonify({'success': False, 'error': 'Задание не найдено'}), 404
+
+        wait = min(max(request.args.get('wait', 0, type=float), 0), LONG_POLL_MAX)
+        if wait:
+            job.wait(wait)
+        response = job.to_dict()
+        record = current_game()
+        if job.status == 'done' and record is not None:
+            with record.lock:
+                response.update(position_fields(record))
+        response.setdefault('success', job.status != 'failed')
+        return jsonify(response)
+
+    except Exception as e:
+        logger.error(f"❌ Ошибка получения задания ИИ: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/ai_job/<job_id>', methods=['DELETE'])
+def cancel_ai_job(job_id):
+    """Отменить фоновый ход ИИ"""
+    try:
+        job = get_job_manager().get(job_id)
+        if job is None or job.game_id != session.get('game_id'):
+            return jsonify({'success': False, 'error': 'Задание не найдено'}), 404
+
+        return jsonify({'success': True, 'cancelled': get_job_manager().cancel(job_id)})
+
+    except Exception as e:
+        logger.error(f"❌ Ошибка отмены задания ИИ: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/events', methods=['GET'])
+def game_events():
+    """Поток событий партии (SSE): ходы ИИ и человека, конец партии, пересинхронизация
+
+    Позиция клиента - ?since=&checksum= при подключении или Last-Event-ID при
+    переподключении EventSource; с ней первое событие - только недостающие ходы.
+    Если открыто уже GOMOKU_EVENT_STREAMS потоков, ответ 503 с fallback 'long_poll':
+    ход ИИ забирается через /api/ai_job, а потоки gunicorn остаются обычным запросам.
+    """
+    record = current_game()
+    if record is None:
+        return jsonify({'success': False, 'error': 'Игра не инициализирована'}), 404
+
+    since, checksum = parse_event_id(request.headers.get('Last-Event-ID'))
+    if since is None:
+        since, checksum = request.args.get('since', type=int), request.args.get('checksum')
+    try:
+        stream = get_game_channel().stream(record.game_id, since, checksum)
+    except ChannelFull as e:
+        logger.warning(f"⚠️ {e}")
+        return jsonify({'success': False, 'error': str(e), 'fallback': 'long_poll'}), 503
+    return Response(stream, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/game_state', methods=['GET'])
 def get_game_state():
     """Получить текущее состояние игры"""
     try:
-        if 'user_symbol' not in session:
+        record = current_game()
+        if record is None:
             return jsonify({'success': False, 'error': 'Игра не инициализирована'})
         
-        game = get_game_logic()
-        
-        return jsonify({
-            'success': True,
-            'board': game.board,
-            'current_player': game.current_player,
-            'user_symbol': session.get('user_symbol'),
-            'ai_symbol': session.get('ai_symbol'),
-            'move_count': game.move_count,
-            'game_over': game.game_over,
-            'winner': game.winner
-        })
+        with record.lock:
+            game = record.game
+            return jsonify({
+                'success': True,
+                **position_fields(record),
+                'current_player': game.current_player,
+                'user_symbol': record.user_symbol,
+                'ai_symbol': record.ai_symbol,
+                'move_count': game.move_count,
+                'game_over': game.game_over,
+                'winner': game.winner
+            })
         
     except Exception as e:
         logger.error(f"❌ Ошибка получения состояния: {e}")
@@ -373,7 +610,17 @@ def get_game_stats():
                 'ai_win_rate': round(ai_win_rate, 1),
                 'human_win_rate': round(human_win_rate, 1),
                 'draw_rate': round(draw_rate, 1)
-            }
+            },
+            # Кэш ходов ИИ: счетчики этого процесса и число позиций в общем файле
+            'result_cache': get_result_cache().stats(),
+            # Партии на сервере: сколько живых, сколько вытеснено и забыто по простою
+            'game_store': get_game_store().stats(),
+            # Фоновые ходы ИИ: поставлено, выполнено, отменено, с ошибкой и идущие сейчас
+            'ai_jobs': get_job_manager().stats(),
+            # Пул процессов движка: очередь, отказы, облегченные ходы и счетчики каждого процесса
+            'engine_pool': get_engine_pool().stats() if ENGINE_WORKERS else None,
+            # Потоки событий партий (SSE) этого процесса
+            'game_channel': get_game_channel().stats()
         })
         
     except Exception as e:
@@ -0,0 +1,904 @@
+#!/usr/bin/env python3
+"""
+Микро-бенчмарки игровой логики Гомоку
+"""
+
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import timeit
+
+# Бенчмарки вызывают настоящие маршруты app: логи партий, кэш ходов и файл хранилища
+# уходят во временную папку (удаляется при выходе), а не в рабочие файлы рядом с app.py.
+# Переменные задаются до импорта модулей, которые читают их при загрузке.
+_scratch = tempfile.TemporaryDirectory(prefix='gomoku-bench-')
+os.environ['GOMOKU_LOGS_DIR'] = os.path.join(_scratch.name, 'game_logs')
+os.environ['GOMOKU_RESULT_CACHE'] = os.path.join(_scratch.name, 'result_cache.sqlite3')
+os.environ['GOMOKU_GAME_STORE_PATH'] = os.path.join(_scratch.name, 'game_store.sqlite3')
+
+from ai_player import AIPlayer
+from engine_pool import EngineBusy, EnginePool
+from game_logic import GameLogic
+from game_store import GameRecord, MemoryGameStore, SqliteGameStore
+from move_ordering import MoveOrdering
+from numpy_eval import NUMPY_AVAILABLE, NumpyBoardScan
+from opening_book import BOOK_PATH, OpeningBook
+from parallel_search import ParallelSearch, shutdown_pools
+from search import WIN_SCORE, SearchEngine
+from symmetry import SYMMETRY_COUNT, canonical_key, transform, transform_board
+from ponder import CpuBudget, Ponderer
+from patterns import TABLE_SPECS, get_pattern_tables, window_key
+from result_cache import ResultCache
+from threat_search import NO_WIN, UNKNOWN, VCF_DEPTH, VCT_DEPTH, WIN, ThreatSpaceSearch
+from time_manager import HARD_LIMIT, Deadline, TimeManager
+from transposition import EXACT, LOWER, UPPER, TranspositionTable
+
+# Бенчмарк не должен тонуть в логах ходов
+logging.basicConfig(level=logging.WARNING)
+
+
+def random_position(move_count, seed=0):
+    """Случайная позиция без победителя с заданным числом ходов"""
+    rng = random.Random(seed)
+    while True:
+        game = GameLogic()
+        while game.move_count < move_count and not game.game_over:
+            row, col = rng.choice(game.get_valid_moves())
+            game.make_move(row, col)
+        if not game.game_over:
+            return game
+
+
+def bench_win_check(move_counts=(10, 40, 80, 120, 160), number=2000):
+    """Сравнение полной проверки победы с проверкой линий последнего хода"""
+    print("🏁 Проверка победы: полный проход vs последний ход")
+    print(f"{'ходов':>6} {'полный, мкс':>12} {'инкр., мкс':>12} {'ускорение':>10}")
+    for move_count in move_counts:
+        game = random_position(move_count, seed=move_count)
+        row, col = game.last_move
+        player = game.board[row][col]
+
+        full = timeit.timeit(game._scan_winner, number=number) / number
+        incremental = timeit.timeit(
+            lambda: game._check_win_from_position(row, col, player), number=number) / number
+
+        print(f"{move_count:>6} {full * 1e6:>12.2f} {incremental * 1e6:>12.2f} {full / incremental:>9.1f}x")
+
+
+def bench_valid_moves(move_counts=(10, 40, 80, 120, 160), number=2000):
+    """Стоимость get_valid_moves в зависимости от числа фигур на доске"""
+    print("📋 get_valid_moves по поддерживаемому фронту")
+    print(f"{'ходов':>6} {'кандидатов':>11} {'мкс':>8}")
+    for move_count in move_counts:
+        game = random_position(move_count, seed=move_count)
+        candidates = len(game.get_valid_moves())
+        elapsed = timeit.timeit(game.get_valid_moves, number=number) / number
+        print(f"{move_count:>6} {candidates:>11} {elapsed * 1e6:>8.2f}")
+
+
+def bench_hash_consistency(sequences=200, steps=400, seed=1):
+    """Скорость push/pop с обновлением хэша Zobrist (согласованность - test_game_logic.py)"""
+    print("🔑 push/pop с обновлением хэша Zobrist")
+    rng = random.Random(seed)
+    started = timeit.default_timer()
+    operations = 0
+    for _ in range(sequences):
+        game = GameLogic()
+        for _ in range(steps):
+            moves = game.get_valid_moves()
+            if game.move_count and (not moves or rng.random() < 0.4):
+                game.pop()
+            else:
+                row, col = rng.choice(moves)
+                game.push(row, col)
+            operations += 1
+    elapsed = timeit.default_timer() - started
+    print(f"{operations} операций push/pop за {elapsed:.2f}с ({elapsed / operations * 1e6:.1f} мкс на операцию)")
+
+
+def bench_strategic_eval(move_counts=(10, 40, 80), repeats=5):
+    """Время стратегической оценки всех кандидатов (внутренний цикл выбора хода)"""
+    print("🧮 Стратегическая оценка всех кандидатов")
+    print(f"{'ходов':>6} {'кандидатов':>11} {'мс на проход':>13} {'мкс на ход':>11}")
+    for move_count in move_counts:
+        game = random_position(move_count, seed=move_count)
+        ai = AIPlayer(game.current_player)
+        moves = game.get_valid_moves()
+
+        def evaluate_all():
+            for row, col in moves:
+                ai._evaluate_strategic_move(game, row, col)
+
+        elapsed = timeit.timeit(evaluate_all, number=repeats) / repeats
+        print(f"{move_count:>6} {len(moves):>11} {elapsed * 1e3:>13.2f} {elapsed / len(moves) * 1e6:>11.1f}")
+
+
+def window_keys(game, player, idx, half):
+    """Индексы таблиц паттернов для окон вокруг idx по четырем направлениям"""
+    codes = game.line_codes[player]
+    return [window_key(codes[line_id], digit, half) for line_id, digit in game.geometry.line_slots[idx]]
+
+
+def bench_pattern_tables(number=20000):
+    """Таблицы паттернов против сравнения строк (совпадение значений - test_patterns.py)"""
+    print("🧩 Таблицы паттернов vs сравнение строк")
+    tables = get_pattern_tables()
+    ai = AIPlayer('X')
+
+    # Самая тяжелая оценка: линия 13 клеток
+    game = random_position(60, seed=60)
+    row, col = game.get_valid_moves()[0]
+    idx = game.geometry.index(row, col)
+    game.push(row, col)
+    symbol = game.cells[idx]
+    windows = ai.tables.windows[6][idx]
+    line_advanced = tables.line_advanced
+    function = TABLE_SPECS['line_advanced'][2]
+
+    by_string = timeit.timeit(
+        lambda: sum(function(''.join(game.cells[i] for i in window), symbol) for window in windows),
+        number=number) / number
+    by_table = timeit.timeit(
+        lambda: sum(line_advanced[key] for key in window_keys(game, symbol, idx, 6)),
+        number=number) / number
+    print(f"line_advanced, 4 направления: строки {by_string * 1e6:.2f} мкс, "
+          f"таблица {by_table * 1e6:.2f} мкс ({by_string / by_table:.1f}x)")
+
+
+def bench_evaluator_consistency(number=20000):
+    """Скорость push/pop с обновлением инкрементальной оценки (сверка с пересчетом - test_evaluator.py)"""
+    print("📈 push/pop с обновлением инкрементальной оценки")
+    game = random_position(60, seed=60)
+    row, col = game.get_valid_moves()[0]
+
+    def push_pop():
+        game.push(row, col)
+        game.pop()
+
+    elapsed = timeit.timeit(push_pop, number=number) / number
+    print(f"push+pop с обновлением оценки: {elapsed * 1e6:.2f} мкс")
+
+
+def selfplay_positions(games=6, opening=4, seed=5):
+    """Позиции партий ИИ против самого себя после нескольких случайных ходов
+
+    Партии играются быстрыми эвристиками без поиска (max_depth=1).
+    """
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(games):
+        game = GameLogic()
+        while not game.game_over and game.move_count < 120:
+            if game.move_count < opening:
+                row, col = rng.choice(game.get_valid_moves())
+            else:
+                positions.append([cells[:] for cells in game.board])
+                random.seed(len(positions))
+                row, col = AIPlayer(game.current_player, max_depth=1).get_move(game)
+            game.make_move(row, col)
+    return positions
+
+
+def load_position(board):
+    """GameLogic с доской board; очередь хода - по числу фигур"""
+    game = GameLogic()
+    game.board = board
+    game.move_count = sum(cell != '.' for cells in board for cell in cells)
+    game.current_player = 'X' if game.move_count % 2 == 0 else 'O'
+    return game
+
+
+def bench_get_move(games=6, max_depth=1):
+    """Время AIPlayer.get_move на позициях из партий ИИ против самого себя"""
+    print(f"🤖 AIPlayer.get_move (max_depth={max_depth}) на позициях партий ИИ")
+    elapsed = 0
+    positions = selfplay_positions(games)
+    for i, board in enumerate(positions):
+        game = load_position(board)
+        random.seed(i)
+        started = timeit.default_timer()
+        AIPlayer(game.current_player, max_depth=max_depth).get_move(game)
+        elapsed += timeit.default_timer() - started
+    print(f"{len(positions)} позиций: {elapsed / len(positions) * 1e3:.2f} мс на ход")
+
+
+def bench_numpy_backend(positions=40, seed=6, number=200):
+    """NumPy-просмотр доски против инкрементальной оценки: время (совпадение ответов - test_numpy_eval.py)"""
+    print("🔢 Оценка окон: NumPy vs Python")
+    if not NUMPY_AVAILABLE:
+        print("⚠️ NumPy не установлен, бенчмарк пропущен")
+        return
+    rng = random.Random(seed)
+    games = [random_position(rng.randrange(5, 120), seed=rng.randrange(1 << 30)) for _ in range(positions)]
+
+    print(f"{'ходов':>6} {'кандидатов':>11} {'Python, мкс':>12} {'NumPy, мкс':>11}")
+    for game in games[:6]:
+        indices = [game.geometry.index(row, col) for row, col in game.get_valid_moves()]
+
+        def by_python():
+            for player in ('X', 'O'):
+                game.evaluator.window_sums('threat_features', player, indices)
+
+        def by_numpy():
+            scan = NumpyBoardScan(game)
+            for player in ('X', 'O'):
+                scan.window_sums('threat_features', player, indices)
+
+        python_time = timeit.timeit(by_python, number=number) / number
+        numpy_time = timeit.timeit(by_numpy, number=number) / number
+        print(f"{game.move_count:>6} {len(indices):>11} {python_time * 1e6:>12.1f} {numpy_time * 1e6:>11.1f}")
+
+    # Весь ход ИИ с каждым источником оценок
+    for backend in ('python', 'numpy'):
+        started = timeit.default_timer()
+        for i, game in enumerate(games):
+            random.seed(i)
+            AIPlayer(game.current_player, backend=backend).get_move(game)
+        elapsed = timeit.default_timer() - started
+        print(f"get_move ({backend}): {elapsed / len(games) * 1e3:.2f} мс на ход")
+
+
+def bench_search(positions=8, max_depth=6, max_time=3.0):
+    """Итеративное углубление alpha-beta: достигнутая глубина и узлы в секунду"""
+    print("🔍 Поиск alpha-beta с итеративным углублением")
+    print(f"{'ходов':>6} {'глубина':>8} {'узлов':>8} {'с':>6} {'узлов/с':>9} {'ход':>9}")
+    boards = selfplay_positions()
+    for board in boards[::max(1, len(boards) // positions)][:positions]:
+        game = load_position(board)
+        move_count = game.move_count
+        before = (game.position_hash, game.move_count, game.current_player, game.evaluator.totals.copy())
+        result = SearchEngine(max_depth, max_time).search(game)
+        after = (game.position_hash, game.move_count, game.current_player, game.evaluator.totals)
+        assert before == after, "поиск не вернул позицию в исходное состояние"
+        print(f"{move_count:>6} {result.depth:>8} {result.nodes:>8} {result.elapsed:>6.2f} "
+              f"{result.nodes_per_second:>9.0f} {str(result.move):>9}")
+
+
+def bench_transposition(positions=8, max_depth=5, entries=1 << 16):
+    """Таблица транспозиций: упаковка записей, замещение и выигрыш в узлах поиска"""
+    print("🗃️ Таблица транспозиций")
+    rng = random.Random(12)
+    table = TranspositionTable(entries)
+    size = table.size
+    for _ in range(2000):
+        key = rng.getrandbits(64)
+        entry = (rng.randrange(64), rng.choice((EXACT, LOWER, UPPER)),
+                 rng.randrange(-WIN_SCORE - 1, WIN_SCORE + 2), rng.choice((None, rng.randrange(1024))))
+        table.store(key, *entry)
+        assert table.probe(key) == entry, "запись прочитана не так, как сохранена"
+
+    # Корзина 0 удерживает более глубокую запись, корзина 1 принимает остальные
+    table = TranspositionTable(entries)
+    deep, shallow, other = 1, 1 + (table.mask + 1), 1 + 2 * (table.mask + 1)
+    table.store(deep, 8, EXACT, 1)
+    table.store(shallow, 2, EXACT, 2)
+    table.store(other, 3, EXACT, 3)
+    assert table.probe(deep) is not None and table.probe(shallow) is None and table.probe(other) is not None
+    assert table.size == size, "размер таблицы не должен меняться"
+    print(f"✅ Упаковка и замещение: {table.size} записей, {2 * table.size * 8 // 1024} КБ")
+
+    print(f"{'ходов':>6} {'узлов без':>10} {'с таблицей':>11} {'с без':>6} {'с с':>6} {'попадания':>10} {'заполнено':>10}")
+    boards = selfplay_positions()
+    table = TranspositionTable(entries)
+    for board in boards[::max(1, len(boards) // positions)][:positions]:
+        game = load_position(board)
+        plain = SearchEngine(max_depth, 60.0).search(game)
+        engine = SearchEngine(max_depth, 60.0, table=table)
+        cached = engine.search(game)
+        stats = engine.table_stats
+        print(f"{game.move_count:>6} {plain.nodes:>10} {cached.nodes:>11} {plain.elapsed:>6.2f} {cached.elapsed:>6.2f} "
+              f"{stats['hit_rate']:>10.1%} {stats['fill']:>10.1%}")
+
+
+def bench_threat_search(games=6):
+    """Поиск угроз VCF/VCT: итоги, узлы и время (проверки линий - в test_threat_search.py)"""
+    print("⚔️ Поиск угроз VCF/VCT")
+    print(f"{'вид':>4} {'решений':>8} {'побед':>6} {'нет':>6} {'бюджет':>7} {'узлов ср':>9} {'мс ср':>7} {'мс макс':>8}")
+    boards = selfplay_positions(games=games)
+    for kind, depth, threes in (('VCF', VCF_DEPTH, False), ('VCT', VCT_DEPTH, True)):
+        statuses = {WIN: 0, NO_WIN: 0, UNKNOWN: 0}
+        nodes, times = 0, []
+        for board in boards:
+            for attacker in ('X', 'O'):
+                result = ThreatSpaceSearch().solve(load_position(board), attacker, depth, threes)
+                statuses[result.status] += 1
+                nodes += result.nodes
+                times.append(result.elapsed)
+        print(f"{kind:>4} {len(times):>8} {statuses[WIN]:>6} {statuses[NO_WIN]:>6} {statuses[UNKNOWN]:>7} "
+              f"{nodes / len(times):>9.0f} {1000 * sum(times) / len(times):>7.1f} {1000 * max(times):>8.1f}")
+
+
+class GainOrdering(MoveOrdering):
+    """Порядок до слоя MoveOrdering: только прирост оценки"""
+
+    def order(self, game, player, indices, width, ply, hash_move=None):
+        gain = game.evaluator.gain
+        scored = sorted(((gain(idx, player), idx) for idx in indices), reverse=True)
+        return [idx for _, idx in scored[:width]]
+
+
+def bench_move_ordering(positions=8, max_depth=6):
+    """Порядок ходов: узлы и доля отсечений первым ходом против порядка только по приросту"""
+    print("🧭 Порядок ходов: хэш-ход, угрозы, киллеры, история")
+    print(f"{'ходов':>6} {'узлов (прирост)':>16} {'узлов (слой)':>13} {'1-й ход (прирост)':>18} {'1-й ход (слой)':>15}")
+    boards = selfplay_positions()
+    totals = [0, 0]
+    for board in boards[::max(1, len(boards) // positions)][:positions]:
+        game = load_position(board)
+        plain = SearchEngine(max_depth, 60.0, ordering=GainOrdering()).search(game)
+        layered = SearchEngine(max_depth, 60.0, ordering=MoveOrdering()).search(game)
+        totals[0] += plain.nodes
+        totals[1] += layered.nodes
+        print(f"{game.move_count:>6} {plain.nodes:>16} {layered.nodes:>13} "
+              f"{plain.first_move_cutoff_rate:>18.1%} {layered.first_move_cutoff_rate:>15.1%}")
+    print(f"✅ Всего узлов: {totals[0]} -> {totals[1]} ({totals[1] / totals[0] - 1:+.1%})")
+
+
+def bench_parallel_search(positions=4, max_depth=12, max_time=2.0, worker_counts=(1, 2, 4, 8)):
+    """Параллельный поиск: глубина, достигнутая за max_time при 1/2/4/8 процессах"""
+    print(f"🧵 Параллельный поиск с разделением корня (ядер: {os.cpu_count()}, время {max_time}с)")
+    print(f"{'процессов':>10} {'глубина ср':>11} {'глубины':>16} {'узлов ср':>9} {'с ср':>6}")
+    boards = selfplay_positions()
+    boards = boards[::max(1, len(boards) // positions)][:positions]
+    for workers in worker_counts:
+        depths, nodes, elapsed = [], 0, 0.0
+        for board in boards:
+            game = load_position(board)
+            before = (game.position_hash, game.move_count)
+            result = ParallelSearch(max_depth, max_time, workers, table=TranspositionTable(1 << 16)).search(game)
+            assert before == (game.position_hash, game.move_count), "поиск изменил позицию"
+            assert result.elapsed <= max_time + 0.5, f"ход за {result.elapsed:.2f}с при max_time {max_time}с"
+            depths.append(result.depth)
+            nodes += result.nodes
+            elapsed += result.elapsed
+        shutdown_pools()
+        print(f"{workers:>10} {sum(depths) / len(depths):>11.1f} {str(depths):>16} "
+              f"{nodes // len(boards):>9} {elapsed / len(boards):>6.2f}")
+
+
+def bench_ponder(positions=4, cpu_share=0.5):
+    """Обдумывание: ответ на предсказанный ход из готового результата против обычного get_move"""
+    print("💭 Обдумывание на ходу человека")
+    print(f"{'ходов':>6} {'ответ человека':>15} {'из обдумывания, мс':>19} {'get_move, мс':>13} {'совпал':>7}")
+    ponderer = Ponderer(CpuBudget(cpu_share))
+    boards = selfplay_positions()
+    for n, board in enumerate(boards[::max(1, len(boards) // positions)][:positions]):
+        game = load_position(board)
+        symbol = 'O' if game.current_player == 'X' else 'X'
+        game_id = f'bench-{n}'
+        ponderer.start(game_id, game, symbol)
+        ponderer.wait_idle(timeout=60)
+
+        idx = MoveOrdering().order(game, game.current_player, game.frontier, 1, 0)[0]
+        row, col = game.geometry.coords(idx)
+        game.make_move(row, col)
+        start = time.time()
+        pondered = ponderer.take(game_id, game.position_hash)
+        warm = time.time() - start
+        start = time.time()
+        fresh = AIPlayer(symbol).get_move(game)
+        cold = time.time() - start
+        print(f"{game.move_count:>6} {str((row, col)):>15} {1000 * warm:>19.1f} {1000 * cold:>13.0f} "
+              f"{str(pondered == fresh):>7}")
+    spent = ponderer.budget.capacity - ponderer.budget.available()
+    assert spent <= ponderer.budget.capacity + AIPlayer('X').max_time, "обдумывание вышло за бюджет"
+    print(f"✅ Потрачено на обдумывание {spent:.1f}с процессора из {ponderer.budget.capacity:.0f}с окна")
+
+
+def bench_latency(positions=40, load=8, slack=0.5):
+    """Задержка get_move под нагрузкой: load потоков одновременно, сроки хода от TimeManager"""
+    print(f"⏱️ Задержка get_move: {load} потоков одновременно")
+    boards = selfplay_positions()
+    boards = boards[::max(1, len(boards) // positions)][:positions]
+    latencies = []
+    overruns = []
+    lock = threading.Lock()
+
+    def worker(worker_boards):
+        for board in worker_boards:
+            game = load_position(board)
+            ai = AIPlayer(game.current_player)
+            started = time.monotonic()
+            move = ai.get_move(game)
+            latency = time.monotonic() - started
+            assert move is not None and game.is_valid_move(*move), f"нет допустимого хода: {move}"
+            hard = ai.last_deadline.hard_at - ai.last_deadline.start
+            with lock:
+                latencies.append(latency)
+                overruns.append(latency - hard)
+
+    threads = [threading.Thread(target=worker, args=(boards[i::load],)) for i in range(load)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    budgets = [TimeManager(AIPlayer('X').max_time).deadline(load_position(board)) for board in boards]
+    soft = sorted(d.soft_at - d.start for d in budgets)
+    print(f"{len(latencies)} ходов: p50 {p50:.2f}с, p99 {p99:.2f}с, максимум {latencies[-1]:.2f}с; "
+          f"мягкий срок {soft[0]:.2f}-{soft[-1]:.2f}с, предел {HARD_LIMIT:.0f}с")
+    assert max(overruns) <= slack, f"ход вышел за жесткий срок на {max(overruns):.2f}с"
+    print(f"✅ Все ходы уложились в жесткий срок (наибольший выход {max(overruns):+.2f}с)")
+
+
+def symmetric_copy(game, symmetry):
+    """Копия позиции game после симметрии доски номер symmetry"""
+    copy = GameLogic(game.board_size)
+    copy.board = transform_board(game.board, symmetry)
+    copy.current_player = game.current_player
+    copy.move_count = game.move_count
+    return copy
+
+
+def bench_opening_book(games=40, replies=3, seed=8):
+    """Дебютная книга: покрытие ходов ИИ по числу фигур, время поиска, одинаковый ответ на симметричные копии"""
+    print(f"📚 Дебютная книга ({games} партий, человек выбирает из {replies} вероятных ходов)")
+    book = OpeningBook(BOOK_PATH)
+    if not len(book):
+        print(f"⚠️ Книга {BOOK_PATH} не найдена: python build_opening_book.py")
+        return
+    rng = random.Random(seed)
+    totals, hits = {}, {}
+    lookups, elapsed = 0, 0.0
+    for n in range(games):
+        game = GameLogic()
+        ai_symbol = 'XO'[n % 2]
+        ai = AIPlayer(ai_symbol, opening_book=book)
+        while game.move_count <= book.max_stones and not game.game_over:
+            if game.current_player == ai_symbol:
+                started = timeit.default_timer()
+                move = book.lookup(game)
+                elapsed += timeit.default_timer() - started
+                lookups += 1
+                totals[game.move_count] = totals.get(game.move_count, 0) + 1
+                if move is None:
+                    break
+                # Ход книги действительно играется ИИ, а не только находится в ней
+                played = ai.get_move(game)
+                assert played == move, f"get_move сыграл {played} вместо хода книги {move}"
+                hits[game.move_count] = hits.get(game.move_count, 0) + 1
+                # У симметричной позиции ответ может отличаться, но давать ту же позицию
+                for symmetry in range(8):
+                    copy = symmetric_copy(game, symmetry)
+                    expected = transform(*move, game.board_size, symmetry)
+                    found = book.lookup(copy)
+                    assert found is not None, f"симметрия {symmetry}: позиции нет в книге"
+                    with copy.temporary_move(*expected):
+                        expected_key = canonical_key(copy)[0]
+                    with copy.temporary_move(*found):
+                        assert canonical_key(copy)[0] == expected_key, \
+                            f"симметрия {symmetry}: {found} вместо {expected}"
+            elif game.move_count == 0:
+                move = (game.board_size // 2, game.board_size // 2)
+            else:
+                indices = MoveOrdering().order(game, game.current_player, game.frontier, replies, 0)
+                move = game.geometry.coords(rng.choice(indices))
+            game.make_move(*move)
+    print(f"{'фигур':>6} {'позиций':>8} {'в книге':>8}")
+    for stones in sorted(totals):
+        print(f"{stones:>6} {totals[stones]:>8} {hits.get(stones, 0):>8}")
+    print(f"✅ {len(book)} позиций в книге, поиск {elapsed / lookups * 1e6:.1f} мкс, "
+          f"ответы на 8 симметричных копий совпадают")
+
+
+def bench_symmetry(games=6, seed=9):
+    """Канонизация позиций: время и сколько дублей убирается (проверки - в test_symmetry.py)"""
+    print("🪞 Канонизация позиций по 8 симметриям доски")
+    rng = random.Random(seed)
+    boards = selfplay_positions(games)
+    keys, canonical = set(), set()
+    for board in boards:
+        game = load_position(board)
+        # Одна позиция у разных игроков: три случайно повернутые копии
+        for _ in range(3):
+            copy = symmetric_copy(game, rng.randrange(SYMMETRY_COUNT))
+            keys.add(copy.position_hash)
+            canonical.add(canonical_key(copy)[0])
+
+    game = load_position(boards[len(boards) // 2])
+    number = 20000
+    elapsed = timeit.timeit(lambda: canonical_key(game), number=number)
+    print(f"{len(boards)} позиций по 3 случайных копии: {len(keys)} разных хэшей, "
+          f"{len(canonical)} канонических ключей")
+    print(f"✅ canonical_key: {elapsed / number * 1e6:.2f} мкс на вызов")
+
+
+def bench_result_cache(sessions=12, games=3, seed=10):
+    """Кэш результатов: одни и те же партии в разных сессиях (с поворотами доски), время попадания
+
+    Общий файл, TTL и LRU-вытеснение проверяются в test_result_cache.py.
+    """
+    print(f"♻️ Кэш результатов: {sessions} сессий повторяют {games} партии")
+    rng = random.Random(seed)
+    boards = selfplay_positions(games)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'cache.sqlite3')
+        cache = ResultCache(path)
+        search_time = hit_time = 0.0
+        for _ in range(sessions):
+            symmetry = rng.randrange(SYMMETRY_COUNT)
+            for n, board in enumerate(boards):
+                game = symmetric_copy(load_position(board), symmetry)
+                ai = AIPlayer(game.current_player, max_depth=1)
+                started = timeit.default_timer()
+                move = cache.get(game, ai.symbol, ai.config_key)
+                if move is not None:
+                    hit_time += timeit.default_timer() - started
+                    continue
+                random.seed(n)
+                move = ai.get_move(game)
+                search_time += timeit.default_timer() - started
+                cache.put(game, ai.symbol, ai.config_key, move)
+        stats = cache.stats()
+        print(f"{stats['hits'] + stats['misses']} ходов: попадания {stats['hit_rate']:.0%}, "
+              f"{stats['entries']} позиций; get_move {1e3 * search_time / stats['misses']:.2f} мс, "
+              f"из кэша {1e3 * hit_time / stats['hits']:.2f} мс")
+
+
+def bench_game_store(games=3, number=200):
+    """Хранилище партий: размер cookie и цена запроса против доски в сессии, восстановление из SQLite
+
+    LRU, простой и повтор партии другим процессом проверяются в test_game_store.py.
+    """
+    from app import app
+
+    print("🗄️ Хранилище партий на сервере против доски в cookie-сессии")
+    serializer = app.session_interface.get_signing_serializer(app)
+    records = []
+    for board in selfplay_positions(games)[::10]:
+        record = GameRecord('X')
+        source = load_position(board)
+        for row, cells in enumerate(board):
+            for col, cell in enumerate(cells):
+                if cell != '.':
+                    record.game.push(row, col, cell)
+                    record.moves.append((row, col, cell))
+        assert record.game.position_hash == source.position_hash
+        records.append(record)
+
+    store = MemoryGameStore()
+    for record in records:
+        store.put(record)
+    print(f"{'ходов':>6} {'cookie было, Б':>15} {'стало, Б':>9} {'запрос было, мс':>16} {'стало, мс':>10}")
+    for record in records:
+        game = record.game
+        state = {'game_board': game.board, 'current_player': game.current_player, 'move_count': game.move_count,
+                 'game_over': game.game_over, 'winner': game.winner, 'user_symbol': 'X', 'ai_symbol': 'O',
+                 'game_id': record.game_id, 'ai_time_used': 0.0}
+        cookie = serializer.dumps(state)
+
+        def from_cookie():
+            saved = serializer.loads(cookie)
+            rebuilt = GameLogic()
+            rebuilt.board = saved['game_board']
+            rebuilt.current_player = saved['current_player']
+            rebuilt.move_count = saved['move_count']
+            return serializer.dumps(dict(saved, game_board=rebuilt.board))
+
+        def from_store():
+            session_cookie = serializer.loads(serializer.dumps({'game_id': record.game_id}))
+            return store.get(session_cookie['game_id'])
+
+        old = timeit.timeit(from_cookie, number=number) / number
+        new = timeit.timeit(from_store, number=number) / number
+        print(f"{game.move_count:>6} {len(cookie):>15} {len(serializer.dumps({'game_id': record.game_id})):>9} "
+              f"{old * 1e3:>16.3f} {new * 1e3:>10.3f}")
+
+    # Общий файл: партия другого процесса восстанавливается повтором ходов
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'games.sqlite3')
+        writer, reader = SqliteGameStore(path), SqliteGameStore(path)
+        record = records[-1]
+        writer.put(record)
+
+        def reload():
+            reader.memory.delete(record.game_id)
+            return reader.get(record.game_id)
+
+        replay = timeit.timeit(reload, number=number) / number
+        live = timeit.timeit(lambda: reader.get(record.game_id), number=number) / number
+        print(f"✅ SQLite, {len(record.moves)} ходов: восстановление {replay * 1e3:.3f} мс, "
+              f"живая партия процесса {live * 1e3:.3f} мс")
+
+
+def bench_ai_jobs(players=4, moves=3, seed=11):
+    """Фоновые ходы ИИ: подтверждение хода человека, пока ИИ других партий думает, и отмена"""
+    from app import app
+
+    print(f"🧾 Ход человека при {players} партиях одновременно: ход ИИ в запросе против фонового")
+    print(f"{'режим':>8} {'подтверждение p50, мс':>22} {'максимум, мс':>13} {'ход ИИ p50, с':>14}")
+    for mode in (False, True):
+        acks = []
+        replies = []
+        lock = threading.Lock()
+
+        def player(n):
+            rng = random.Random(seed + n)
+            client = app.test_client()
+            client.post('/api/new_game', json={'symbol': 'X'})
+            row, col = 7, 7
+            for _ in range(moves):
+                started = time.monotonic()
+                data = client.post('/api/make_move', json={'row': row, 'col': col, 'async': mode}).get_json()
+                ack = time.monotonic() - started
+                assert data['success'], data
+                if data.get('ai_job'):
+                    data = client.get(f"/api/ai_job/{data['ai_job']}?wait=20").get_json()
+                    assert data['status'] == 'done', data
+                reply = time.monotonic() - started
+                with lock:
+                    acks.append(ack)
+                    replies.append(reply)
+                if data.get('game_over'):
+                    break
+                game = load_position(data['board'])
+                row, col = rng.choice(game.get_valid_moves())
+
+        threads = [threading.Thread(target=player, args=(n,)) for n in range(players)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        acks.sort()
+        replies.sort()
+        print(f"{'фон' if mode else 'запрос':>8} {1000 * acks[len(acks) // 2]:>22.1f} {1000 * acks[-1]:>13.1f} "
+              f"{replies[len(replies) // 2]:>14.2f}")
+
+    # Новая партия отменяет фоновый ход прежней, и он не попадает в доску
+    client = app.test_client()
+    client.post('/api/new_game', json={'symbol': 'X'})
+    client.post('/api/make_move', json={'row': 7, 'col': 7})
+    job = client.post('/api/make_move', json={'row': 6, 'col': 8, 'async': True}).get_json()['ai_job']
+    started = time.monotonic()
+    assert client.delete(f'/api/ai_job/{job}').get_json()['success']
+    status = client.get(f'/api/ai_job/{job}?wait=20').get_json()['status']
+    state = client.get('/api/game_state').get_json()
+    assert status == 'cancelled' and state['move_count'] == 3, (status, state['move_count'])
+    print(f"✅ Отмененный ход остановлен за {time.monotonic() - started:.2f}с и не сделан")
+
+
+def bench_engine_pool(positions=16, load=8, workers=2, slack=0.5):
+    """Пул движка: load одновременных ходов в потоках веб-сервера против процессов пула, переполнение"""
+    print(f"🏭 {load} одновременных ходов: потоки веб-сервера против пула из {workers} процессов")
+    print(f"{'режим':>10} {'p50, с':>7} {'p99, с':>7} {'ходов/с':>8} {'облегч.':>8} {'отказов':>8}")
+    boards = selfplay_positions()
+    boards = boards[::max(1, len(boards) // positions)][:positions]
+
+    def run(move_function):
+        latencies = []
+        overruns = []
+        lock = threading.Lock()
+
+        def worker(worker_boards):
+            for board in worker_boards:
+                game = load_position(board)
+                deadline = TimeManager(AIPlayer('X').max_time).deadline(game)
+                started = time.monotonic()
+                move = move_function(game, deadline)
+                with lock:
+                    if move is not None:
+                        assert game.is_valid_move(*move), f"недопустимый ход {move}"
+                        latencies.append(time.monotonic() - started)
+                        overruns.append(time.monotonic() - deadline.hard_at)
+
+        threads = [threading.Thread(target=worker, args=(boards[i::load],)) for i in range(load)]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        latencies.sort()
+        return latencies, overruns, time.monotonic() - started
+
+    def report(name, latencies, elapsed, degraded=0, rejected=0):
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"{name:>10} {latencies[len(latencies) // 2]:>7.2f} {p99:>7.2f} {len(latencies) / elapsed:>8.1f} "
+              f"{degraded:>8} {rejected:>8}")
+
+    latencies, overruns, elapsed = run(lambda game, deadline: AIPlayer(game.current_player).get_move(game, deadline))
+    report('потоки', latencies, elapsed)
+
+    for overflow in ('fast', 'reject'):
+        pool = EnginePool(workers, queue_size=workers, overflow=overflow)
+
+        def pooled(game, deadline):
+            try:
+                return pool.get_move(game, game.current_player, deadline).move
+            except EngineBusy:
+                return None
+
+        latencies, overruns, elapsed = run(pooled)
+        stats = pool.stats()
+        report(f"пул/{overflow}", latencies, elapsed, stats['degraded'], stats['rejected'])
+        assert max(overruns) <= slack, f"ход пула вышел за жесткий срок на {max(overruns):.2f}с"
+        assert stats['submitted'] + stats['rejected'] + stats['degraded'] >= len(boards)
+        assert (stats['rejected'] > 0) == (overflow == 'reject'), "переполнение обработано не по настройке"
+        for index, worker_stats in enumerate(stats['per_worker']):
+            print(f"    процесс {index}: ходов {worker_stats['jobs']}, занят {worker_stats['busy_seconds']:.2f}с, "
+                  f"в среднем {worker_stats['avg_ms']:.0f} мс")
+
+        # Отмена: процесс прерывает поиск спокойной позиции и освобождается для следующего хода
+        game = random_position(8, seed=8)
+        stop_event = threading.Event()
+        threading.Timer(0.2, stop_event.set).start()
+        started = time.monotonic()
+        result = pool.get_move(game, game.current_player, Deadline(5.0, 8.0), stop_event=stop_event)
+        while pool.stats()['running'] and time.monotonic() - started < 5.0:
+            time.sleep(0.01)
+        cancelled = time.monotonic() - started - 0.2
+        assert result.move is None and cancelled < 0.5, f"отмененный поиск освободил процесс за {cancelled:.2f}с"
+        pool.shutdown()
+    print(f"✅ Ходы пула уложились в жесткий срок, отмененный поиск освобождает процесс за {cancelled:.2f}с")
+
+
+def bench_delta(games=3, number=200):
+    """Протокол дельт: размер и цена поля позиции в ответе против всей доски (проверки - в test_delta.py)"""
+    from flask import json
+
+    from app import app, position_fields
+
+    print("🧩 Ответ с ходами после хода клиента против всей доски")
+    print(f"{'ходов':>6} {'доска, Б':>9} {'дельта, Б':>10} {'экономия':>9} {'доска, мкс':>11} {'дельта, мкс':>12}")
+    for board in selfplay_positions(games)[::12]:
+        record = GameRecord('X')
+        for row, cells in enumerate(board):
+            for col, cell in enumerate(cells):
+                if cell != '.':
+                    record.game.push(row, col, cell)
+                    record.moves.append((row, col, cell))
+        # Клиент отстает на два хода: свой ход и ответ ИИ
+        since = max(0, len(record.moves) - 2)
+        client = {'since': since, 'checksum': record.checksum(since)}
+
+        def response(body):
+            with app.test_request_context(json=body):
+                fields = position_fields(record)
+                return fields, json.dumps(fields)
+
+        _, full_text = response({})
+        _, delta_text = response(client)
+
+        full_time = timeit.timeit(lambda: response({}), number=number) / number
+        delta_time = timeit.timeit(lambda: response(client), number=number) / number
+        print(f"{len(record.moves):>6} {len(full_text):>9} {len(delta_text):>10} "
+              f"{1 - len(delta_text) / len(full_text):>8.0%} {full_time * 1e6:>11.0f} {delta_time * 1e6:>12.0f}")
+
+
+def read_events(client, query, events):
+    """Читать поток событий /api/events в очередь events: (событие, данные)"""
+    import json
+
+    buffer = ''
+    for chunk in client.get(f'/api/events{query}', buffered=False).response:
+        buffer += chunk.decode() if isinstance(chunk, bytes) else chunk
+        while '\n\n' in buffer:
+            block, buffer = buffer.split('\n\n', 1)
+            fields = dict(line.split(': ', 1) for line in block.split('\n') if not line.startswith(':'))
+            if 'event' in fields:
+                events.put((fields['event'], json.loads(fields['data'])))
+
+
+def bench_game_channel(moves=6, seed=12):
+    """Канал событий партии: ход ИИ приходит сам, без запроса на каждый ход; позиция сходится
+
+    Время думания ИИ зависит от позиции, а не от способа доставки, поэтому
+    сравнивается доставка: от конца задания ИИ до получения хода клиентом.
+    """
+    import queue
+
+    from ai_jobs import get_job_manager
+    from app import app
+    from game_channel import get_game_channel
+
+    print("📡 Ход ИИ по каналу событий (SSE) против long-poll задания")
+    print(f"{'режим':>10} {'запросов на ход':>16} {'доставка p50, мс':>17} {'максимум, мс':>13}")
+    for offset, mode in enumerate(('long-poll', 'sse')):
+        # Разные партии: иначе второй режим получил бы ходы ИИ из кэша ходов первого
+        rng = random.Random(seed + offset)
+        client = app.test_client()
+        client.post('/api/new_game', json={'symbol': 'X'})
+        events = queue.Queue()
+        if mode == 'sse':
+            listener = app.test_client()
+            listener.set_cookie('session', client.get_cookie('session').value)
+            threading.Thread(target=read_events, args=(listener, '?since=0', events), daemon=True).start()
+        board = [['.'] * 15 for _ in range(15)]
+        requests = 0
+        deliveries = []
+        row, col = 7, 7 + offset
+        for _ in range(moves):
+            data = client.post('/api/make_move', json={'row': row, 'col': col, 'async': True}).get_json()
+            requests += 1
+            assert data.get('ai_job'), f"{mode}: ход не поставлен в фон: {data}"
+            job = get_job_manager().get(data['ai_job'])
+            # Ответ ИИ - первое событие, в котором ходов больше, чем после хода человека
+            expected = data['move_count'] + 1
+            if mode == 'sse':
+                while True:
+                    event, data = events.get(timeout=30)
+                    for cell_row, cell_col, player in data.get('moves', []):
+                        board[cell_row][cell_col] = player
+                    if data.get('move_count', 0) >= expected:
+                        break
+                # Событие game_over идет следом за ходом; конец партии виден и по доске
+                game_over = load_position(board)._scan_winner()
+            else:
+                data = client.get(f"/api/ai_job/{data['ai_job']}?wait=20").get_json()
+                requests += 1
+                board = data['board']
+                game_over = data.get('game_over')
+            arrived = time.monotonic()
+            # Ход в партии делается до конца задания: событие может прийти чуть раньше него
+            job.wait(5)
+            deliveries.append(max(0.0, arrived - job.finished_at))
+            if game_over:
+                break
+            row, col = rng.choice(load_position(board).get_valid_moves())
+        state = client.get('/api/game_state').get_json()
+        assert state['board'] == board, f"{mode}: позиция клиента разошлась с сервером"
+        deliveries.sort()
+        print(f"{mode:>10} {requests / len(deliveries):>16.1f} {1000 * deliveries[len(deliveries) // 2]:>17.1f} "
+              f"{1000 * deliveries[-1]:>13.1f}")
+        client.post('/api/new_game', json={'symbol': 'X'})
+    print("✅ Позиция из событий канала совпала с /api/game_state")
+
+    # Сверх предела потоков событий - 503 с переходом на long-poll, а не зависший запрос
+    channel = get_game_channel()
+    limit, channel.limit = channel.limit, channel.streams
+    try:
+        client = app.test_client()
+        client.post('/api/new_game', json={'symbol': 'X'})
+        response = client.get('/api/events')
+        assert response.status_code == 503 and response.get_json()['fallback'] == 'long_poll', \
+            f"поток сверх предела: {response.status_code}"
+    finally:
+        channel.limit = limit
+    print(f"✅ Сверх предела ({limit} потоков) канал отвечает 503 с fallback long_poll")
+
+
+BENCHMARKS = {
+    'win': bench_win_check,
+    'moves': bench_valid_moves,
+    'hash': bench_hash_consistency,
+    'eval': bench_strategic_eval,
+    'patterns': bench_pattern_tables,
+    'evaluator': bench_evaluator_consistency,
+    'move': bench_get_move,
+    'numpy': bench_numpy_backend,
+    'search': bench_search,
+    'tt': bench_transposition,
+    'threats': bench_threat_search,
+    'ordering': bench_move_ordering,
+    'parallel': bench_parallel_search,
+    'ponder': bench_ponder,
+    'latency': bench_latency,
+    'book': bench_opening_book,
+    'symmetry': bench_symmetry,
+    'cache': bench_result_cache,
+    'store': bench_game_store,
+    'jobs': bench_ai_jobs,
+    'engine': bench_engine_pool,
+    'delta': bench_delta,
+    'channel': bench_game_channel,
+}
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"❌ Неизвестный бенчмарк: {name}. Доступны: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        BENCHMARKS[name]()
+        print("=" * 50)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Построение дебютной книги (opening_book.bin) поиском ИИ
+
+Для каждой стороны ИИ разворачивается дерево дебютов: в позициях, где ходит ИИ,
+записывается ход AIPlayer с увеличенным временем на ход и дальше идет только он;
+в позициях, где ходит человек, перебираются его самые вероятные ответы (по
+MoveOrdering). Симметричные позиции считаются один раз.
+
+Запуск: python build_opening_book.py [фигур] [ответов человека] [секунд на ход]
+"""
+
+import logging
+import sys
+import time
+
+from ai_player import AIPlayer
+from game_logic import GameLogic
+from move_ordering import MoveOrdering
+from opening_book import BOOK_PATH, OpeningBook, write_book
+from symmetry import canonical_key, inverse_transform, transform
+from time_manager import Deadline
+
+logger = logging.getLogger(__name__)
+
+# Позиции книги: до BOOK_STONES фигур на доске, то есть ответы ИИ до 13-го полухода
+BOOK_STONES = 12
+# Сколько ответов человека разворачивается в каждой его позиции
+BOOK_REPLIES = 4
+# Время поиска на одну позицию книги
+BOOK_SECONDS = 2.0
+
+
+class BookBuilder:
+    """Дерево дебютов обеих сторон ИИ и записи книги по каноническим ключам"""
+
+    def __init__(self, max_stones=BOOK_STONES, replies=BOOK_REPLIES, seconds=BOOK_SECONDS):
+        self.max_stones = max_stones
+        self.replies = replies
+        self.seconds = seconds
+        self.entries = {}
+        self._expanded = set()
+
+    def build(self, board_size=15):
+        for ai_symbol in ('X', 'O'):
+            self._expand(GameLogic(board_size), ai_symbol)
+        return self.entries
+
+    def _expand(self, game, ai_symbol):
+        if game.game_over or game.move_count > self.max_stones:
+            return
+        key, symmetry = canonical_key(game)
+        if (key, ai_symbol) in self._expanded:
+            return
+        self._expanded.add((key, ai_symbol))
+
+        if game.current_player == ai_symbol:
+            moves = [self._book_move(game, key, symmetry)]
+        else:
+            moves = self._human_replies(game)
+        for row, col in moves:
+            with game.temporary_move(row, col):
+                self._expand(game, ai_symbol)
+
+    def _book_move(self, game, key, symmetry):
+        """Ход ИИ в позиции: из уже найденных записей или новым поиском"""
+        size = game.board_size
+        if key in self.entries:
+            return inverse_transform(*self.entries[key], size, symmetry)
+        ai = AIPlayer(game.current_player, opening_book=OpeningBook())
+        move = ai.get_move(game, Deadline(self.seconds))
+        self.entries[key] = transform(*move, size, symmetry)
+        logger.info(f"📖 {len(self.entries)}: {game.move_count} фигур, ход {move}")
+        return move
+
+    def _human_replies(self, game):
+        """Самые вероятные ответы человека; на пустой доске - центр"""
+        if not game.move_count:
+            center = game.board_size // 2
+            return [(center, center)]
+        indices = MoveOrdering().order(game, game.current_player, game.frontier, self.replies, 0)
+        return [game.geometry.coords(idx) for idx in indices]
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    for name in ('ai_player', 'search', 'threat_search', 'opening_book'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    args = [float(arg) for arg in sys.argv[1:4]]
+    builder = BookBuilder(*(int(arg) for arg in args[:2]), *args[2:])
+    start = time.time()
+    entries = builder.build()
+    write_book(BOOK_PATH, 15, builder.max_stones, entries)
+    print(f"✅ Книга {BOOK_PATH}: {len(entries)} позиций до {builder.max_stones} фигур "
+          f"за {time.time() - start:.0f}с")
+
+
+if __name__ == '__main__':
+    main()
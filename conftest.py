@@ -0,0 +1,69 @@
+"""
+Общие фикстуры тестов
+"""
+
+import os
+import tempfile
+
+# Тесты вызывают настоящие маршруты app: логи партий, кэш ходов и файл хранилища
+# уходят во временную папку, а не в рабочие файлы рядом с app.py.
+# Переменные задаются до импорта модулей, которые читают их при загрузке.
+_scratch = tempfile.TemporaryDirectory(prefix='gomoku-tests-')
+SCRATCH_DIR = _scratch.name
+os.environ['GOMOKU_LOGS_DIR'] = os.path.join(SCRATCH_DIR, 'game_logs')
+os.environ['GOMOKU_RESULT_CACHE'] = os.path.join(SCRATCH_DIR, 'result_cache.sqlite3')
+os.environ['GOMOKU_GAME_STORE_PATH'] = os.path.join(SCRATCH_DIR, 'game_store.sqlite3')
+
+import pytest
+
+from game_logic import GameLogic
+from symmetry import transform_board
+
+
+def _random_walk(game, rng, steps):
+    """Случайная серия push/pop; после каждой операции отдается game"""
+    for _ in range(steps):
+        moves = game.get_valid_moves()
+        if game.move_count and (not moves or game.game_over or rng.random() < 0.4):
+            game.pop()
+        else:
+            row, col = rng.choice(moves)
+            game.push(row, col)
+        yield game
+
+
+def _symmetric_copy(game, symmetry):
+    """Копия позиции game после симметрии доски номер symmetry"""
+    copy = GameLogic(game.board_size)
+    copy.board = transform_board(game.board, symmetry)
+    copy.current_player = game.current_player
+    copy.move_count = game.move_count
+    return copy
+
+
+@pytest.fixture
+def random_walk():
+    """random_walk(game, rng, steps) - случайная серия push/pop над game"""
+    return _random_walk
+
+
+@pytest.fixture
+def symmetric_copy():
+    """symmetric_copy(game, symmetry) - повернутая или отраженная копия позиции"""
+    return _symmetric_copy
+
+
+@pytest.fixture
+def scratch_dir():
+    """Временная папка для логов, кэша и хранилища приложения в тестах"""
+    return SCRATCH_DIR
+
+
+@pytest.fixture
+def client():
+    """Тестовый клиент приложения (пути логов, кэша и хранилища - во временной папке)"""
+    from app import app
+
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
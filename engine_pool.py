@@ -0,0 +1,361 @@
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from functools import lru_cache
+from multiprocessing.connection import wait
+
+from ai_player import AIPlayer
+from parallel_search import decode_position, encode_position
+from time_manager import Deadline
+
+logger = logging.getLogger(__name__)
+
+# Процессов движка; 0 - ход ИИ считается в процессе веб-сервера, как раньше
+ENGINE_WORKERS = int(os.environ.get('GOMOKU_ENGINE_WORKERS', 0))
+# Ходов, ждущих свободный процесс (по умолчанию два на процесс)
+ENGINE_QUEUE = int(os.environ.get('GOMOKU_ENGINE_QUEUE', 0))
+# Переполнение очереди: 'fast' - облегченный ход без поиска, 'reject' - отказ (EngineBusy)
+ENGINE_OVERFLOW = os.environ.get('GOMOKU_ENGINE_OVERFLOW', 'fast')
+# Облегченный ход: только эвристики (глубина 1) и короткий срок
+FAST_DEPTH = 1
+FAST_MOVE_TIME = 0.2
+# Если к началу хода до жесткого срока осталось меньше, процесс отвечает облегченным ходом
+MIN_JOB_TIME = 0.05
+# Сколько ждать ответ процесса сверх жесткого срока, прежде чем считать его зависшим
+RESULT_GRACE = 2.0
+# Через сколько секунд клиенту стоит повторить отклоненный ход
+RETRY_AFTER = 1
+# Как часто поток ответов просыпается без ответов (проверить, не закрыт ли пул)
+WATCH_INTERVAL = 0.5
+
+# Ответ пула: ход, оценка поиска (None без поиска) и признак облегченного хода
+EngineResult = namedtuple('EngineResult', 'move score degraded')
+
+
+class EngineBusy(RuntimeError):
+    """Очередь движка заполнена, а переполнение настроено на отказ"""
+
+
+def fast_move(game, symbol, game_id=None):
+    """Облегченный ход: эвристики без поиска за миллисекунды"""
+    ai = AIPlayer(symbol, max_depth=FAST_DEPTH, game_id=game_id, workers=1)
+    return ai.get_move(game, Deadline(FAST_MOVE_TIME))
+
+
+class TaskStop:
+    """stop_event хода в процессе движка: ход отменен, когда родитель записал его номер в cancel_id
+
+    Номер хода в флаге отмены, а не общий Event процесса: поздняя отмена уже
+    закончившегося хода не прервет следующий ход этого процесса.
+    """
+
+    def __init__(self, cancel_id, task_id):
+        self.cancel_id = cancel_id
+        self.task_id = task_id
+
+    def is_set(self):
+        return self.cancel_id.value == self.task_id
+
+
+def _engine_worker(tasks, results, cancel_id):
+    """Цикл процесса движка: таблица транспозиций, история партий и таблицы паттернов
+    живут в процессе между ходами
+
+    Ходы приходят по своему каналу процесса tasks, ответы уходят в results.
+    """
+    while True:
+        task = tasks.recv()
+        if task is None:
+            return
+        task_id, position, symbol, game_id, time_used, deadline = task
+        started = time.monotonic()
+        game = decode_position(position)
+        degraded = deadline.remaining() < MIN_JOB_TIME
+        move = score = error = None
+        try:
+            if degraded:
+                move = fast_move(game, symbol, game_id)
+            else:
+                ai = AIPlayer(symbol, game_id=game_id, workers=1, stop_event=TaskStop(cancel_id, task_id),
+                              time_used=time_used)
+                move = ai.get_move(game, deadline)
+                score = ai.last_search.score if ai.last_search else None
+        except Exception as e:
+            error = str(e)
+        results.send((task_id, {
+            'move': move,
+            'score': score,
+            'degraded': degraded,
+            'elapsed': time.monotonic() - started,
+            'error': error,
+        }))
+
+
+class EngineTask:
+    """Ход в очереди пула: ждущий поток получает результат через done
+
+    result остается None, если процесс, считавший ход, завершился.
+    """
+
+    def __init__(self, task_id, message):
+        self.task_id = task_id
+        self.message = message
+        self.worker = None
+        self.cancelled = False
+        self.result = None
+        self.done = threading.Event()
+
+
+class EngineWorker:
+    """Процесс движка и его каналы: ходы к процессу, ответы от него, флаг отмены"""
+
+    def __init__(self, context, index):
+        self.index = index
+        self.cancel_id = context.RawValue('q', 0)
+        task_reader, self.tasks = context.Pipe(duplex=False)
+        self.results, result_writer = context.Pipe(duplex=False)
+        self.process = context.Process(target=_engine_worker, name=f'engine-{index}', daemon=True,
+                                       args=(task_reader, result_writer, self.cancel_id))
+        self.process.start()
+        # Концы процесса закрываются здесь: когда процесс завершится, results сразу даст EOF
+        task_reader.close()
+        result_writer.close()
+        self.task = None
+        self.stats = {'pid': self.process.pid, 'jobs': 0, 'busy_seconds': 0.0, 'degraded': 0, 'errors': 0}
+
+    def close(self):
+        self.tasks.close()
+        self.results.close()
+
+
+class EnginePool:
+    """Долгоживущие процессы движка с ограниченной очередью
+
+    Обработчики Flask ставят ходы в очередь пула и ждут ответ; пул отдает ход
+    свободному процессу по его собственному каналу. Срок хода (Deadline)
+    считается от постановки в очередь, так что ожидание в очереди входит в него.
+    Когда в работе и в очереди уже workers + queue_size ходов, новый ход либо
+    получает облегченный ответ (overflow='fast'), либо отклоняется EngineBusy
+    (overflow='reject').
+
+    Процессор для ИИ задается числом процессов независимо от числа потоков HTTP.
+    Каналы у каждого процесса свои, а не общие очереди: процесс, убитый посреди
+    чтения или записи (падение, OOM killer), не оставляет занятой блокировку общей
+    очереди. Его канал ответов закрывается, процесс заменяется новым, а текущий
+    ход отдается ждущему потоку без результата - тот отвечает облегченным ходом.
+    """
+
+    def __init__(self, workers=ENGINE_WORKERS, queue_size=ENGINE_QUEUE, overflow=ENGINE_OVERFLOW):
+        self.workers = max(1, workers)
+        self.queue_size = queue_size or 2 * self.workers
+        self.overflow = overflow
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.degraded = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.restarts = 0
+        self.lost = 0
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._closing = False
+
+        self._context = multiprocessing.get_context()
+        self._workers = [EngineWorker(self._context, index) for index in range(self.workers)]
+        self._collector = threading.Thread(target=self._collect, name='engine-results', daemon=True)
+        self._collector.start()
+        logger.info(f"🏭 Пул движка: {self.workers} процессов, очередь {self.queue_size}, переполнение '{overflow}'")
+
+    @property
+    def capacity(self):
+        """Сколько ходов может быть в работе и в очереди одновременно"""
+        return self.workers + self.queue_size
+
+    def full(self):
+        with self._lock:
+            return len(self._pending) >= self.capacity
+
+    def get_move(self, game, symbol, deadline, game_id=None, time_used=0.0, stop_event=None) -> EngineResult:
+        """Ход ИИ symbol в позиции game от процесса пула в пределах deadline
+
+        stop_event (threading.Event) отменяет ход: процесс прерывает поиск, а
+        ответ - EngineResult(None, None, False). Если процесс не ответил к
+        жесткому сроку с запасом RESULT_GRACE или завершился, не ответив, ход
+        считается облегченным способом.
+        """
+        with self._lock:
+            if len(self._pending) >= self.capacity:
+                if self.overflow == 'reject':
+                    self.rejected += 1
+                    raise EngineBusy('Движок ИИ перегружен, повторите ход позже')
+                self.degraded += 1
+                task = None
+            else:
+                task_id = next(self._ids)
+                task = EngineTask(task_id, (task_id, encode_position(game), symbol, game_id, time_used, deadline))
+                self._pending[task_id] = task
+                self._queue.append(task)
+                self.submitted += 1
+                self._dispatch()
+        if task is None:
+            logger.warning("⚠️ Очередь движка заполнена, облегченный ход")
+            return EngineResult(fast_move(game, symbol, game_id), None, True)
+
+        wait_until = deadline.hard_at + RESULT_GRACE
+        while not task.done.wait(0.05):
+            if stop_event is not None and stop_event.is_set():
+                self._cancel(task)
+                return EngineResult(None, None, False)
+            if time.monotonic() > wait_until:
+                self._cancel(task)
+                with self._lock:
+                    self.timeouts += 1
+                logger.warning(f"⚠️ Процесс движка не ответил в срок {deadline}, облегченный ход")
+                return EngineResult(fast_move(game, symbol, game_id), None, True)
+
+        result = task.result
+        if result is None:
+            logger.warning("⚠️ Процесс движка завершился во время хода, облегченный ход")
+            return EngineResult(fast_move(game, symbol, game_id), None, True)
+        if result['error']:
+            raise RuntimeError(result['error'])
+        return EngineResult(tuple(result['move']) if result['move'] else None, result['score'], result['degraded'])
+
+    def _dispatch(self):
+        """Отдать ходы из очереди свободным процессам (вызывается под _lock)"""
+        for worker in self._workers:
+            if not self._queue:
+                return
+            if worker.task is not None or not worker.process.is_alive():
+                continue
+            task = self._queue.popleft()
+            try:
+                worker.tasks.send(task.message)
+            except OSError:
+                # Процесс только что завершился: ход ждет замены процесса
+                self._queue.appendleft(task)
+                continue
+            task.worker = worker.index
+            worker.task = task
+
+    def _cancel(self, task):
+        """Отменить ход: ждущий в очереди убирается сразу, идущий в процессе - прерывает поиск"""
+        with self._lock:
+            if task.done.is_set() or task.cancelled:
+                return
+            task.cancelled = True
+            self.cancelled += 1
+            if task.worker is None:
+                self._queue.remove(task)
+                del self._pending[task.task_id]
+            else:
+                self._workers[task.worker].cancel_id.value = task.task_id
+
+    def _collect(self):
+        """Поток разбора ответов процессов; закрытый канал ответов - процесс завершился"""
+        while True:
+            with self._lock:
+                if self._closing:
+                    return
+                channels = {worker.results: worker for worker in self._workers}
+            for channel in wait(list(channels), WATCH_INTERVAL):
+                worker = channels[channel]
+                try:
+                    task_id, payload = channel.recv()
+                except (EOFError, OSError):
+                    self._replace(worker)
+                    continue
+                self._finish(worker, task_id, payload)
+
+    def _finish(self, worker, task_id, payload):
+        with self._lock:
+            stats = worker.stats
+            stats['jobs'] += 1
+            stats['busy_seconds'] += payload['elapsed']
+            stats['degraded'] += payload['degraded']
+            stats['errors'] += payload['error'] is not None
+            self.completed += 1
+            self.degraded += payload['degraded']
+            task = self._pending.pop(task_id, None)
+            worker.task = None
+            self._dispatch()
+        if task is not None:
+            task.result = payload
+            task.done.set()
+
+    def _replace(self, worker):
+        """Заменить завершившийся процесс новым; его текущий ход закончить без результата"""
+        with self._lock:
+            if self._closing:
+                return
+            worker.process.join()
+            logger.error(f"❌ Процесс движка {worker.process.name} (pid {worker.process.pid}) завершился "
+                         f"с кодом {worker.process.exitcode}, запускается новый")
+            task = worker.task
+            if task is not None:
+                self._pending.pop(task.task_id, None)
+                self.lost += 1
+            worker.close()
+            self._workers[worker.index] = EngineWorker(self._context, worker.index)
+            self.restarts += 1
+            self._dispatch()
+        if task is not None:
+            task.done.set()
+
+    def stats(self):
+        """Счетчики пула и каждого процесса"""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'overflow': self.overflow,
+                'running': sum(worker.task is not None for worker in self._workers),
+                'queued': len(self._queue),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'degraded': self.degraded,
+                'timeouts': self.timeouts,
+                'cancelled': self.cancelled,
+                'restarts': self.restarts,
+                'lost': self.lost,
+                'per_worker': [{
+                    'pid': worker.stats['pid'],
+                    'alive': worker.process.is_alive(),
+                    'busy': worker.task is not None,
+                    'jobs': worker.stats['jobs'],
+                    'busy_seconds': round(worker.stats['busy_seconds'], 3),
+                    'avg_ms': (round(1000 * worker.stats['busy_seconds'] / worker.stats['jobs'], 1)
+                               if worker.stats['jobs'] else 0.0),
+                    'degraded': worker.stats['degraded'],
+                    'errors': worker.stats['errors'],
+                } for worker in self._workers],
+            }
+
+    def shutdown(self, timeout=5.0):
+        """Остановить процессы: текущие ходы доигрываются, остальные не начинаются"""
+        with self._lock:
+            self._closing = True
+            workers = list(self._workers)
+        for worker in workers:
+            try:
+                worker.tasks.send(None)
+            except OSError:
+                pass
+        for worker in workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+
+
+@lru_cache(maxsize=None)
+def get_engine_pool():
+    """Общий для процесса веб-сервера пул движка (GOMOKU_ENGINE_WORKERS процессов)"""
+    return EnginePool()
@@ -0,0 +1,232 @@
+import logging
+from array import array
+from functools import lru_cache
+
+from patterns import BLOCKED, OWN, POW3, TABLE_SPECS, get_pattern_tables
+
+logger = logging.getLogger(__name__)
+
+# Вес 5-клеточного отрезка линии по числу своих фигур в нем.
+# Отрезок, в котором есть чужая фигура или край доски, ничего не стоит.
+SEGMENT_WEIGHTS = (0, 1, 10, 100, 1000, 100000)
+
+# Окно вокруг клетки, покрывающее все 5-клеточные отрезки через нее: 4 + 1 + 4 цифры
+SEGMENT_SPAN = 4
+NEAR_DIGITS = 2 * SEGMENT_SPAN + 1
+NEAR_CENTER = POW3[SEGMENT_SPAN]
+
+# Ширина поля счетчика в упакованных счетчиках отрезков (5 полей в 64-битном числе)
+COUNT_BITS = 12
+COUNT_MASK = (1 << COUNT_BITS) - 1
+
+# Наибольшая полуширина окна таблиц паттернов: кэш по клетке сбрасывается в этом радиусе
+MAX_PATTERN_HALF = max(half for half, _, _ in TABLE_SPECS.values())
+
+
+def _segment_stones(segment):
+    """Число своих фигур в отрезке из 5 цифр или None, если отрезок перекрыт"""
+    stones = 0
+    for _ in range(5):
+        digit = segment % 3
+        if digit == BLOCKED:
+            return None
+        stones += digit == OWN
+        segment //= 3
+    return stones
+
+
+@lru_cache(maxsize=None)
+def get_near_tables():
+    """Суммы по пяти отрезкам окна из 9 цифр: (оценка, упакованные счетчики отрезков)
+
+    Счетчики отрезков с k своими фигурами лежат в битах k * COUNT_BITS.
+    """
+    scores = array('q')
+    counts = array('q')
+    segment_size = POW3[5]
+    for window in range(POW3[NEAR_DIGITS]):
+        score = 0
+        packed = 0
+        for start in range(SEGMENT_SPAN + 1):
+            stones = _segment_stones((window // POW3[start]) % segment_size)
+            if stones:
+                score += SEGMENT_WEIGHTS[stones]
+                packed += 1 << (stones * COUNT_BITS)
+        scores.append(score)
+        counts.append(packed)
+    return scores, counts
+
+
+@lru_cache(maxsize=None)
+def get_line_reach(geometry, radius):
+    """Для каждой клетки - клетки на расстоянии не больше radius по четырем линиям через нее"""
+    line_cells = {}
+    for idx, slots in geometry.line_slots.items():
+        for line_id, digit in slots:
+            line_cells.setdefault(line_id, {})[digit] = idx
+    reach = {}
+    for idx, slots in geometry.line_slots.items():
+        cells = {idx}
+        for line_id, digit in slots:
+            cells_by_digit = line_cells[line_id]
+            for other in range(digit - radius, digit + radius + 1):
+                if other in cells_by_digit:
+                    cells.add(cells_by_digit[other])
+        reach[idx] = tuple(cells)
+    return reach
+
+
+class IncrementalEvaluator:
+    """Оценка позиции, поддерживаемая по линиям доски
+
+    Для каждого игрока хранятся оценка каждой линии (сумма весов ее 5-клеточных
+    отрезков), общая оценка и счетчики отрезков по числу фигур. При постановке или
+    снятии фигуры GameLogic вызывает update(), и пересчитываются только отрезки
+    четырех линий через эту клетку.
+
+    Значения таблиц паттернов вокруг клеток (см. patterns.py) кэшируются по клетке;
+    изменение клетки сбрасывает кэш только в радиусе самого широкого окна.
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self.geometry = game.geometry
+        self.patterns = get_pattern_tables()
+        self.near_scores, self.near_counts = get_near_tables()
+        self.reach = get_line_reach(self.geometry, MAX_PATTERN_HALF)
+        self.reset()
+
+    def reset(self):
+        """Оценка пустой доски"""
+        line_count = len(self.geometry.empty_line_codes)
+        self.line_scores = {player: [0] * line_count for player in ('X', 'O')}
+        self.totals = {player: 0 for player in ('X', 'O')}
+        self._counts = {player: 0 for player in ('X', 'O')}
+        self._window_cache = [None] * (self.geometry.stride * self.geometry.board_size + 1)
+
+    def update(self, idx, player, sign):
+        """Учесть фигуру player, поставленную (sign=1) или снятую (sign=-1) в клетке idx
+
+        Вызывается после того, как GameLogic поменял цифру клетки в кодах линий.
+        """
+        near_scores = self.near_scores
+        near_counts = self.near_counts
+        size = POW3[NEAR_DIGITS]
+        for owner, digit_value in ((player, OWN), ('O' if player == 'X' else 'X', BLOCKED)):
+            codes = self.game.line_codes[owner]
+            line_scores = self.line_scores[owner]
+            score_delta = 0
+            count_delta = 0
+            for line_id, digit in self.geometry.line_slots[idx]:
+                low = POW3[digit - SEGMENT_SPAN]
+                new = (codes[line_id] // low) % size
+                old = new - sign * digit_value * NEAR_CENTER
+                delta = near_scores[new] - near_scores[old]
+                line_scores[line_id] += delta
+                score_delta += delta
+                count_delta += near_counts[new] - near_counts[old]
+            self.totals[owner] += score_delta
+            self._counts[owner] += count_delta
+
+        cache = self._window_cache
+        for n in self.reach[idx]:
+            cache[n] = None
+
+    def segment_count(self, player, stones):
+        """Число неперекрытых 5-клеточных отрезков с stones фигурами игрока"""
+        return (self._counts[player] >> (stones * COUNT_BITS)) & COUNT_MASK
+
+    def score(self, player):
+        """Оценка позиции с точки зрения player"""
+        return self.totals[player] - self.totals['O' if player == 'X' else 'X']
+
+    def gain(self, idx, player):
+        """Изменение score(player) после хода player в пустую клетку idx"""
+        near_scores = self.near_scores
+        size = POW3[NEAR_DIGITS]
+        own = self.game.line_codes[player]
+        other = self.game.line_codes['O' if player == 'X' else 'X']
+        gain = 0
+        for line_id, digit in self.geometry.line_slots[idx]:
+            low = POW3[digit - SEGMENT_SPAN]
+            window = (own[line_id] // low) % size
+            gain += near_scores[window + OWN * NEAR_CENTER] - near_scores[window]
+            window = (other[line_id] // low) % size
+            gain += near_scores[window] - near_scores[window + BLOCKED * NEAR_CENTER]
+        return gain
+
+    def move_counts(self, idx, player):
+        """Упакованные счетчики отрезков через клетку idx после хода player в пустую клетку idx
+
+        Поле 5 - отрезки, которые ход делает пятеркой, поле 4 - четверками (в том
+        числе с разрывом), как в segment_count().
+        """
+        near_counts = self.near_counts
+        size = POW3[NEAR_DIGITS]
+        codes = self.game.line_codes[player]
+        packed = 0
+        for line_id, digit in self.geometry.line_slots[idx]:
+            packed += near_counts[(codes[line_id] // POW3[digit - SEGMENT_SPAN]) % size + OWN * NEAR_CENTER]
+        return packed
+
+    def window_values(self, name, player, idx):
+        """Значения таблицы паттернов name по четырем направлениям вокруг клетки idx
+
+        Окна читаются по кодам линий player так, будто в idx стоит его фигура
+        (центральная цифра в индекс таблицы не входит, поэтому пробный ход не нужен).
+        """
+        cached = self._window_cache[idx]
+        if cached is None:
+            cached = self._window_cache[idx] = {}
+        key = (name, player)
+        values = cached.get(key)
+        if values is None:
+            half = TABLE_SPECS[name][0]
+            power = POW3[half]
+            table = getattr(self.patterns, name)
+            codes = self.game.line_codes[player]
+            # window_key() в цикле без вызова функции
+            values = cached[key] = tuple([
+                table[(codes[line_id] // POW3[digit - half]) % power
+                      + (codes[line_id] // POW3[digit + 1]) % power * power]
+                for line_id, digit in self.geometry.line_slots[idx]
+            ])
+        return values
+
+    def window_sums(self, name, player, indices):
+        """Суммы значений таблицы name по четырем направлениям для списка клеток
+
+        Без кэша: для разовой классификации всех кандидатов хода это быстрее.
+        """
+        half = TABLE_SPECS[name][0]
+        power = POW3[half]
+        table = getattr(self.patterns, name)
+        codes = self.game.line_codes[player]
+        line_slots = self.geometry.line_slots
+        sums = []
+        for idx in indices:
+            total = 0
+            for line_id, digit in line_slots[idx]:
+                code = codes[line_id]
+                total += table[code // POW3[digit - half] % power + code // POW3[digit + 1] % power * power]
+            sums.append(total)
+        return sums
+
+    def recompute_totals(self):
+        """Общие оценки и упакованные счетчики, посчитанные заново по всем линиям (для проверок)"""
+        totals = {}
+        counts = {}
+        for player in ('X', 'O'):
+            codes = self.game.line_codes[player]
+            score = 0
+            packed = 0
+            # Каждый отрезок учитывается один раз - по клетке, с которой он начинается
+            for slots in self.geometry.line_slots.values():
+                for line_id, digit in slots:
+                    stones = _segment_stones((codes[line_id] // POW3[digit]) % POW3[5])
+                    if stones:
+                        score += SEGMENT_WEIGHTS[stones]
+                        packed += 1 << (stones * COUNT_BITS)
+            totals[player] = score
+            counts[player] = packed
+        return totals, counts
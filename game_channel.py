@@ -0,0 +1,206 @@
+import json
+import logging
+import os
+import threading
+import time
+from functools import lru_cache
+
+from game_store import get_game_store
+
+logger = logging.getLogger(__name__)
+
+# Поток ждет уведомление не дольше EVENT_POLL секунд и перечитывает партию из
+# хранилища: с GOMOKU_GAME_STORE=sqlite ход мог сделать другой процесс
+EVENT_POLL = 1.0
+# Комментарий-пинг раз в KEEPALIVE секунд держит соединение через прокси
+KEEPALIVE = 15.0
+# Поток закрывается через столько секунд, EventSource сам переподключается с
+# Last-Event-ID; так брошенные соединения не занимают потоки сервера долго
+STREAM_MAX_AGE = float(os.environ.get('GOMOKU_EVENT_STREAM_AGE', 300))
+# Пауза перед переподключением клиента, мс
+RETRY_MS = 2000
+# Потоков событий в процессе одновременно: каждый держит поток gunicorn (gthread),
+# поэтому предел меньше threads в gunicorn_config.py - остальные потоки остаются
+# обычным запросам. Сверх предела клиент получает 503 и ждет ход через long-poll
+STREAM_LIMIT = int(os.environ.get('GOMOKU_EVENT_STREAMS', 16))
+
+
+class ChannelFull(RuntimeError):
+    """Открыто STREAM_LIMIT потоков событий: новый поток не открывается"""
+
+
+def format_event(event, data, event_id=None):
+    """Событие в формате text/event-stream"""
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def parse_event_id(event_id):
+    """(since, checksum) из id события '<ходов>:<контрольная сумма>' или (None, None)"""
+    try:
+        since, checksum = event_id.split(':', 1)
+        return int(since), checksum
+    except (AttributeError, ValueError):
+        return None, None
+
+
+class GameChannel:
+    """Уведомления об изменениях партий для потоков событий (SSE) этого процесса
+
+    Поток не получает сами ходы: после уведомления он берет из партии все ходы
+    после уже отправленных, так что пропущенные и слипшиеся уведомления ничего
+    не теряют. Версии ведутся только для партий с открытыми потоками.
+    """
+
+    def __init__(self, limit=STREAM_LIMIT):
+        self.limit = limit
+        self.opened = 0
+        self.rejected = 0
+        self.events = 0
+        self.streams = 0
+        self._lock = threading.Lock()
+        # game_id -> [Condition, версия, число потоков]
+        self._games = {}
+
+    def notify(self, game_id):
+        """Партия изменилась (или удалена): разбудить ее потоки"""
+        with self._lock:
+            entry = self._games.get(game_id)
+            if entry is not None:
+                entry[1] += 1
+                entry[0].notify_all()
+
+    def _subscribe(self, game_id):
+        with self._lock:
+            if self.streams >= self.limit:
+                self.rejected += 1
+                raise ChannelFull(f'Открыто {self.streams} потоков событий, ход ИИ - через /api/ai_job')
+            entry = self._games.setdefault(game_id, [threading.Condition(self._lock), 0, 0])
+            entry[2] += 1
+            self.streams += 1
+            self.opened += 1
+            return entry[1]
+
+    def _unsubscribe(self, game_id):
+        with self._lock:
+            entry = self._games[game_id]
+            entry[2] -= 1
+            self.streams -= 1
+            if not entry[2]:
+                del self._games[game_id]
+
+    def _wait(self, game_id, version, timeout):
+        """Дождаться уведомления после version не дольше timeout секунд; новая версия"""
+        with self._lock:
+            entry = self._games[game_id]
+            entry[0].wait_for(lambda: entry[1] != version, timeout)
+            return entry[1]
+
+    def stream(self, game_id, since=None, checksum=None):
+        """Поток событий партии game_id для клиента, у которого since ходов с контрольной суммой checksum
+
+        Место в канале занимается сразу (ChannelFull, если мест нет) и
+        освобождается, когда поток закончился или закрыт сервером.
+        move - новые ходы (дельта), resync - вся доска (позиция клиента не сошлась),
+        game_over - конец партии, closed - партии больше нет. После game_over и
+        closed поток заканчивается.
+        """
+        version = self._subscribe(game_id)
+        return EventStream(self, game_id, self._events(game_id, version, since, checksum))
+
+    def _events(self, game_id, version, since, checksum):
+        """События потока stream(); место в канале освобождает EventStream"""
+        started = time.monotonic()
+        last_sent = started
+        yield f"retry: {RETRY_MS}\n\n"
+        first = True
+        while time.monotonic() - started < STREAM_MAX_AGE:
+            record = get_game_store().get(game_id)
+            if record is None:
+                yield format_event('closed', {'reason': 'Партия окончена или забыта'})
+                return
+            events = []
+            with record.lock:
+                if first or since != len(record.moves):
+                    events = self._position_events(record, since, checksum)
+                    since, checksum = len(record.moves), record.checksum()
+                game_over = record.game.game_over
+            for event in events:
+                yield event
+            if events:
+                last_sent = time.monotonic()
+                with self._lock:
+                    self.events += len(events)
+            if game_over:
+                return
+            first = False
+            version = self._wait(game_id, version, EVENT_POLL)
+            if time.monotonic() - last_sent > KEEPALIVE:
+                yield ": ping\n\n"
+                last_sent = time.monotonic()
+
+    @staticmethod
+    def _position_events(record, since, checksum):
+        """События для перехода клиента от since ходов к текущей позиции (вызывается под record.lock)"""
+        fields = record.position(since, checksum)
+        if 'moves' in fields and not fields['moves'] and not record.game.game_over:
+            return []
+        game = record.game
+        last = record.moves[-1] if record.moves else None
+        data = dict(fields, move_count=game.move_count, current_player=game.current_player,
+                    ai_move=list(last[:2]) if last and last[2] == record.ai_symbol else None)
+        event_id = f"{len(record.moves)}:{fields['checksum']}"
+        events = [format_event('resync' if 'board' in fields else 'move', data, event_id)]
+        if game.game_over:
+            events.append(format_event('game_over', {'winner': game.winner, 'move_count': game.move_count},
+                                       event_id))
+        return events
+
+    def stats(self):
+        with self._lock:
+            return {
+                'streams': self.streams,
+                'limit': self.limit,
+                'games': len(self._games),
+                'opened': self.opened,
+                'rejected': self.rejected,
+                'events': self.events,
+            }
+
+
+class EventStream:
+    """Ответ с потоком событий: место в канале освобождается один раз - когда
+    события кончились или сервер закрыл ответ (в том числе так и не начатый)"""
+
+    def __init__(self, channel, game_id, events):
+        self.channel = channel
+        self.game_id = game_id
+        self._events = events
+        self._released = False
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        try:
+            yield from self._events
+        finally:
+            self._release()
+
+    def close(self):
+        self._events.close()
+        self._release()
+
+    def _release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self.channel._unsubscribe(self.game_id)
+
+
+@lru_cache(maxsize=None)
+def get_game_channel():
+    """Общий для процесса канал событий партий"""
+    return GameChannel()
@@ -1,16 +1,352 @@
 import logging
+import random
+from contextlib import contextmanager
+from functools import lru_cache
+
+from evaluator import IncrementalEvaluator
+from patterns import BLOCKED, OWN, POW3
+from symmetry import SYMMETRY_COUNT, get_symmetry_maps
 
 logger = logging.getLogger(__name__)
 
+# Направления линий: горизонталь, вертикаль, диагональ, антидиагональ
+LINE_DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)]
+
+# Фиксированное зерно: хэши позиций совпадают во всех процессах и между запусками
+ZOBRIST_SEED = 20250612
+
+# Число цифр-«краев» с каждой стороны кода линии: окна до 15 клеток не выходят за код
+LINE_PAD = 7
+
+
+class BoardGeometry:
+    """Предвычисленные маски битбордов для доски заданного размера.
+
+    Клетка (row, col) хранится в бите row * stride + col, где stride = board_size + 1.
+    Лишний столбец в каждой строке всегда пуст и служит сторожем: сдвиг по
+    горизонтали или диагонали упирается в него и не переносится на соседнюю строку.
+    """
+
+    def __init__(self, board_size):
+        self.board_size = board_size
+        self.stride = board_size + 1
+        # Сдвиг битборда для каждого направления из LINE_DIRECTIONS
+        self.shifts = [dr * self.stride + dc for dr, dc in LINE_DIRECTIONS]
+
+        self.full_mask = 0
+        for row in range(board_size):
+            for col in range(board_size):
+                self.full_mask |= 1 << self.index(row, col)
+
+        # Номера битов восьми соседей каждой клетки
+        self.neighbor_indices = {}
+        # Для каждого направления: два соседа клетки по линии и
+        # биты начал пятерок, проходящих через клетку
+        self.line_neighbor_masks = [{} for _ in LINE_DIRECTIONS]
+        self.five_start_masks = [{} for _ in LINE_DIRECTIONS]
+        for row in range(board_size):
+            for col in range(board_size):
+                idx = self.index(row, col)
+                self.neighbor_indices[idx] = tuple(
+                    self.index(row + dr, col + dc)
+                    for dr in (-1, 0, 1) for dc in (-1, 0, 1)
+                    if (dr or dc) and 0 <= row + dr < board_size and 0 <= col + dc < board_size
+                )
+
+                for d, (dr, dc) in enumerate(LINE_DIRECTIONS):
+                    pair = 0
+                    for nr, nc in ((row + dr, col + dc), (row - dr, col - dc)):
+                        if 0 <= nr < board_size and 0 <= nc < board_size:
+                            pair |= 1 << self.index(nr, nc)
+                    self.line_neighbor_masks[d][idx] = pair
+
+                    starts = 0
+                    for k in range(5):
+                        sr, sc = row - k * dr, col - k * dc
+                        if 0 <= sr < board_size and 0 <= sc < board_size:
+                            starts |= 1 << self.index(sr, sc)
+                    self.five_start_masks[d][idx] = starts
+
+        # Линии доски для кодов по основанию 3: для каждой клетки и направления
+        # (номер линии, номер цифры клетки в коде линии)
+        self.line_slots = {idx: [] for idx in self.neighbor_indices}
+        self.empty_line_codes = []
+        for dr, dc in LINE_DIRECTIONS:
+            for row in range(board_size):
+                for col in range(board_size):
+                    # Линия начинается в клетке, перед которой край доски
+                    if 0 <= row - dr < board_size and 0 <= col - dc < board_size:
+                        continue
+                    line_id = len(self.empty_line_codes)
+                    length = 0
+                    r, c = row, col
+                    while 0 <= r < board_size and 0 <= c < board_size:
+                        self.line_slots[self.index(r, c)].append((line_id, LINE_PAD + length))
+                        length += 1
+                        r, c = r + dr, c + dc
+                    # Пустая линия: нули внутри, края с обеих сторон - BLOCKED
+                    code = 0
+                    for digit in list(range(LINE_PAD)) + list(range(LINE_PAD + length, 2 * LINE_PAD + length)):
+                        code += BLOCKED * POW3[digit]
+                    self.empty_line_codes.append(code)
+        self.line_slots = {idx: tuple(slots) for idx, slots in self.line_slots.items()}
+
+        # Случайные 64-битные ключи Zobrist для каждой фигуры и очереди хода O
+        rng = random.Random(ZOBRIST_SEED + board_size)
+        cells = self.stride * board_size
+        self.zobrist_keys = {player: [rng.getrandbits(64) for _ in range(cells)]
+                             for player in ('X', 'O')}
+        self.zobrist_side = rng.getrandbits(64)
+        # Ключи образов клетки при восьми симметриях доски: по ним хэши симметричных
+        # копий позиции обновляются вместе с обычным хэшем (см. symmetry.py)
+        maps = get_symmetry_maps(board_size)
+        self.symmetric_zobrist_keys = {
+            player: [tuple(keys[mapping[idx]] for mapping in maps) for idx in range(cells)]
+            for player, keys in self.zobrist_keys.items()
+        }
+
+    def index(self, row, col):
+        """Номер бита клетки"""
+        return row * self.stride + col
+
+    def coords(self, idx):
+        """Координаты клетки по номеру бита"""
+        return divmod(idx, self.stride)
+
+    def five_starts(self, bits, shift):
+        """Биты, с которых начинается пятерка в направлении shift"""
+        pairs = bits & (bits >> shift)
+        quads = pairs & (pairs >> (2 * shift))
+        return quads & (bits >> (4 * shift))
+
+    def has_five(self, bits):
+        """Есть ли на битборде пять в ряд в любом направлении"""
+        for shift in self.shifts:
+            if self.five_starts(bits, shift):
+                return True
+        return False
+
+    def iter_bits(self, bits):
+        """Перебрать номера установленных битов по возрастанию"""
+        while bits:
+            low = bits & -bits
+            yield low.bit_length() - 1
+            bits ^= low
+
+
+@lru_cache(maxsize=None)
+def get_geometry(board_size):
+    """Геометрия доски строится один раз на размер"""
+    return BoardGeometry(board_size)
+
+
 class GameLogic:
     def __init__(self, board_size=15):
         self.board_size = board_size
-        self.board = [['.' for _ in range(board_size)] for _ in range(board_size)]
+        self.geometry = get_geometry(board_size)
+        # Оценка позиции, обновляемая по четырем линиям при каждой постановке/снятии фигуры
+        self.evaluator = IncrementalEvaluator(self)
+        # Битборды игроков; список списков строится лениво только для JSON API
+        self._reset_position()
         self.current_player = 'X'  # X всегда ходит первым
         self.move_count = 0
         self.game_over = False
         self.winner = None
-        
+        # Последний ход и признак того, что отсутствие победителя уже проверено
+        self.last_move = None
+        self._winner_known = True
+        # Стек отмены для push/pop
+        self._undo_stack = []
+
+    def _reset_position(self):
+        """Очистить доску и все поддерживаемые по ней структуры"""
+        self.bits = {'X': 0, 'O': 0}
+        self._reset_cells()
+        self._board_view = None
+        self._reset_frontier()
+        self._stone_hash = 0
+        self._symmetric_hashes = [0] * SYMMETRY_COUNT
+        # Коды линий по основанию 3 относительно каждого игрока (см. patterns.py)
+        self.line_codes = {player: list(self.geometry.empty_line_codes) for player in ('X', 'O')}
+        self.evaluator.reset()
+
+    def _reset_cells(self):
+        """Плоский массив клеток '.'/'X'/'O' по номерам битов
+
+        Сторожевой столбец и последний элемент (сторож окон) заполнены '#'.
+        """
+        stride = self.geometry.stride
+        self.cells = ['.' if idx % stride < self.board_size else '#'
+                      for idx in range(stride * self.board_size)]
+        self.cells.append('#')
+
+    def _reset_frontier(self):
+        """Очистить фронт: счетчики занятых соседей и множество пустых клеток рядом с фигурами"""
+        self._neighbor_counts = [0] * (self.geometry.stride * self.board_size)
+        self._frontier = set()
+
+    def _add_to_frontier(self, idx):
+        """Обновить фронт после появления фигуры в клетке idx (O(8))"""
+        self._frontier.discard(idx)
+        counts = self._neighbor_counts
+        cells = self.cells
+        for n in self.geometry.neighbor_indices[idx]:
+            counts[n] += 1
+            if counts[n] == 1 and cells[n] == '.':
+                self._frontier.add(n)
+
+    def _remove_from_frontier(self, idx):
+        """Обновить фронт после снятия фигуры из клетки idx (O(8))"""
+        counts = self._neighbor_counts
+        for n in self.geometry.neighbor_indices[idx]:
+            counts[n] -= 1
+            if counts[n] == 0:
+                self._frontier.discard(n)
+        if counts[idx]:
+            self._frontier.add(idx)
+
+    @property
+    def frontier(self):
+        """Номера пустых клеток рядом с фигурами (ходы после первого)"""
+        return self._frontier
+
+    @property
+    def position_hash(self):
+        """64-битный хэш Zobrist позиции с учетом очереди хода"""
+        if self.current_player == 'O':
+            return self._stone_hash ^ self.geometry.zobrist_side
+        return self._stone_hash
+
+    @property
+    def symmetric_hashes(self):
+        """Хэши восьми симметричных копий позиции (номер - симметрия из symmetry.py)"""
+        if self.current_player == 'O':
+            side = self.geometry.zobrist_side
+            return [value ^ side for value in self._symmetric_hashes]
+        return list(self._symmetric_hashes)
+
+    def _compute_hash(self):
+        """Хэш фигур, посчитанный заново по битбордам"""
+        value = 0
+        for player, bits in self.bits.items():
+            keys = self.geometry.zobrist_keys[player]
+            for idx in self.geometry.iter_bits(bits):
+                value ^= keys[idx]
+        return value
+
+    @property
+    def occupied(self):
+        """Битборд всех занятых клеток"""
+        return self.bits['X'] | self.bits['O']
+
+    @property
+    def board(self):
+        """Доска в виде списка списков '.'/'X'/'O' (строится по запросу)"""
+        if self._board_view is None:
+            view = [['.'] * self.board_size for _ in range(self.board_size)]
+            for player, bits in self.bits.items():
+                for idx in self.geometry.iter_bits(bits):
+                    row, col = self.geometry.coords(idx)
+                    view[row][col] = player
+            self._board_view = view
+        return self._board_view
+
+    @board.setter
+    def board(self, rows):
+        """Загрузить доску из списка списков (например, из сессии)"""
+        self._reset_position()
+        for row, cells in enumerate(rows):
+            for col, cell in enumerate(cells):
+                if cell in self.bits:
+                    self._set_cell(row, col, cell)
+        # Для загруженной доски победитель будет найден полным проходом
+        self.last_move = None
+        self._winner_known = False
+        self._undo_stack = []
+
+    def get_cell(self, row, col):
+        """Содержимое клетки: '.', 'X' или 'O'"""
+        return self.cells[self.geometry.index(row, col)]
+
+    def _set_cell(self, row, col, player):
+        """Поставить фигуру, поддерживая фронт и экспортированный вид доски"""
+        idx = self.geometry.index(row, col)
+        self.bits[player] |= 1 << idx
+        self.cells[idx] = player
+        self._stone_hash ^= self.geometry.zobrist_keys[player][idx]
+        self._update_symmetric_hashes(idx, player)
+        self._update_line_codes(idx, player, 1)
+        self.evaluator.update(idx, player, 1)
+        self._add_to_frontier(idx)
+        if self._board_view is not None:
+            self._board_view[row][col] = player
+
+    def _clear_cell(self, row, col, player):
+        """Снять фигуру, поддерживая фронт и экспортированный вид доски"""
+        idx = self.geometry.index(row, col)
+        self.bits[player] &= ~(1 << idx)
+        self.cells[idx] = '.'
+        self._stone_hash ^= self.geometry.zobrist_keys[player][idx]
+        self._update_symmetric_hashes(idx, player)
+        self._update_line_codes(idx, player, -1)
+        self.evaluator.update(idx, player, -1)
+        self._remove_from_frontier(idx)
+        if self._board_view is not None:
+            self._board_view[row][col] = '.'
+
+    def _update_symmetric_hashes(self, idx, player):
+        """Переключить фигуру игрока в клетке idx в хэшах всех симметричных копий"""
+        self._symmetric_hashes = [value ^ key for value, key in
+                                  zip(self._symmetric_hashes, self.geometry.symmetric_zobrist_keys[player][idx])]
+
+    def _update_line_codes(self, idx, player, sign):
+        """Поменять цифру клетки idx в кодах четырех линий обоих игроков"""
+        own = self.line_codes[player]
+        other = self.line_codes['O' if player == 'X' else 'X']
+        for line_id, digit in self.geometry.line_slots[idx]:
+            step = sign * POW3[digit]
+            own[line_id] += OWN * step
+            other[line_id] += BLOCKED * step
+
+    def push(self, row, col, player=None):
+        """Поставить фигуру без проверок правил, запомнив состояние для pop()
+
+        Все инкрементальные структуры обновляются так же, как при make_move,
+        поэтому поиск может уходить вглубь без копирования доски.
+        """
+        if player is None:
+            player = self.current_player
+        self._undo_stack.append((row, col, player, self.current_player, self.winner,
+                                 self.game_over, self.last_move, self._winner_known))
+
+        self._set_cell(row, col, player)
+        self.move_count += 1
+        self.last_move = (row, col)
+
+        if self._check_win_from_position(row, col, player):
+            self.winner = player
+        if self.check_winner():
+            self.game_over = True
+        else:
+            self.current_player = 'O' if self.current_player == 'X' else 'X'
+
+    def pop(self):
+        """Отменить последний push(), вернув все состояние игры"""
+        (row, col, player, self.current_player, self.winner,
+         self.game_over, self.last_move, self._winner_known) = self._undo_stack.pop()
+        self._clear_cell(row, col, player)
+        self.move_count -= 1
+        return row, col
+
+    @contextmanager
+    def temporary_move(self, row, col, player=None):
+        """Пробный ход: фигура снимается даже при исключении внутри блока"""
+        self.push(row, col, player)
+        try:
+            yield self
+        finally:
+            self.pop()
+
     def make_move(self, row, col, player=None):
         """Сделать ход"""
         if player is None:
@@ -25,7 +361,7 @@ class GameLogic:
             logger.warning(f"⚠️ Координаты вне доски: ({row}, {col})")
             return False
             
-        if self.board[row][col] != '.':
+        if self.cells[self.geometry.index(row, col)] != '.':
             logger.warning(f"⚠️ Клетка уже занята: ({row}, {col})")
             return False
             
@@ -34,69 +370,52 @@ class GameLogic:
             logger.warning(f"⚠️ Нет соседних фигур для хода ({row}, {col})")
             return False
             
-        # Делаем ход
-        self.board[row][col] = player
-        self.move_count += 1
-        
-        # Проверяем победу
-        if self.check_winner():
-            self.game_over = True
-            self.winner = player
-            logger.info(f"🏆 Победа игрока {player}!")
-        else:
-            # Переключаем игрока
-            self.current_player = 'O' if self.current_player == 'X' else 'X'
+        # Делаем ход; победа проверяется по четырем линиям через него,
+        # а игрок переключается, если игра продолжается
+        self.push(row, col, player)
+        if self.game_over:
+            logger.info(f"🏆 Победа игрока {self.winner}!")
             
         logger.info(f"✅ Ход {player} на ({row}, {col}), счетчик: {self.move_count}")
         return True
         
     def _has_adjacent_piece(self, row, col):
         """Проверить наличие соседних фигур"""
-        directions = [(-1,-1), (-1,0), (-1,1), (0,-1), (0,1), (1,-1), (1,0), (1,1)]
-        
-        for dr, dc in directions:
-            nr, nc = row + dr, col + dc
-            if (0 <= nr < self.board_size and 0 <= nc < self.board_size and 
-                self.board[nr][nc] != '.'):
-                return True
-        return False
+        return self._neighbor_counts[self.geometry.index(row, col)] > 0
         
     def check_winner(self):
         """Проверить наличие победителя"""
         if self.winner:
             return True
+        
+        # После инкрементальных проверок ответ уже известен
+        if self._winner_known:
+            return False
             
-        # Проверяем все позиции с фигурами
-        for row in range(self.board_size):
-            for col in range(self.board_size):
-                if self.board[row][col] != '.':
-                    if self._check_win_from_position(row, col, self.board[row][col]):
-                        self.winner = self.board[row][col]
-                        return True
+        return self._scan_winner()
+        
+    def _scan_winner(self):
+        """Полная проверка доски на пятерку (для доски неизвестного происхождения)"""
+        self._winner_known = True
+        # Пятерка ищется сдвигами битбордов сразу по всей доске
+        for player, bits in self.bits.items():
+            if self.geometry.has_five(bits):
+                self.winner = player
+                return True
         return False
         
     def _check_win_from_position(self, row, col, player):
         """Проверить победу от конкретной позиции"""
-        directions = [(0,1), (1,0), (1,1), (1,-1)]
-        
-        for dr, dc in directions:
-            count = 1  # Считаем текущую клетку
-            
-            # Проверяем в положительном направлении
-            r, c = row + dr, col + dc
-            while (0 <= r < self.board_size and 0 <= c < self.board_size and 
-                   self.board[r][c] == player):
-                count += 1
-                r, c = r + dr, c + dc
-                
-            # Проверяем в отрицательном направлении  
-            r, c = row - dr, col - dc
-            while (0 <= r < self.board_size and 0 <= c < self.board_size and 
-                   self.board[r][c] == player):
-                count += 1
-                r, c = r - dr, c - dc
-                
-            if count >= 5:
+        idx = self.geometry.index(row, col)
+        # Сама клетка считается фигурой игрока, как и при подсчете по линиям
+        bits = self.bits[player] | (1 << idx)
+
+        geometry = self.geometry
+        for d, shift in enumerate(geometry.shifts):
+            # Без своего соседа по линии пятерки через клетку быть не может
+            if not bits & geometry.line_neighbor_masks[d][idx]:
+                continue
+            if geometry.five_starts(bits, shift) & geometry.five_start_masks[d][idx]:
                 return True
                 
         return False
@@ -118,44 +437,27 @@ class GameLogic:
                         valid_moves.append([row, col])
             return valid_moves
             
-        # Для остальных ходов - только рядом с существующими фигурами
-        # Оптимизированная версия: ищем соседей занятых клеток
-        occupied_neighbors = set()
-        
-        for row in range(self.board_size):
-            for col in range(self.board_size):
-                if self.board[row][col] != '.':
-                    # Добавляем всех соседей этой занятой клетки
-                    for dr in [-1, 0, 1]:
-                        for dc in [-1, 0, 1]:
-                            if dr == 0 and dc == 0:
-                                continue
-                            nr, nc = row + dr, col + dc
-                            if (0 <= nr < self.board_size and 0 <= nc < self.board_size and 
-                                self.board[nr][nc] == '.'):
-                                occupied_neighbors.add((nr, nc))
-        
-        # Преобразуем в список
-        valid_moves = [[r, c] for r, c in occupied_neighbors]
+        # Для остальных ходов - только рядом с существующими фигурами:
+        # фронт поддерживается инкрементально при каждом ходе
+        valid_moves = [list(self.geometry.coords(idx)) for idx in self._frontier]
         
         logger.debug(f"📋 Найдено валидных ходов: {len(valid_moves)}")
         return valid_moves
         
     def is_board_full(self):
         """Проверить, заполнена ли доска"""
-        for row in self.board:
-            for cell in row:
-                if cell == '.':
-                    return False
-        return True
+        return self.occupied == self.geometry.full_mask
         
     def reset_game(self):
         """Сбросить игру"""
-        self.board = [['.' for _ in range(self.board_size)] for _ in range(self.board_size)]
+        self._reset_position()
         self.current_player = 'X'
         self.move_count = 0
         self.game_over = False
         self.winner = None
+        self.last_move = None
+        self._winner_known = True
+        self._undo_stack = []
         logger.info("🔄 Игра сброшена")
         
     def get_board_state(self):
@@ -165,7 +467,8 @@ class GameLogic:
             'current_player': self.current_player,
             'move_count': self.move_count,
             'game_over': self.game_over,
-            'winner': self.winner
+            'winner': self.winner,
+            'position_hash': f"{self.position_hash:016x}"
         }
 
     def is_valid_move(self, row, col):
@@ -174,15 +477,13 @@ class GameLogic:
         if row < 0 or row >= self.board_size or col < 0 or col >= self.board_size:
             return False
         
-        # Проверяем, что клетка пустая
-        if self.board[row][col] != '.':
-            return False
+        idx = self.geometry.index(row, col)
         
-        # Для первого хода можно ставить в любое место
+        # Для первого хода можно ставить в любую пустую клетку
         if self.move_count == 0:
-            return True
+            return self.cells[idx] == '.'
         
-        # Для остальных ходов используем общую функцию
-        return self._has_adjacent_piece(row, col)
+        # Для остальных ходов клетка должна быть во фронте (пустая и с соседом)
+        return idx in self._frontier
     
- 
\ No newline at end of file
+ 
@@ -0,0 +1,222 @@
+import json
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from game_logic import GameLogic
+
+logger = logging.getLogger(__name__)
+
+# Хранилище партий: 'memory' - живые партии в памяти процесса (gunicorn с одним
+# процессом), 'sqlite' - общий файл SQLite для нескольких процессов
+GAME_STORE_BACKEND = os.environ.get('GOMOKU_GAME_STORE', 'memory')
+GAME_STORE_PATH = os.environ.get(
+    'GOMOKU_GAME_STORE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'game_store.sqlite3')
+)
+# Партий в памяти процесса (живая партия занимает порядка 16-32 КБ) и время простоя,
+# после которого партия забывается
+GAME_STORE_GAMES = int(os.environ.get('GOMOKU_GAME_STORE_GAMES', 2000))
+GAME_IDLE_TTL = float(os.environ.get('GOMOKU_GAME_IDLE_TTL', 6 * 3600))
+# Устаревшие партии удаляются из файла раз в CLEANUP_EVERY записей процесса
+CLEANUP_EVERY = 100
+BUSY_TIMEOUT = 1.0
+
+
+class GameRecord:
+    """Партия на сервере: живой GameLogic, стороны, ходы по порядку и время ИИ
+
+    Запросы одной партии меняют ее под lock.
+    """
+
+    def __init__(self, user_symbol, game_id=None, board_size=15):
+        self.game_id = game_id or secrets.token_hex(8)
+        self.user_symbol = user_symbol
+        self.ai_symbol = 'O' if user_symbol == 'X' else 'X'
+        self.game = GameLogic(board_size)
+        # Ходы партии: (row, col, игрок)
+        self.moves = []
+        # Время, потраченное ИИ в партии: из остатка TimeManager выводит бюджет хода
+        self.ai_time_used = 0.0
+        self.touched = time.time()
+        self.lock = threading.RLock()
+
+    def play(self, row, col, player):
+        """Сделать ход по правилам и записать его в историю партии"""
+        if not self.game.make_move(row, col, player):
+            return False
+        self.moves.append((row, col, player))
+        return True
+
+    def checksum(self, move_count=None):
+        """Контрольная сумма позиции после первых move_count ходов (по умолчанию всех):
+        хэш Zobrist фигур, 16 шестнадцатеричных цифр"""
+        keys = self.game.geometry.zobrist_keys
+        index = self.game.geometry.index
+        value = 0
+        for row, col, player in self.moves[:move_count]:
+            value ^= keys[player][index(row, col)]
+        return f"{value:016x}"
+
+    def position(self, since=None, checksum=None):
+        """Позиция для клиента: ходы после since, если его позиция сходится по checksum,
+        иначе вся доска; checksum текущей позиции есть всегда"""
+        fields = {'checksum': self.checksum()}
+        if (isinstance(since, int) and 0 <= since <= len(self.moves)
+                and (since == 0 or checksum == self.checksum(since))):
+            fields['since'] = since
+            fields['moves'] = [list(move) for move in self.moves[since:]]
+        else:
+            fields['board'] = self.game.board
+        return fields
+
+    def to_json(self):
+        return json.dumps({
+            'user_symbol': self.user_symbol,
+            'board_size': self.game.board_size,
+            'moves': self.moves,
+            'ai_time_used': self.ai_time_used,
+        })
+
+    @classmethod
+    def from_json(cls, game_id, data):
+        """Партия из to_json(): ходы повторяются заново, так что состояние GameLogic полное"""
+        fields = json.loads(data)
+        record = cls(fields['user_symbol'], game_id, fields['board_size'])
+        for row, col, player in fields['moves']:
+            record.game.push(row, col, player)
+            record.moves.append((row, col, player))
+        record.ai_time_used = fields['ai_time_used']
+        return record
+
+
+class MemoryGameStore:
+    """Живые партии в памяти процесса: вытеснение по давности (LRU) и времени простоя"""
+
+    def __init__(self, max_games=GAME_STORE_GAMES, idle_ttl=GAME_IDLE_TTL):
+        self.max_games = max_games
+        self.idle_ttl = idle_ttl
+        self.evicted = 0
+        self.expired = 0
+        self._games = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, game_id):
+        """Партия game_id или None, если ее нет или она простаивала дольше idle_ttl"""
+        now = time.time()
+        with self._lock:
+            record = self._games.get(game_id)
+            if record is None:
+                return None
+            if record.touched < now - self.idle_ttl:
+                del self._games[game_id]
+                self.expired += 1
+                return None
+            record.touched = now
+            self._games.move_to_end(game_id)
+            return record
+
+    def put(self, record):
+        """Сохранить партию (живую - просто отметить использование)"""
+        now = time.time()
+        with self._lock:
+            record.touched = now
+            self._games[record.game_id] = record
+            self._games.move_to_end(record.game_id)
+            while self._games:
+                oldest = next(iter(self._games.values()))
+                if len(self._games) > self.max_games:
+                    self.evicted += 1
+                elif oldest.touched < now - self.idle_ttl:
+                    self.expired += 1
+                else:
+                    break
+                self._games.popitem(last=False)
+
+    def delete(self, game_id):
+        with self._lock:
+            self._games.pop(game_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'games': len(self._games),
+                'max_games': self.max_games,
+                'evicted': self.evicted,
+                'expired': self.expired,
+            }
+
+
+class SqliteGameStore:
+    """Партии в общем файле SQLite: любой процесс gunicorn продолжает любую партию
+
+    Процесс держит живые партии в MemoryGameStore и берет их оттуда, если в файле
+    с тех пор не прибавилось ходов; иначе партия восстанавливается из файла.
+    """
+
+    def __init__(self, path=GAME_STORE_PATH, max_games=GAME_STORE_GAMES, idle_ttl=GAME_IDLE_TTL):
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self.memory = MemoryGameStore(max_games, idle_ttl)
+        self.loads = 0
+        self.writes = 0
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS games (game_id TEXT PRIMARY KEY, data TEXT NOT NULL, '
+                               'moves INTEGER NOT NULL, touched REAL NOT NULL)')
+            self._local.connection = connection
+        return connection
+
+    def get(self, game_id):
+        row = self._connection().execute('SELECT data, moves, touched FROM games WHERE game_id = ?',
+                                         (game_id,)).fetchone()
+        if row is None or row[2] < time.time() - self.idle_ttl:
+            self.memory.delete(game_id)
+            return None
+        record = self.memory.get(game_id)
+        if record is None or len(record.moves) != row[1]:
+            record = GameRecord.from_json(game_id, row[0])
+            self.memory.put(record)
+            self.loads += 1
+        return record
+
+    def put(self, record):
+        now = time.time()
+        connection = self._connection()
+        connection.execute('INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?)',
+                           (record.game_id, record.to_json(), len(record.moves), now))
+        self.memory.put(record)
+        self.writes += 1
+        if self.writes % CLEANUP_EVERY == 0:
+            connection.execute('DELETE FROM games WHERE touched < ?', (now - self.idle_ttl,))
+
+    def delete(self, game_id):
+        self._connection().execute('DELETE FROM games WHERE game_id = ?', (game_id,))
+        self.memory.delete(game_id)
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats.update(backend='sqlite', loads=self.loads, writes=self.writes,
+                     stored=self._connection().execute('SELECT COUNT(*) FROM games').fetchone()[0])
+        return stats
+
+
+@lru_cache(maxsize=None)
+def get_game_store():
+    """Хранилище партий процесса по GOMOKU_GAME_STORE"""
+    if GAME_STORE_BACKEND == 'sqlite':
+        logger.info(f"🗄️ Партии хранятся в {GAME_STORE_PATH}")
+        return SqliteGameStore()
+    return MemoryGameStore()
@@ -1,6 +1,11 @@
 bind = "0.0.0.0:5000"
 workers = 1
-worker_class = "sync"
+# Потоки обслуживают запросы, пока ИИ считает в фоне (ai_jobs.py) и пока
+# клиенты ждут его хода через long-poll; открытый поток событий партии (SSE,
+# /api/events) занимает поток на время соединения, поэтому таких потоков не больше
+# GOMOKU_EVENT_STREAMS (16, game_channel.py) - остальные клиенты ждут через long-poll
+worker_class = "gthread"
+threads = 32
 worker_connections = 1000
 timeout = 30
 keepalive = 2
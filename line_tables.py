@@ -0,0 +1,62 @@
+import logging
+from functools import lru_cache
+
+from game_logic import LINE_DIRECTIONS, get_geometry
+
+logger = logging.getLogger(__name__)
+
+# Наибольшая полуширина окна: линия из 15 клеток с центром в ходе
+MAX_HALF_WIDTH = 7
+
+
+class LineTables:
+    """Таблицы окон линий для плоского массива клеток GameLogic.cells
+
+    windows[half][idx] - четыре кортежа (по направлениям LINE_DIRECTIONS) с номерами
+    клеток на смещениях -half..half от клетки idx. Клетки за краем доски заменены
+    номером сторожа, в котором всегда лежит '#', поэтому при чтении линий не нужны
+    ни арифметика координат, ни проверки границ.
+    """
+
+    def __init__(self, board_size):
+        self.board_size = board_size
+        self.geometry = get_geometry(board_size)
+        self.center = board_size // 2
+        # Сторож - последний элемент GameLogic.cells
+        self.sentinel = self.geometry.stride * board_size
+
+        index = self.geometry.index
+        self.squares = [index(row, col) for row in range(board_size) for col in range(board_size)]
+
+        self.windows = {half: {} for half in range(1, MAX_HALF_WIDTH + 1)}
+        # Клетки квадрата 5x5 вокруг клетки с манхэттенским расстоянием до нее
+        self.areas = {}
+        for row in range(board_size):
+            for col in range(board_size):
+                idx = index(row, col)
+                for half in range(1, MAX_HALF_WIDTH + 1):
+                    self.windows[half][idx] = tuple(
+                        tuple(self._index_or_sentinel(row + i * dr, col + i * dc)
+                              for i in range(-half, half + 1))
+                        for dr, dc in LINE_DIRECTIONS
+                    )
+                self.areas[idx] = tuple(
+                    (index(row + dr, col + dc), abs(dr) + abs(dc))
+                    for dr in range(-2, 3) for dc in range(-2, 3)
+                    if 0 <= row + dr < board_size and 0 <= col + dc < board_size
+                )
+
+    def _index_or_sentinel(self, row, col):
+        if 0 <= row < self.board_size and 0 <= col < self.board_size:
+            return self.geometry.index(row, col)
+        return self.sentinel
+
+
+@lru_cache(maxsize=None)
+def get_line_tables(board_size):
+    """Таблицы окон строятся один раз на размер доски"""
+    return LineTables(board_size)
+
+
+# Таблицы для стандартной доски 15x15 строятся при импорте
+LINE_TABLES = get_line_tables(15)
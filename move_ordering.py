@@ -0,0 +1,174 @@
+import logging
+import threading
+from collections import OrderedDict
+
+from evaluator import COUNT_BITS, COUNT_MASK, SEGMENT_WEIGHTS
+
+logger = logging.getLogger(__name__)
+
+# Киллер-ходов на полуход
+KILLER_SLOTS = 2
+# Ходы, чей прирост оценки различается меньше этого, считаются равными по приросту:
+# их порядок решают киллеры и история
+GAIN_BUCKET = 10
+# Сколько партий процесс помнит таблицы истории
+HISTORY_GAMES = 256
+
+# Порядок групп ходов (больше - раньше)
+TIER_HASH = 6        # лучший ход позиции из таблицы транспозиций
+TIER_FIVE = 5        # своя пятерка
+TIER_BLOCK_FIVE = 4  # занять клетку пятерки соперника
+TIER_FOUR = 3        # своя четверка
+TIER_BLOCK_FOUR = 2  # занять клетку, где соперник поставил бы четверку
+TIER_QUIET = 0       # остальные: по приросту оценки, при равном - киллеры, затем история
+
+FOUR_SHIFT = 4 * COUNT_BITS
+FIVE_SHIFT = 5 * COUNT_BITS
+# Наименьший прирост оценки хода-угрозы: ход в клетку четверки соперника убирает
+# хотя бы его отрезок из трех фигур, остальные угрозы дают больше; у ходов с меньшим
+# приростом счетчики отрезков не смотрятся
+THREAT_GAIN = SEGMENT_WEIGHTS[3]
+
+
+class HistoryTable:
+    """Таблица истории: сколько отсечений дал ход игрока в клетку (с весом depth^2)
+
+    Живет всю партию: между итерациями углубления и между ходами. Перед каждым
+    новым поиском счет уменьшается вдвое, чтобы старые отсечения весили меньше.
+    Процессы параллельного поиска получают копию счета (snapshot) и возвращают
+    свою, прирост вливается обратно (merge).
+
+    Одну таблицу партии могут менять сразу два поиска (обдумывание и ход ИИ),
+    поэтому изменения идут под блокировкой; чтение в order() ее не берет.
+    """
+
+    def __init__(self):
+        self.scores = {'X': {}, 'O': {}}
+        self._lock = threading.Lock()
+
+    def add(self, player, idx, depth):
+        with self._lock:
+            scores = self.scores[player]
+            scores[idx] = scores.get(idx, 0) + depth * depth
+
+    def age(self):
+        with self._lock:
+            for player, scores in self.scores.items():
+                self.scores[player] = {idx: score // 2 for idx, score in scores.items() if score > 1}
+
+    def snapshot(self):
+        """Копия счета (для передачи в процессы параллельного поиска)"""
+        with self._lock:
+            return {player: dict(scores) for player, scores in self.scores.items()}
+
+    def merge(self, scores, base):
+        """Добавить отсечения, найденные по копии: прирост scores над исходным счетом base"""
+        with self._lock:
+            for player, player_scores in scores.items():
+                own, start = self.scores[player], base[player]
+                for idx, score in player_scores.items():
+                    gained = score - start.get(idx, 0)
+                    if gained > 0:
+                        own[idx] = own.get(idx, 0) + gained
+
+
+_histories = OrderedDict()
+_histories_lock = threading.Lock()
+
+
+def get_game_history(game_id):
+    """Таблица истории партии game_id; процесс помнит HISTORY_GAMES последних партий"""
+    with _histories_lock:
+        history = _histories.get(game_id)
+        if history is None:
+            history = _histories[game_id] = HistoryTable()
+            if len(_histories) > HISTORY_GAMES:
+                _histories.popitem(last=False)
+        else:
+            _histories.move_to_end(game_id)
+        return history
+
+
+class MoveOrdering:
+    """Порядок ходов в узлах поиска
+
+    Состав узла прежний - ходы с наибольшим приростом оценки, - а порядок такой:
+    ход из таблицы транспозиций, ходы-угрозы (пятерки, четверки и их закрытия по
+    счетчикам отрезков IncrementalEvaluator.move_counts), затем остальные.
+
+    Прирост оценки сам по себе упорядочивает ходы хорошо (отсечение первым ходом
+    в ~95% узлов), а киллеры и история, поставленные выше него, увеличивали
+    дерево. Поэтому среди остальных ходов киллер-ходы полухода и таблица истории
+    решают порядок только при почти равном приросте (в пределах GAIN_BUCKET).
+
+    Считает узлы с отсечением и долю отсечений на первом же ходе.
+    """
+
+    def __init__(self, history=None):
+        self.history = history if history is not None else HistoryTable()
+        self.killers = []
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def new_search(self):
+        """Начать поиск: киллеры сбрасываются, история стареет"""
+        self.killers = []
+        self.history.age()
+        self.reset_stats()
+
+    def order(self, game, player, indices, width, ply, hash_move=None):
+        """Не больше width ходов с наибольшим приростом оценки (плюс хэш-ход) в порядке перебора"""
+        evaluator = game.evaluator
+        gain = evaluator.gain
+        scored = sorted(((gain(idx, player), idx) for idx in indices), reverse=True)
+        selected = {idx: value for value, idx in scored[:width]}
+        if hash_move is not None and hash_move not in selected:
+            selected[hash_move] = gain(hash_move, player)
+
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+
+        move_counts = evaluator.move_counts
+        opponent = 'O' if player == 'X' else 'X'
+        history = self.history.scores[player]
+        keys = []
+        for idx, value in selected.items():
+            if idx == hash_move:
+                tier = TIER_HASH
+            elif value < THREAT_GAIN:
+                tier = TIER_QUIET
+            else:
+                own = move_counts(idx, player)
+                theirs = move_counts(idx, opponent)
+                if (own >> FIVE_SHIFT) & COUNT_MASK:
+                    tier = TIER_FIVE
+                elif (theirs >> FIVE_SHIFT) & COUNT_MASK:
+                    tier = TIER_BLOCK_FIVE
+                elif (own >> FOUR_SHIFT) & COUNT_MASK:
+                    tier = TIER_FOUR
+                elif (theirs >> FOUR_SHIFT) & COUNT_MASK:
+                    tier = TIER_BLOCK_FOUR
+                else:
+                    tier = TIER_QUIET
+            keys.append((tier, value // GAIN_BUCKET, idx in killers, history.get(idx, 0), value, idx))
+        keys.sort(reverse=True)
+        return [key[-1] for key in keys]
+
+    def record_cutoff(self, player, idx, depth, ply, move_number):
+        """Ход idx (move_number-й в порядке перебора) вызвал отсечение"""
+        self.cutoffs += 1
+        if move_number == 0:
+            self.first_move_cutoffs += 1
+        self.history.add(player, idx, depth)
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if idx not in killers:
+            killers.insert(0, idx)
+            del killers[KILLER_SLOTS:]
+
+    @property
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
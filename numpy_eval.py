@@ -0,0 +1,125 @@
+import logging
+from functools import lru_cache
+
+from game_logic import LINE_DIRECTIONS
+from patterns import BLOCKED, FEATURE_BITS, FEATURE_MASK, OWN, TABLE_SPECS, get_pattern_tables
+
+logger = logging.getLogger(__name__)
+
+# NumPy - необязательная зависимость: без нее остается чисто питоновская оценка
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - зависит от окружения
+    np = None
+
+NUMPY_AVAILABLE = np is not None
+
+# Ширина рамки вокруг доски: самое широкое окно таблиц паттернов не выходит за массив
+BORDER = max(half for half, _, _ in TABLE_SPECS.values())
+
+
+@lru_cache(maxsize=None)
+def window_gather(board_size, half):
+    """Номера клеток окон полуширины half в плоском массиве доски с рамкой
+
+    Массив (4, N * N, 2 * half): для каждого направления и клетки - соседи на смещениях
+    -half..-1, 1..half в том же порядке, в котором patterns.window_key() берет цифры.
+    """
+    width = board_size + 2 * BORDER
+    offsets = list(range(-half, 0)) + list(range(1, half + 1))
+    rows, cols = np.divmod(np.arange(board_size * board_size), board_size)
+    gather = np.empty((len(LINE_DIRECTIONS), board_size * board_size, len(offsets)), dtype=np.intp)
+    for d, (dr, dc) in enumerate(LINE_DIRECTIONS):
+        for k, offset in enumerate(offsets):
+            gather[d, :, k] = (rows + BORDER + offset * dr) * width + cols + BORDER + offset * dc
+    return gather
+
+
+@lru_cache(maxsize=None)
+def window_weights(half):
+    """Веса цифр окна в индексе таблицы: 3^0 .. 3^(2 * half - 1)"""
+    return 3 ** np.arange(2 * half, dtype=np.int32)
+
+
+class NumpyBoardScan:
+    """Пакетный просмотр всей доски на NumPy
+
+    Доска хранится плоским массивом int8 с рамкой из BLOCKED. Для обоих игроков и
+    таблицы паттернов индексы окон всех клеток по четырем направлениям считаются
+    одной выборкой по заранее построенным номерам соседей (window_gather) и
+    скалярным произведением с весами, а значения берутся из тех же таблиц, что и в
+    IncrementalEvaluator, поэтому ответы обоих путей совпадают.
+
+    Снимок относится к одной позиции; scan_for() пересоздает его при изменении доски.
+    """
+
+    def __init__(self, game):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("NumPy не установлен")
+        self.geometry = game.geometry
+        self.board_size = game.board_size
+        self.position_key = (game.position_hash, game.move_count)
+        self.patterns = get_pattern_tables()
+
+        size = self.board_size
+        stride = self.geometry.stride
+        # Клетки GameLogic.cells как байты, без сторожевого столбца
+        cells = np.frombuffer(''.join(game.cells[:stride * size]).encode('ascii'), dtype=np.uint8)
+        cells = cells.reshape(size, stride)[:, :size]
+        # Цифры клеток относительно каждого игрока (см. patterns.py), рамка - край доски
+        self.digits = {}
+        for player in ('X', 'O'):
+            digits = np.full((size + 2 * BORDER, size + 2 * BORDER), BLOCKED, dtype=np.int8)
+            inner = digits[BORDER:BORDER + size, BORDER:BORDER + size]
+            inner[cells == ord('.')] = 0
+            inner[cells == ord(player)] = OWN
+            self.digits[player] = digits.ravel()
+        self.empty = (cells == ord('.')).ravel()
+        self._values = {}
+
+    def window_keys(self, player, half):
+        """Индексы таблиц полуширины half для всех клеток: массив (4, N * N)
+
+        Совпадает с patterns.window_key(): младшие цифры - левая половина окна,
+        центральная клетка в индекс не входит.
+        """
+        windows = self.digits[player][window_gather(self.board_size, half)].astype(np.int32)
+        return windows @ window_weights(half)
+
+    def values(self, name, player):
+        """Значения таблицы name по направлениям для всех клеток: массив (4, N * N)"""
+        key = (name, player)
+        if key not in self._values:
+            table = np.frombuffer(getattr(self.patterns, name), dtype=np.int32)
+            self._values[key] = table[self.window_keys(player, TABLE_SPECS[name][0])]
+        return self._values[key]
+
+    def _positions(self, indices):
+        """Номера клеток GameLogic.cells -> номера в массиве N * N"""
+        rows, cols = np.divmod(np.asarray(indices, dtype=np.intp), self.geometry.stride)
+        return rows * self.board_size + cols
+
+    def feature_counts(self, player, field):
+        """Счетчик признака угроз field (FIVE, FOUR, OPEN_THREE... из patterns.py) для хода
+        player в каждую клетку доски: массив (N, N), на занятых клетках - нули"""
+        totals = self.values('threat_features', player).sum(axis=0)
+        counts = (totals >> (field * FEATURE_BITS)) & FEATURE_MASK
+        counts[~self.empty] = 0
+        return counts.reshape(self.board_size, self.board_size)
+
+    def window_values(self, name, player, idx):
+        """То же, что IncrementalEvaluator.window_values"""
+        position = self._positions([idx])[0]
+        return tuple(self.values(name, player)[:, position].tolist())
+
+    def window_sums(self, name, player, indices):
+        """То же, что IncrementalEvaluator.window_sums"""
+        values = self.values(name, player)[:, self._positions(indices)]
+        return values.sum(axis=0).tolist()
+
+
+def scan_for(game, previous=None):
+    """Снимок доски для текущей позиции game (переиспользует previous, если позиция та же)"""
+    if previous is not None and previous.position_key == (game.position_hash, game.move_count):
+        return previous
+    return NumpyBoardScan(game)
@@ -0,0 +1,117 @@
+import logging
+import mmap
+import os
+import struct
+from functools import lru_cache
+
+from symmetry import canonical_key, inverse_transform
+
+logger = logging.getLogger(__name__)
+
+# Файл книги (можно переопределить переменной окружения); строится build_opening_book.py
+BOOK_PATH = os.environ.get(
+    'GOMOKU_OPENING_BOOK',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening_book.bin')
+)
+
+BOOK_MAGIC = b'GMKBOOK1'
+# Заголовок: метка, размер доски, наибольшее число фигур в позициях книги, число
+# позиций, число слотов (степень двойки, позиции занимают не больше половины)
+HEADER = struct.Struct('<8sHHII')
+# Слот: канонический ключ позиции и клетка хода row * board_size + col в каноническом виде
+ENTRY = struct.Struct('<QH')
+# Ход пустого слота
+EMPTY_MOVE = 0xFFFF
+
+
+class OpeningBook:
+    """Дебютная книга в файле с открытой адресацией, отображенном в память
+
+    Позиция ищется по каноническому ключу (symmetry.canonical_key), так что одна запись
+    покрывает все 8 симметричных копий; ход хранится в каноническом виде и
+    переводится обратно симметрией позиции. Поиск - O(1): чтение нескольких
+    слотов подряд, без загрузки книги целиком.
+
+    Без файла (path=None или ошибка чтения) книга пуста и ничего не находит.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.board_size = 0
+        self.max_stones = -1
+        self.entries = 0
+        self.slots = 0
+        self.hits = 0
+        self.misses = 0
+        self._map = None
+        if path:
+            self._open(path)
+
+    def _open(self, path):
+        try:
+            with open(path, 'rb') as f:
+                book_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Дебютная книга не загружена: {e}")
+            return
+        magic, board_size, max_stones, entries, slots = HEADER.unpack_from(book_map.read(HEADER.size).ljust(HEADER.size))
+        if (magic != BOOK_MAGIC or not slots or slots & (slots - 1)
+                or len(book_map) != HEADER.size + slots * ENTRY.size):
+            logger.warning(f"⚠️ Файл {path} не является дебютной книгой")
+            book_map.close()
+            return
+        self.board_size, self.max_stones, self.entries, self.slots = board_size, max_stones, entries, slots
+        self._map = book_map
+        logger.info(f"📚 Дебютная книга: {entries} позиций до {max_stones} фигур ({path})")
+
+    def __len__(self):
+        return self.entries
+
+    def lookup(self, game):
+        """Ход книги (row, col) для позиции game или None"""
+        if self._map is None or game.board_size != self.board_size or game.move_count > self.max_stones:
+            return None
+        key, symmetry = canonical_key(game)
+        mask = self.slots - 1
+        slot = key & mask
+        while True:
+            stored_key, move = ENTRY.unpack_from(self._map, HEADER.size + slot * ENTRY.size)
+            if move == EMPTY_MOVE:
+                self.misses += 1
+                return None
+            if stored_key == key:
+                break
+            slot = (slot + 1) & mask
+        row, col = inverse_transform(*divmod(move, self.board_size), self.board_size, symmetry)
+        if game.get_cell(row, col) != '.':
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row, col
+
+
+def write_book(path, board_size, max_stones, entries):
+    """Записать книгу: entries - {канонический ключ: ход (row, col) в каноническом виде}"""
+    slots = 2
+    while slots < 2 * len(entries):
+        slots <<= 1
+    mask = slots - 1
+    table = [(0, EMPTY_MOVE)] * slots
+    for key, (row, col) in entries.items():
+        slot = key & mask
+        while table[slot][1] != EMPTY_MOVE:
+            slot = (slot + 1) & mask
+        table[slot] = (key, row * board_size + col)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(BOOK_MAGIC, board_size, max_stones, len(entries), slots))
+        for key, move in table:
+            f.write(ENTRY.pack(key, move))
+    os.replace(tmp_path, path)
+
+
+@lru_cache(maxsize=None)
+def get_opening_book():
+    """Общая для процесса дебютная книга из BOOK_PATH"""
+    return OpeningBook(BOOK_PATH)
@@ -0,0 +1,242 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+from game_logic import GameLogic
+from move_ordering import HistoryTable, MoveOrdering
+from search import MAX_PLY, ROOT_WIDTH, WIN_SCORE, SearchEngine, SearchResult
+from time_manager import Deadline
+from transposition import get_transposition_table
+
+logger = logging.getLogger(__name__)
+
+# Число процессов поиска по умолчанию; 1 - поиск в текущем процессе, как раньше
+SEARCH_WORKERS = int(os.environ.get('GOMOKU_SEARCH_WORKERS', 1))
+# Запас времени на обмен с процессами пула: ответ должен уложиться в срок хода
+EXCHANGE_MARGIN = 0.05
+# Сколько ждать пул сверх жесткого срока, прежде чем считать его зависшим
+POOL_TIMEOUT_GRACE = 2.0
+# Флагов отмены у пула: столько его поисков одновременно можно отменить через stop_event
+CANCEL_SLOTS = 64
+# Как часто ждущий поток проверяет stop_event
+STOP_POLL = 0.05
+
+_pools = {}
+_pools_lock = threading.Lock()
+# Флаги отмены пула в процессе поиска (задаются при запуске процесса)
+_cancel_flags = None
+
+
+def _init_worker(flags):
+    global _cancel_flags
+    _cancel_flags = flags
+
+
+class CancelFlag:
+    """stop_event поиска в процессе пула: флаг отмены в общей памяти пула"""
+
+    def __init__(self, slot):
+        self.slot = slot
+
+    def is_set(self):
+        return _cancel_flags[self.slot] != 0
+
+
+class SearchPool:
+    """Пул процессов поиска и флаги отмены его поисков в общей памяти
+
+    Поиск занимает слот флага на время работы; родитель ставит флаг, когда
+    срабатывает stop_event, и процессы прерывают свои доли, как по жесткому сроку.
+    """
+
+    def __init__(self, workers):
+        context = multiprocessing.get_context()
+        self.flags = context.RawArray('b', CANCEL_SLOTS)
+        self.pool = context.Pool(workers, initializer=_init_worker, initargs=(self.flags,))
+        self._free = list(range(CANCEL_SLOTS))
+        self._lock = threading.Lock()
+
+    def acquire_slot(self):
+        """Свободный слот флага отмены или None, если все заняты (поиск тогда не отменяется)"""
+        with self._lock:
+            if not self._free:
+                return None
+            slot = self._free.pop()
+            self.flags[slot] = 0
+            return slot
+
+    def release_slot(self, slot):
+        if slot is not None:
+            with self._lock:
+                self._free.append(slot)
+
+
+def get_pool(workers):
+    """Пул из workers процессов; создается один раз и переиспользуется между ходами"""
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = SearchPool(workers)
+            logger.info(f"🧵 Пул поиска: {workers} процессов")
+        return pool
+
+
+def shutdown_pools():
+    """Остановить все пулы поиска"""
+    with _pools_lock:
+        for search_pool in _pools.values():
+            search_pool.pool.terminate()
+            search_pool.pool.join()
+        _pools.clear()
+
+
+def encode_position(game):
+    """Компактная позиция для передачи в процесс: (размер доски, клетки '.XO' одной строкой, кто ходит)"""
+    return game.board_size, ''.join(''.join(row) for row in game.board), game.current_player
+
+
+def decode_position(position):
+    """GameLogic по позиции из encode_position()"""
+    board_size, cells, current_player = position
+    game = GameLogic(board_size)
+    game.board = [list(cells[row * board_size:(row + 1) * board_size]) for row in range(board_size)]
+    game.current_player = current_player
+    game.move_count = len(cells) - cells.count('.')
+    return game
+
+
+def _search_slice(task):
+    """Поиск в процессе пула по своей доле ходов корня
+
+    Порядок ходов опирается на копию таблицы истории партии; киллеры у каждой доли
+    свои. Возвращает итоги итераций, счетчики узлов и счет истории после поиска -
+    только числа, без объектов игры.
+    """
+    position, moves, max_depth, deadline, slot, history_scores = task
+    game = decode_position(position)
+    stop_event = CancelFlag(slot) if slot is not None else None
+    history = HistoryTable()
+    history.scores = history_scores
+    engine = SearchEngine(max_depth, deadline.remaining(), table=get_transposition_table(),
+                          ordering=MoveOrdering(history), stop_event=stop_event)
+    result = engine.search(game, moves, deadline)
+    return result.iterations, result.nodes, result.cutoffs, result.first_move_cutoffs, history.scores
+
+
+class ParallelSearch:
+    """Поиск с разделением ходов корня между процессами пула
+
+    Ходы корня упорядочиваются как в SearchEngine и раздаются процессам через
+    один, чтобы у каждого были и сильные, и слабые ходы. Каждый процесс ведет
+    итеративное углубление по своей доле до общего срока хода (Deadline на
+    монотонных часах, общих для процессов), со своей таблицей транспозиций. Итог - лучший ход
+    на наибольшей глубине, которую завершили все процессы: на одной глубине
+    оценки корней разных долей сравнимы.
+
+    Процессы получают копию таблицы истории ordering и стареют ее, как при
+    обычном поиске; отсечения, найденные каждым, вливаются обратно в историю партии.
+
+    При workers=1 или сбое пула поиск идет в текущем процессе.
+    """
+
+    def __init__(self, max_depth, max_time, workers=SEARCH_WORKERS, table=None, ordering=None, stop_event=None):
+        self.max_depth = max_depth
+        self.max_time = max_time
+        self.workers = workers
+        self.table = table
+        self.ordering = ordering if ordering is not None else MoveOrdering()
+        self.stop_event = stop_event
+
+    def search(self, game, candidates=None, deadline=None) -> SearchResult:
+        deadline = deadline or Deadline(self.max_time)
+        if self.workers <= 1:
+            return self._serial_search(game, candidates, deadline)
+
+        if candidates is None:
+            candidates = game.get_valid_moves()
+        geometry = game.geometry
+        indices = [geometry.index(row, col) for row, col in candidates]
+        root_moves = self.ordering.order(game, game.current_player, indices, ROOT_WIDTH, 0)
+        if not root_moves:
+            return SearchResult(None, 0, 0, 0, 0.0)
+
+        search_pool = get_pool(self.workers)
+        slot = search_pool.acquire_slot() if self.stop_event is not None else None
+        position = encode_position(game)
+        worker_deadline = deadline.reserve(EXCHANGE_MARGIN)
+        history = self.ordering.history
+        history_scores = history.snapshot()
+        tasks = [(position, [geometry.coords(idx) for idx in root_moves[i::self.workers]],
+                  self.max_depth, worker_deadline, slot, history_scores)
+                 for i in range(min(self.workers, len(root_moves)))]
+        try:
+            replies = self._wait(search_pool, search_pool.pool.map_async(_search_slice, tasks), slot, deadline)
+        except multiprocessing.TimeoutError:
+            logger.error("❌ Пул поиска не ответил в срок, поиск в текущем процессе")
+            # Доли могут еще идти: слот не освобождается, чтобы флаг не достался другому поиску
+            return self._serial_search(game, candidates, deadline)
+        search_pool.release_slot(slot)
+
+        # История стареет так же, как копии в процессах, и получает их прирост
+        history.age()
+        base = history.snapshot()
+        for reply in replies:
+            history.merge(reply[4], base)
+
+        result = self._merge(game, root_moves, replies, deadline.elapsed())
+        logger.info(f"🧵 Параллельный поиск ({len(tasks)} процессов): глубина {result.depth}, "
+                    f"ход {result.move}, оценка {result.score}, {result.nodes} узлов за {result.elapsed:.2f}с")
+        return result
+
+    def _wait(self, search_pool, pending, slot, deadline):
+        """Ответы процессов; stop_event передается им через флаг отмены slot
+
+        Ошибки процессов поднимаются как есть, multiprocessing.TimeoutError - если
+        пул не ответил к сроку с запасом POOL_TIMEOUT_GRACE.
+        """
+        wait_until = time.monotonic() + max(0.0, deadline.remaining()) + POOL_TIMEOUT_GRACE
+        while not pending.ready():
+            if slot is not None and self.stop_event.is_set():
+                search_pool.flags[slot] = 1
+            if time.monotonic() > wait_until:
+                if slot is not None:
+                    search_pool.flags[slot] = 1
+                raise multiprocessing.TimeoutError()
+            pending.wait(STOP_POLL)
+        return pending.get()
+
+    def _serial_search(self, game, candidates, deadline):
+        engine = SearchEngine(self.max_depth, self.max_time, table=self.table, ordering=self.ordering,
+                              stop_event=self.stop_event)
+        return engine.search(game, candidates, deadline)
+
+    @staticmethod
+    def _merge(game, root_moves, replies, elapsed):
+        """Лучший ход на наибольшей глубине, завершенной всеми процессами
+
+        Процесс, чья последняя итерация нашла форсированный результат, дальше не
+        углублялся: его итог годится и для больших глубин.
+        """
+        nodes = sum(reply[1] for reply in replies)
+        cutoffs = sum(reply[2] for reply in replies)
+        first_move_cutoffs = sum(reply[3] for reply in replies)
+        finished = [reply[0] for reply in replies if reply[0]]
+        if not finished:
+            return SearchResult(game.geometry.coords(root_moves[0]), 0, 0, nodes, elapsed,
+                                cutoffs, first_move_cutoffs)
+
+        def forced(iterations):
+            return abs(iterations[-1][2]) >= WIN_SCORE - MAX_PLY
+
+        open_depths = [iterations[-1][0] for iterations in finished if not forced(iterations)]
+        depth = min(open_depths) if open_depths else max(iterations[-1][0] for iterations in finished)
+        merged = []
+        for level in range(1, depth + 1):
+            candidates = [iterations[min(level, len(iterations)) - 1] for iterations in finished]
+            _, move, score = max(candidates, key=lambda item: item[2])
+            merged.append((level, move, score))
+        _, move, score = merged[-1]
+        return SearchResult(game.geometry.coords(move), score, depth, nodes, elapsed,
+                            cutoffs, first_move_cutoffs, merged)
@@ -0,0 +1,254 @@
+import logging
+import os
+from array import array
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Версия таблиц: увеличивать при любом изменении эталонных функций ниже
+TABLES_VERSION = 2
+
+# Файл кэша таблиц (можно переопределить переменной окружения)
+CACHE_PATH = os.environ.get(
+    'GOMOKU_PATTERN_CACHE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pattern_tables.bin')
+)
+
+# Степени тройки для кодов линий
+POW3 = [3 ** i for i in range(40)]
+
+# Цифры кода относительно игрока: пусто, своя фигура, чужая фигура или край доски
+EMPTY, OWN, BLOCKED = 0, 1, 2
+# Символы, которыми цифры раскрываются в строку для эталонных функций
+DIGIT_CHARS = ('.', 'X', 'O')
+
+# Признаки угроз хода в одном направлении (см. threat_features) - счетчики в полях
+# по FEATURE_BITS бит. Сумма значений четырех направлений дает счетчики по всем
+# направлениям сразу; последнее поле (до 8) занимает все старшие биты.
+FEATURE_BITS = 3
+FEATURE_MASK = (1 << FEATURE_BITS) - 1
+(FIVE,                # Ряд из 5+ фигур через ход
+ FOUR,                # Ряд из 4+ фигур через ход
+ RUN_FOUR,            # Ряд ровно из 4 фигур
+ RUN_THREE,           # Ряд ровно из 3 фигур
+ OPEN_FOUR,           # Открытая четверка (линия 11 клеток)
+ OPEN_THREE,          # Открытая тройка (линия 7 клеток)
+ THREAT,              # Тройка любого вида (линия 7 клеток)
+ OPEN_THREE_THROUGH,  # Открытая тройка проходит через пустую клетку хода
+ LINE_THREATS,        # Угрозы линии 9 клеток: 0-2 на направление
+ ) = range(9)
+
+
+
+# Эталонные функции: оценки линии-строки, как их считал AIPlayer.
+# Таблицы генерируются из них, и их же использует дифференциальная проверка.
+
+def line_advanced_score(line_str, symbol):
+    """Продвинутая оценка линии из 13 клеток"""
+    patterns = {
+        f'{symbol * 5}': 100000,  # Пятерка
+        f'.{symbol * 4}.': 50000,  # Открытая четверка
+        f'{symbol * 4}.': 10000,   # Четверка
+        f'.{symbol * 4}': 10000,   # Четверка
+        f'.{symbol * 3}.': 5000,   # Открытая тройка
+        f'{symbol * 3}.': 1000,    # Тройка
+        f'.{symbol * 3}': 1000,    # Тройка
+        f'.{symbol * 2}.': 200,    # Открытая двойка
+        f'{symbol * 2}': 50,       # Двойка
+    }
+    score = 0
+    for pattern, value in patterns.items():
+        score += line_str.count(pattern) * value
+    return score
+
+
+def line_threat_count(line_str, symbol):
+    """Число угроз в линии из 9 клеток: открытая четверка - 2, четверка или открытая тройка - 1"""
+    # Открытая четверка: .XXXX.
+    if f'.{symbol * 4}.' in line_str:
+        return 2
+    # Четверка с одной стороны: XXXX.
+    if f'{symbol * 4}.' in line_str or f'.{symbol * 4}' in line_str:
+        return 1
+    # Открытая тройка: .XXX.
+    if f'.{symbol * 3}.' in line_str:
+        return 1
+    return 0
+
+
+def has_open_three(line_str, symbol):
+    """Открытая тройка .XXX. в линии из 7 клеток"""
+    return f'.{symbol * 3}.' in line_str
+
+
+def creates_threat(line_str, symbol):
+    """Тройка, открытая тройка или разорванная тройка в линии из 7 клеток"""
+    threats = [
+        f'.{symbol * 3}.',  # Открытая тройка
+        f'{symbol * 3}.',   # Тройка с одной стороны
+        f'.{symbol * 3}',   # Тройка с другой стороны
+        f'.{symbol * 2}.{symbol}.', # Разорванная тройка
+        f'.{symbol}.{symbol * 2}.', # Разорванная тройка
+    ]
+    return any(threat in line_str for threat in threats)
+
+
+def direction_threat(line_str, symbol):
+    """Уровень угрозы в линии из 9 клеток"""
+    if f'{symbol * 4}' in line_str:
+        return 5000  # Четверка - критическая угроза
+    if f'.{symbol * 3}.' in line_str:
+        return 3000  # Открытая тройка - серьезная угроза
+    if f'{symbol * 3}.' in line_str or f'.{symbol * 3}' in line_str:
+        return 1500  # Тройка - умеренная угроза
+    if f'.{symbol * 2}.' in line_str:
+        return 800   # Открытая двойка - потенциальная угроза
+    return 0
+
+
+def fork_potential(line_str, symbol):
+    """Потенциал вилки в линии из 9 клеток"""
+    patterns = {
+        f'..{symbol}..': 100,    # Одиночка с пространством
+        f'.{symbol}.{symbol}.': 200,  # Разорванная двойка
+        f'..{symbol}{symbol}.': 150,  # Двойка с пространством
+        f'.{symbol}{symbol}..': 150,  # Двойка с пространством
+    }
+    potential = 0
+    for pattern, value in patterns.items():
+        potential += line_str.count(pattern) * value
+    return potential
+
+
+def has_open_four(line_str, symbol):
+    """Открытая четверка .XXXX. в линии из 11 клеток"""
+    return f'.{symbol * 4}.' in line_str
+
+
+def center_run(line_str, symbol):
+    """Длина непрерывного ряда symbol через центральную клетку линии"""
+    center = len(line_str) // 2
+    count = 1
+    i = center + 1
+    while i < len(line_str) and line_str[i] == symbol:
+        count += 1
+        i += 1
+    i = center - 1
+    while i >= 0 and line_str[i] == symbol:
+        count += 1
+        i -= 1
+    return count
+
+
+def threat_features(line_str, symbol):
+    """Все признаки угроз хода в одном направлении, упакованные в число (линия 11 клеток)"""
+    center = len(line_str) // 2
+    
+    def window(half):
+        return line_str[center - half:center + half + 1]
+    
+    run = center_run(window(4), symbol)
+    counts = {
+        FIVE: run >= 5,
+        FOUR: run >= 4,
+        RUN_FOUR: run == 4,
+        RUN_THREE: run == 3,
+        OPEN_FOUR: has_open_four(line_str, symbol),
+        OPEN_THREE: has_open_three(window(3), symbol),
+        THREAT: creates_threat(window(3), symbol),
+        # Открытая тройка, которую закрывает ход в центр: центр считается пустым
+        OPEN_THREE_THROUGH: has_open_three(window(4)[:4] + '.' + window(4)[5:], symbol),
+        LINE_THREATS: line_threat_count(window(4), symbol),
+    }
+    return sum(int(count) << (field * FEATURE_BITS) for field, count in counts.items())
+
+
+# Таблицы: имя -> (полуширина окна, символ в центре окна, эталонная функция)
+TABLE_SPECS = {
+    'line_advanced': (6, 'X', line_advanced_score),
+    'direction_threat': (4, 'X', direction_threat),
+    'fork_potential': (4, 'X', fork_potential),
+    'threat_features': (5, 'X', threat_features),
+}
+
+
+def window_key(code, pos, half):
+    """Индекс в таблице для окна полуширины half вокруг цифры pos кода линии
+
+    Центральная цифра окна в индекс не входит: при генерации она фиксирована.
+    """
+    power = POW3[half]
+    return (code // POW3[pos - half]) % power + (code // POW3[pos + 1]) % power * power
+
+
+def window_string(key, half, center):
+    """Строка окна для индекса таблицы (обратное к window_key)"""
+    left = ''.join(DIGIT_CHARS[(key // POW3[k]) % 3] for k in range(half))
+    right = ''.join(DIGIT_CHARS[(key // POW3[half + k]) % 3] for k in range(half))
+    return left + center + right
+
+
+def _halves(half):
+    """Все строки половины окна, по индексу половины"""
+    # Младшая цифра - самая левая клетка половины
+    return [''.join(DIGIT_CHARS[(n // POW3[k]) % 3] for k in range(half)) for n in range(POW3[half])]
+
+
+def _generate_table(half, center, function):
+    halves = _halves(half)
+    values = array('i')
+    for right in halves:
+        tail = center + right
+        values.extend(int(function(left + tail, 'X')) for left in halves)
+    return values
+
+
+class PatternTables:
+    """Таблицы оценок для всех окон, закодированных по основанию 3"""
+
+    def __init__(self, tables):
+        for name, values in tables.items():
+            setattr(self, name, values)
+
+
+def _read_cache(path):
+    with open(path, 'rb') as f:
+        header = f.readline().decode('ascii').split()
+        if header != ['gomoku-patterns', str(TABLES_VERSION)]:
+            return None
+        tables = {}
+        for name, (half, _, _) in TABLE_SPECS.items():
+            values = array('i')
+            values.fromfile(f, POW3[2 * half])
+            tables[name] = values
+        return tables
+
+
+def _write_cache(path, tables):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(f"gomoku-patterns {TABLES_VERSION}\n".encode('ascii'))
+        for name in TABLE_SPECS:
+            tables[name].tofile(f)
+    os.replace(tmp_path, path)
+
+
+@lru_cache(maxsize=None)
+def get_pattern_tables():
+    """Загрузить таблицы из кэша или сгенерировать их (один раз на процесс)"""
+    try:
+        tables = _read_cache(CACHE_PATH)
+        if tables is not None:
+            return PatternTables(tables)
+    except (OSError, EOFError, ValueError, UnicodeDecodeError):
+        pass
+
+    logger.info("🧩 Генерация таблиц паттернов...")
+    tables = {name: _generate_table(half, center, function)
+              for name, (half, center, function) in TABLE_SPECS.items()}
+    try:
+        _write_cache(CACHE_PATH, tables)
+        logger.info(f"💾 Таблицы паттернов сохранены: {CACHE_PATH}")
+    except OSError as e:
+        logger.warning(f"⚠️ Не удалось сохранить таблицы паттернов: {e}")
+    return PatternTables(tables)
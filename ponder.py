@@ -0,0 +1,183 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
+
+from ai_player import AIPlayer
+from move_ordering import MoveOrdering
+from parallel_search import decode_position, encode_position
+from time_manager import Deadline
+
+logger = logging.getLogger(__name__)
+
+# Обдумывание на ходу человека включается явно
+PONDER_ENABLED = os.environ.get('GOMOKU_PONDER', '0') == '1'
+# Доля одного ядра, которую обдумывание всех партий может занять в скользящем окне
+PONDER_CPU_SHARE = float(os.environ.get('GOMOKU_PONDER_CPU', 0.5))
+PONDER_WINDOW = 60.0
+# Сколько самых вероятных ответов человека обдумывается
+PONDER_REPLIES = 3
+# Меньше этого остатка бюджета обдумывать не начинаем
+MIN_PONDER_SECONDS = 0.5
+# Для скольких партий хранятся готовые ходы (брошенные партии вытесняются)
+PONDER_GAMES = 256
+# Сколько stop() ждет, пока прерванный поиск обдумывания отпустит партию
+STOP_WAIT = 1.0
+
+
+class CpuBudget:
+    """Процессорное время на обдумывание: не больше share ядра за последние window секунд"""
+
+    def __init__(self, share=PONDER_CPU_SHARE, window=PONDER_WINDOW):
+        self.capacity = share * window
+        self.window = window
+        self._spent = deque()
+        self._lock = threading.Lock()
+
+    def available(self):
+        """Сколько секунд процессора можно потратить сейчас"""
+        now = time.time()
+        with self._lock:
+            while self._spent and self._spent[0][0] < now - self.window:
+                self._spent.popleft()
+            return self.capacity - sum(seconds for _, seconds in self._spent)
+
+    def charge(self, seconds):
+        with self._lock:
+            self._spent.append((time.time(), seconds))
+
+
+class Ponderer:
+    """Обдумывание позиции, пока человек думает над ходом
+
+    После ответа ИИ фоновый поток перебирает самые вероятные ответы человека
+    (по MoveOrdering) и для каждого заранее считает ход ИИ обычным get_move.
+    Готовые ходы хранятся по (game_id, хэш позиции): если человек сходил одним из
+    предсказанных ходов, ответ берется сразу через take(). Поиск по остальным
+    ответам заполняет общую таблицу транспозиций, и обычный поиск после
+    непредсказанного хода тоже идет быстрее.
+
+    Поток один на процесс: задания разных партий выполняются по очереди, новое
+    задание партии заменяет старое, а весь расход ограничен CpuBudget.
+    """
+
+    def __init__(self, budget=None, replies=PONDER_REPLIES):
+        self.budget = budget or CpuBudget()
+        self.replies = replies
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._jobs = OrderedDict()
+        self._results = OrderedDict()
+        self._current = None
+        self._thread = None
+
+    def start(self, game_id, game, symbol):
+        """Начать обдумывание позиции game, где ходит человек, а ИИ играет за symbol"""
+        if not game_id or game.game_over:
+            return
+        with self._lock:
+            self._stop_current(game_id)
+            self._jobs[game_id] = (encode_position(game), symbol)
+            self._jobs.move_to_end(game_id)
+            self._results[game_id] = {}
+            self._results.move_to_end(game_id)
+            if len(self._results) > PONDER_GAMES:
+                self._results.popitem(last=False)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='ponder', daemon=True)
+                self._thread.start()
+            self._wakeup.notify_all()
+
+    def take(self, game_id, position_hash):
+        """Готовый ход ИИ для позиции с хэшем position_hash или None"""
+        with self._lock:
+            return self._results.get(game_id, {}).pop(position_hash, None)
+
+    def cancel(self, game_id):
+        """Остановить обдумывание партии и забыть ее готовые ходы"""
+        with self._lock:
+            self._jobs.pop(game_id, None)
+            self._results.pop(game_id, None)
+            self._stop_current(game_id)
+
+    def stop(self, game_id, timeout=STOP_WAIT):
+        """Остановить обдумывание партии, сохранив уже готовые ходы (пришел ход человека)
+
+        Ждет (не дольше timeout), пока прерванный поиск закончится: иначе он делил бы
+        процессор и таблицу истории партии с обычным поиском хода ИИ.
+        """
+        deadline = time.time() + timeout
+        with self._lock:
+            self._jobs.pop(game_id, None)
+            self._stop_current(game_id)
+            while self._current is not None and self._current[0] == game_id:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    logger.warning(f"⚠️ Обдумывание партии {game_id} не остановилось за {timeout}с")
+                    return False
+                self._wakeup.wait(remaining)
+            return True
+
+    def wait_idle(self, timeout=None):
+        """Дождаться окончания всех заданий; False, если timeout истек раньше"""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._lock:
+            while self._jobs or self._current is not None:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._wakeup.wait(remaining)
+            return True
+
+    def _stop_current(self, game_id):
+        if self._current is not None and self._current[0] == game_id:
+            self._current[1].set()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._jobs:
+                    self._wakeup.wait()
+                game_id, (position, symbol) = self._jobs.popitem(last=False)
+                stop_event = threading.Event()
+                self._current = (game_id, stop_event)
+            try:
+                self._ponder(game_id, position, symbol, stop_event)
+            except Exception as e:
+                logger.error(f"❌ Ошибка обдумывания: {e}")
+            finally:
+                with self._lock:
+                    self._current = None
+                    self._wakeup.notify_all()
+
+    def _ponder(self, game_id, position, symbol, stop_event):
+        game = decode_position(position)
+        human = game.current_player
+        replies = MoveOrdering().order(game, human, game.frontier, self.replies, 0)
+        coords = game.geometry.coords
+        for idx in replies:
+            seconds = self.budget.available()
+            if stop_event.is_set() or seconds < MIN_PONDER_SECONDS:
+                break
+            row, col = coords(idx)
+            with game.temporary_move(row, col):
+                if game.game_over:
+                    continue
+                ai = AIPlayer(symbol, game_id=game_id, stop_event=stop_event)
+                cpu_start = time.thread_time()
+                move = ai.get_move(game, Deadline(min(ai.max_time, seconds)))
+                self.budget.charge(time.thread_time() - cpu_start)
+                if move is None or stop_event.is_set():
+                    continue
+                with self._lock:
+                    if game_id in self._results:
+                        self._results[game_id][game.position_hash] = move
+            logger.info(f"💭 Обдумано: на ход {(row, col)} ответ {move}")
+
+
+@lru_cache(maxsize=None)
+def get_ponderer():
+    """Общий для процесса Ponderer"""
+    return Ponderer()
@@ -0,0 +1,166 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
+from symmetry import canonical_key, inverse_transform, transform
+
+logger = logging.getLogger(__name__)
+
+# Файл кэша ходов, общий для всех процессов gunicorn; пустая строка отключает кэш
+RESULT_CACHE_PATH = os.environ.get(
+    'GOMOKU_RESULT_CACHE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'result_cache.sqlite3')
+)
+# Наибольшее число позиций и срок жизни записи (секунды)
+RESULT_CACHE_ENTRIES = int(os.environ.get('GOMOKU_RESULT_CACHE_ENTRIES', 100000))
+RESULT_CACHE_TTL = float(os.environ.get('GOMOKU_RESULT_CACHE_TTL', 7 * 24 * 3600))
+# Время последнего использования записи обновляется не чаще раза в TOUCH_INTERVAL секунд
+TOUCH_INTERVAL = 60.0
+# Вытеснение лишних и устаревших записей - раз в EVICT_EVERY записей процесса
+EVICT_EVERY = 100
+# Сколько ждать блокировку файла другим процессом
+BUSY_TIMEOUT = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS moves (
+    key INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    config TEXT NOT NULL,
+    move INTEGER NOT NULL,
+    score INTEGER,
+    created REAL NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (key, symbol, config)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS moves_used ON moves (used);
+"""
+
+
+def _signed(key):
+    """64-битный ключ без знака -> INTEGER SQLite (со знаком)"""
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+class ResultCache:
+    """Кэш выбранных ИИ ходов между сессиями и процессами
+
+    Ключ - канонический хэш позиции (symmetry.canonical_key), символ ИИ и
+    настройки движка (AIPlayer.config_key); ход хранится в каноническом виде,
+    так что повернутые и отраженные позиции тоже находят запись. Записи лежат в
+    файле SQLite (режим WAL), общем для всех процессов gunicorn; лишние
+    вытесняются по давности использования (LRU), старые - по сроку жизни (TTL).
+
+    Кэш не должен ломать ход: любая ошибка SQLite считается промахом.
+    Счетчики попаданий - свои у каждого процесса.
+    """
+
+    def __init__(self, path=RESULT_CACHE_PATH, entries=RESULT_CACHE_ENTRIES, ttl=RESULT_CACHE_TTL):
+        self.path = path
+        self.entries = entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def get(self, game, symbol, config):
+        """Ход (row, col) из кэша для позиции game или None"""
+        if not self.path:
+            return None
+        key, symmetry = canonical_key(game)
+        now = time.time()
+        try:
+            connection = self._connection()
+            row = connection.execute(
+                'SELECT move, created, used FROM moves WHERE key = ? AND symbol = ? AND config = ?',
+                (_signed(key), symbol, config)).fetchone()
+            if row is not None and row[1] < now - self.ttl:
+                connection.execute('DELETE FROM moves WHERE key = ? AND symbol = ? AND config = ?',
+                                   (_signed(key), symbol, config))
+                row = None
+            if row is not None and row[2] < now - TOUCH_INTERVAL:
+                connection.execute('UPDATE moves SET used = ? WHERE key = ? AND symbol = ? AND config = ?',
+                                   (now, _signed(key), symbol, config))
+        except sqlite3.Error as e:
+            self._error(e)
+            return None
+
+        if row is not None:
+            move = inverse_transform(*divmod(row[0], game.board_size), game.board_size, symmetry)
+            if game.get_cell(*move) == '.':
+                self.hits += 1
+                return move
+        self.misses += 1
+        return None
+
+    def put(self, game, symbol, config, move, score=None):
+        """Запомнить ход move (row, col), выбранный ИИ symbol в позиции game"""
+        if not self.path:
+            return
+        key, symmetry = canonical_key(game)
+        row, col = transform(*move, game.board_size, symmetry)
+        now = time.time()
+        try:
+            connection = self._connection()
+            connection.execute('INSERT OR REPLACE INTO moves VALUES (?, ?, ?, ?, ?, ?, ?)',
+                               (_signed(key), symbol, config, row * game.board_size + col, score, now, now))
+            self.stores += 1
+            if self.stores % EVICT_EVERY == 0:
+                self.evict(now)
+        except sqlite3.Error as e:
+            self._error(e)
+
+    def evict(self, now=None):
+        """Удалить устаревшие записи и самые давно использованные сверх entries"""
+        now = now or time.time()
+        connection = self._connection()
+        connection.execute('DELETE FROM moves WHERE created < ?', (now - self.ttl,))
+        excess = connection.execute('SELECT COUNT(*) FROM moves').fetchone()[0] - self.entries
+        if excess > 0:
+            connection.execute('DELETE FROM moves WHERE (key, symbol, config) IN '
+                               '(SELECT key, symbol, config FROM moves ORDER BY used LIMIT ?)', (excess,))
+
+    def clear(self):
+        if self.path:
+            self._connection().execute('DELETE FROM moves')
+
+    def stats(self):
+        """Счетчики процесса и число записей в файле"""
+        lookups = self.hits + self.misses
+        try:
+            size = self._connection().execute('SELECT COUNT(*) FROM moves').fetchone()[0] if self.path else 0
+        except sqlite3.Error as e:
+            self._error(e)
+            size = None
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'stores': self.stores,
+            'errors': self.errors,
+            'entries': size,
+        }
+
+    def _error(self, error):
+        self.errors += 1
+        logger.warning(f"⚠️ Ошибка кэша ходов: {error}")
+
+
+@lru_cache(maxsize=None)
+def get_result_cache():
+    """Общий для процесса кэш ходов в RESULT_CACHE_PATH"""
+    return ResultCache()
@@ -0,0 +1,254 @@
+import logging
+
+from move_ordering import MoveOrdering
+from time_manager import Deadline
+from transposition import EXACT, LOWER, UPPER
+
+logger = logging.getLogger(__name__)
+
+# Оценка выигранной позиции; победа на меньшей глубине ценится выше
+WIN_SCORE = 10 ** 9
+# Оценки от WIN_SCORE - MAX_PLY и выше означают найденную форсированную победу
+MAX_PLY = 64
+
+# Сколько лучших по приросту оценки ходов рассматривается в корне и во внутренних узлах
+ROOT_WIDTH = 20
+SEARCH_WIDTH = 10
+
+# Как часто (в узлах) проверяется время
+TIME_CHECK_NODES = 256
+
+
+class SearchTimeout(Exception):
+    """Время на итерацию вышло (или поиск остановлен); ход берется из последней завершенной итерации"""
+
+
+class SearchResult:
+    """Результат поиска: лучший ход последней завершенной итерации и статистика"""
+
+    def __init__(self, move, score, depth, nodes, elapsed, cutoffs=0, first_move_cutoffs=0, iterations=()):
+        self.move = move
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.cutoffs = cutoffs
+        self.first_move_cutoffs = first_move_cutoffs
+        # Итоги завершенных итераций: (глубина, номер клетки хода, оценка)
+        self.iterations = iterations
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def first_move_cutoff_rate(self):
+        """Доля узлов с отсечением, в которых отсек первый же ход"""
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+
+class SearchEngine:
+    """Negamax с alpha-beta отсечениями и итеративным углублением
+
+    Ходы делаются через GameLogic.push/pop, листья оцениваются инкрементальной
+    оценкой позиции (game.evaluator.score), в узле остаются ходы с наибольшим
+    приростом этой оценки (game.evaluator.gain), а порядок их перебора задает
+    MoveOrdering (move_ordering.py).
+
+    Если передана таблица транспозиций (transposition.py), позиции, повторно
+    достигнутые другим порядком ходов, берут оценку из нее, а сохраненный лучший
+    ход позиции проверяется первым.
+
+    Срок задает Deadline (time_manager.py): после мягкого срока следующая
+    итерация не начинается, по жесткому текущая прерывается. stop_event
+    (threading.Event) останавливает поиск из другого потока так же, как жесткий срок.
+    """
+
+    def __init__(self, max_depth, max_time, root_width=ROOT_WIDTH, width=SEARCH_WIDTH, table=None,
+                 ordering=None, stop_event=None):
+        self.max_depth = max_depth
+        self.max_time = max_time
+        self.root_width = root_width
+        self.width = width
+        self.table = table
+        self.ordering = ordering if ordering is not None else MoveOrdering()
+        self.stop_event = stop_event
+        self.nodes = 0
+        self.deadline = None
+        # Поиск в общей таблице (transposition.TableSearch) и его статистика после поиска
+        self.table_search = None
+        self.table_stats = None
+
+    def search(self, game, candidates=None, deadline=None) -> SearchResult:
+        """Итеративное углубление до max_depth или до срока deadline (по умолчанию max_time)
+
+        candidates - ходы корня (row, col); по умолчанию все допустимые ходы.
+        Возвращает лучший ход последней полностью завершенной итерации.
+        """
+        if self.table is None:
+            return self._search(game, candidates, deadline)
+        self.table_search = self.table.new_search()
+        try:
+            return self._search(game, candidates, deadline)
+        finally:
+            self.table_stats = self.table_search.stats()
+            self.table_search.finish()
+            self.table_search = None
+
+    def _search(self, game, candidates, deadline):
+        """Тело search(): итерации углубления"""
+        self.deadline = deadline = deadline or Deadline(self.max_time)
+        self.nodes = 0
+        self.ordering.new_search()
+        player = game.current_player
+
+        if candidates is None:
+            candidates = game.get_valid_moves()
+        indices = [game.geometry.index(row, col) for row, col in candidates]
+        # Ход, найденный для этой позиции раньше (например, в прошлом поиске), - первым
+        hash_move = self._hash_move(game)
+        if hash_move not in indices:
+            hash_move = None
+        root_moves = self.ordering.order(game, player, indices, self.root_width, 0, hash_move)
+        if not root_moves:
+            return SearchResult(None, 0, 0, 0, 0.0)
+
+        best_move, best_score, completed_depth = root_moves[0], 0, 0
+        iterations = []
+        for depth in range(1, self.max_depth + 1):
+            if depth > 1 and deadline.soft_expired():
+                logger.info(f"⏱️ Мягкий срок истек, итерация глубины {depth} не начинается")
+                break
+            try:
+                move, score = self._search_root(game, root_moves, depth)
+            except SearchTimeout:
+                logger.info(f"⏱️ Итерация глубины {depth} прервана по времени")
+                break
+            best_move, best_score, completed_depth = move, score, depth
+            iterations.append((depth, move, score))
+            # Лучший ход итерации первым в следующей: отсечения срабатывают раньше
+            root_moves.remove(move)
+            root_moves.insert(0, move)
+            # Форсированный результат найден - глубже искать незачем
+            if abs(score) >= WIN_SCORE - MAX_PLY:
+                break
+
+        elapsed = deadline.elapsed()
+        result = SearchResult(game.geometry.coords(best_move), best_score, completed_depth, self.nodes, elapsed,
+                              self.ordering.cutoffs, self.ordering.first_move_cutoffs, iterations)
+        logger.info(f"🔍 Поиск: глубина {result.depth}, ход {result.move}, оценка {result.score}, "
+                    f"{result.nodes} узлов за {elapsed:.2f}с ({result.nodes_per_second:.0f} узлов/с), "
+                    f"отсечение первым ходом {result.first_move_cutoff_rate:.0%}")
+        if self.table_search is not None:
+            stats = self.table_search.stats()
+            logger.info(f"🗃️ Таблица транспозиций: попадания {stats['hit_rate']:.1%}, "
+                        f"вытеснения {stats['eviction_rate']:.1%}, заполнена на {stats['fill']:.1%}")
+        return result
+
+    def _search_root(self, game, root_moves, depth):
+        """Одна итерация: лучший ход корня и его оценка"""
+        alpha, beta = -WIN_SCORE - 1, WIN_SCORE + 1
+        best_move, best_score = root_moves[0], -WIN_SCORE - 1
+        for idx in root_moves:
+            score = -self._search_child(game, idx, depth - 1, -beta, -alpha, 1)
+            if score > best_score:
+                best_move, best_score = idx, score
+            alpha = max(alpha, score)
+        return best_move, best_score
+
+    def _search_child(self, game, idx, depth, alpha, beta, ply):
+        """Сделать ход idx, оценить позицию негамаксом и отменить ход"""
+        row, col = game.geometry.coords(idx)
+        game.push(row, col)
+        try:
+            return self._negamax(game, depth, alpha, beta, ply)
+        finally:
+            game.pop()
+
+    def _negamax(self, game, depth, alpha, beta, ply):
+        """Оценка позиции с точки зрения игрока, который ходит"""
+        self.nodes += 1
+        if self.nodes % TIME_CHECK_NODES == 0 and (
+                self.deadline.expired() or (self.stop_event is not None and self.stop_event.is_set())):
+            raise SearchTimeout()
+
+        if game.game_over:
+            # Партию закончил ход соперника: пятерка - проигрыш ходящего
+            return -(WIN_SCORE - ply) if game.winner else 0
+
+        player = game.current_player
+        evaluator = game.evaluator
+        # У ходящего есть отрезок из четырех фигур с пустой клеткой - пятерка следующим ходом
+        if evaluator.segment_count(player, 4):
+            return WIN_SCORE - ply - 1
+        if depth == 0:
+            return evaluator.score(player)
+
+        table = self.table_search
+        hash_move = None
+        if table is not None:
+            key = game.position_hash
+            entry = table.probe(key)
+            if entry is not None:
+                entry_depth, flag, score, hash_move = entry
+                if entry_depth >= depth:
+                    score = self._from_table(score, ply)
+                    if (flag == EXACT
+                            or (flag == LOWER and score >= beta)
+                            or (flag == UPPER and score <= alpha)):
+                        return score
+                # Ход из таблицы мог попасть туда при совпадении индексов разных позиций
+                if hash_move not in game.frontier:
+                    hash_move = None
+
+        moves = self.ordering.order(game, player, game.frontier, self.width, ply, hash_move)
+        if not moves:
+            return evaluator.score(player)
+
+        best_score = -WIN_SCORE - 1
+        best_move = None
+        original_alpha = alpha
+        for number, idx in enumerate(moves):
+            score = -self._search_child(game, idx, depth - 1, -beta, -alpha, ply + 1)
+            if score > best_score:
+                best_score, best_move = score, idx
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self.ordering.record_cutoff(player, idx, depth, ply, number)
+                        break
+
+        if table is not None:
+            if best_score <= original_alpha:
+                flag = UPPER
+            elif best_score >= beta:
+                flag = LOWER
+            else:
+                flag = EXACT
+            table.store(key, depth, flag, self._to_table(best_score, ply), best_move)
+        return best_score
+
+    def _hash_move(self, game):
+        """Лучший ход позиции из таблицы транспозиций или None"""
+        if self.table_search is None:
+            return None
+        entry = self.table_search.probe(game.position_hash)
+        return entry[3] if entry is not None else None
+
+    @staticmethod
+    def _to_table(score, ply):
+        """Оценка победы в таблице считается от текущей позиции, а не от корня"""
+        if score >= WIN_SCORE - MAX_PLY:
+            return score + ply
+        if score <= -(WIN_SCORE - MAX_PLY):
+            return score - ply
+        return score
+
+    @staticmethod
+    def _from_table(score, ply):
+        """Обратное к _to_table: оценка победы снова считается от корня"""
+        if score >= WIN_SCORE - MAX_PLY:
+            return score - ply
+        if score <= -(WIN_SCORE - MAX_PLY):
+            return score + ply
+        return score
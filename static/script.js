@@ -375,13 +375,6 @@ async function getGameState() {
     }
 }
 
-// Автоматическая синхронизация состояния каждые 5 секунд (отключена для отладки)
-// setInterval(async () => {
-//     if (!gameState.gameOver) {
-//         await getGameState();
-//     }
-// }, 5000);
-
 // Тестовая функция для отладки
 function testBoardUpdate() {
     console.log('🧪 Тестирование обновления доски');
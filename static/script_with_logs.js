@@ -5,7 +5,9 @@ let gameState = {
     aiSymbol: 'O',
     gameOver: false,
     winner: null,
-    moveCount: 0
+    moveCount: 0,
+    checksum: null,  // Контрольная сумма позиции от сервера (протокол дельт)
+    aiJob: null      // Задание ИИ, чей ход ждем по каналу событий
 };
 
 console.log('🚀 JavaScript загружен, начальное состояние:', gameState);
@@ -64,6 +66,7 @@ function initializeBoard() {
     
     // Инициализируем пустую доску в состоянии
     gameState.board = [];
+    gameState.checksum = null;
     for (let row = 0; row < 15; row++) {
         gameState.board[row] = [];
         for (let col = 0; col < 15; col++) {
@@ -159,7 +162,7 @@ async function startNewGame(userSymbol) {
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ symbol: userSymbol })
+            body: JSON.stringify({ symbol: userSymbol, async: !!window.EventSource })
         });
         
         const data = await response.json();
@@ -175,19 +178,27 @@ async function startNewGame(userSymbol) {
             gameState.gameOver = false;
             gameState.winner = null;
             gameState.moveCount = data.move_count || 0;
+            gameState.aiJob = null;
             
             console.log('🔄 Обновленное состояние игры:', gameState);
             console.log('📊 Доска от сервера при создании игры:', data.board);
             
-            // КРИТИЧЕСКИ ВАЖНО: Синхронизируем состояние доски с сервером
-            updateBoard(data.board);
+            // КРИТИЧЕСКИ ВАЖНО: Синхронизируем состояние доски с сервером (новая партия - вся доска)
+            applyPosition(data);
             updateGameInfo(data);
             
             // Оставляем выбор символа видимым для возможности смены
             // document.querySelector('.symbol-selection').style.display = 'none';
             
+            // Ходы ИИ дальше приходят по каналу событий партии
+            openGameChannel();
+            
             // Проверяем, сделал ли ИИ первый ход
-            if (data.ai_move) {
+            if (data.ai_job) {
+                showStatus(`Игра началась! Вы играете за ${userSymbol}. ИИ делает первый ход...`);
+                gameState.aiJob = data.ai_job;
+                showAIThinking();
+            } else if (data.ai_move) {
                 const [aiRow, aiCol] = data.ai_move;
                 console.log(`🤖 ИИ сделал первый ход на [${aiRow}][${aiCol}]`);
                 highlightLastMove(aiRow, aiCol);
@@ -268,25 +279,55 @@ async function handleCellClick(row, col) {
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ row: row, col: col })
+            body: JSON.stringify({ row: row, col: col, async: true, ...deltaParams() })
         });
         
         console.log('📡 Получен ответ от сервера, статус:', response.status);
         
-        const data = await response.json();
+        let data = await response.json();
         console.log('📦 Данные ответа от сервера:', data);
         
+        // Ход принят, ИИ думает в фоне: сразу показываем ход и ждем ответ ИИ
+        if (data.success && data.ai_job) {
+            // Канал мог уже принести ответ ИИ раньше этого ответа
+            if (data.move_count >= gameState.moveCount) {
+                gameState.currentPlayer = data.current_player;
+                gameState.moveCount = data.move_count || 0;
+                applyPosition(data);
+                updateGameInfo(data);
+            }
+            // Ход ИИ придет по каналу событий партии; без канала - long-poll задания
+            if (channelOpen()) {
+                gameState.aiJob = data.ai_job;
+                if (gameState.currentPlayer !== gameState.userSymbol) {
+                    showStatus('ИИ думает...');
+                    showAIThinking();
+                }
+                return;
+            }
+            showStatus('ИИ думает...');
+            data = await waitForAIJob(data.ai_job);
+        }
+        
+        // Движок ИИ перегружен: ход принят, ход ИИ запрашиваем повторно
+        if (data.busy) {
+            applyPosition(data);
+            updateGameInfo(data);
+            showStatus('ИИ перегружен, повторяем запрос хода...');
+            setTimeout(() => requestAIMove(), (data.retry_after || 1) * 1000);
+            return;
+        }
+        
         if (data.success) {
             console.log('✅ Сервер подтвердил ход');
-            console.log('📊 Новая доска от сервера:', data.board);
+            console.log('📊 Позиция от сервера:', data.board || data.moves);
             
             // Принудительно обновляем состояние
-            gameState.board = data.board;
             gameState.currentPlayer = data.current_player;
             gameState.moveCount = data.move_count || 0;
             
-            console.log('🎯 Вызываем updateBoard...');
-            updateBoard(data.board);
+            console.log('🎯 Вызываем applyPosition...');
+            applyPosition(data);
             console.log('📝 Вызываем updateGameInfo...');
             updateGameInfo(data);
             
@@ -434,36 +475,9 @@ function updateBoard(board) {
                 (newValue === 'O' && currentValue !== 'O') || 
                 (newValue === '.' && currentValue !== '')) {
                 
-                // Сначала очищаем клетку
-                cell.textContent = '';
-                cell.className = 'cell';
-                cell.style.color = '';
-                cell.style.backgroundColor = '';
-                cell.style.fontWeight = '';
-                
-                if (newValue === 'X') {
-                    cell.textContent = 'X';
-                    cell.classList.add('x');
-                    cell.style.color = '#e74c3c';
-                    cell.style.backgroundColor = '#fadbd8';
-                    cell.style.fontWeight = 'bold';
-                    
-                    changesCount++;
-                    console.log(`✅ ИЗМЕНЕНИЕ: Установлен X в [${row}][${col}]`);
-                } else if (newValue === 'O') {
-                    cell.textContent = 'O';
-                    cell.classList.add('o');
-                    cell.style.color = '#3498db';
-                    cell.style.backgroundColor = '#d6eaf8';
-                    cell.style.fontWeight = 'bold';
-                    
-                    changesCount++;
-                    console.log(`✅ ИЗМЕНЕНИЕ: Установлен O в [${row}][${col}]`);
-                } else {
-                    // Пустая клетка
-                    changesCount++;
-                    console.log(`🧹 ОЧИСТКА: Очищена клетка [${row}][${col}]`);
-                }
+                renderCell(cell, newValue);
+                changesCount++;
+                console.log(`✅ ИЗМЕНЕНИЕ: [${row}][${col}] = ${newValue}`);
             }
         }
     }
@@ -472,6 +486,54 @@ function updateBoard(board) {
     console.log('🔄 === КОНЕЦ ОБНОВЛЕНИЯ ДОСКИ ===');
 }
 
+// Отрисовать одну клетку: 'X', 'O' или '.'
+function renderCell(cell, value) {
+    // Сначала очищаем клетку
+    cell.textContent = '';
+    cell.className = 'cell';
+    cell.style.color = '';
+    cell.style.backgroundColor = '';
+    cell.style.fontWeight = '';
+    
+    if (value === 'X') {
+        cell.textContent = 'X';
+        cell.classList.add('x');
+        cell.style.color = '#e74c3c';
+        cell.style.backgroundColor = '#fadbd8';
+        cell.style.fontWeight = 'bold';
+    } else if (value === 'O') {
+        cell.textContent = 'O';
+        cell.classList.add('o');
+        cell.style.color = '#3498db';
+        cell.style.backgroundColor = '#d6eaf8';
+        cell.style.fontWeight = 'bold';
+    }
+}
+
+// Параметры протокола дельт: сколько ходов уже есть у клиента и контрольная сумма его позиции
+function deltaParams() {
+    return gameState.checksum ? { since: gameState.moveCount, checksum: gameState.checksum } : {};
+}
+
+// Позиция из ответа сервера: вся доска (updateBoard) или только новые ходы
+function applyPosition(data) {
+    if (data.board) {
+        updateBoard(data.board);
+    } else if (data.moves) {
+        console.log(`🧩 Дельта: ${data.moves.length} ходов после хода ${data.since}`);
+        data.moves.forEach(([row, col, player]) => {
+            gameState.board[row][col] = player;
+            const cell = document.querySelector(`[data-row="${row}"][data-col="${col}"]`);
+            if (cell) {
+                renderCell(cell, player);
+            }
+        });
+    }
+    if (data.checksum) {
+        gameState.checksum = data.checksum;
+    }
+}
+
 function updateGameInfo(data) {
     console.log('📝 Обновление информации об игре:', data);
     
@@ -532,7 +594,7 @@ async function fetchGameState() {
     console.log('🔄 Запрос актуального состояния игры с сервера...');
     
     try {
-        const response = await fetch('/api/game_state', {
+        const response = await fetch(`/api/game_state?${new URLSearchParams(deltaParams())}`, {
             method: 'GET',
             headers: {
                 'Content-Type': 'application/json',
@@ -552,7 +614,7 @@ async function fetchGameState() {
             gameState.winner = data.winner || null;
             
             console.log('✅ Состояние синхронизировано с сервером');
-            updateBoard(data.board);
+            applyPosition(data);
             updateGameInfo(data);
         } else {
             console.error('❌ Ошибка получения состояния игры:', data.error);
@@ -601,7 +663,8 @@ async function requestAIMove() {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
-            }
+            },
+            body: JSON.stringify(deltaParams())
         });
         
         const data = await response.json();
@@ -611,11 +674,10 @@ async function requestAIMove() {
         
         if (data.success) {
             // Принудительно обновляем состояние
-            gameState.board = data.board;
             gameState.currentPlayer = data.current_player;
             gameState.moveCount = data.move_count || 0;
             
-            updateBoard(data.board);
+            applyPosition(data);
             updateGameInfo(data);
             
             if (data.game_over) {
@@ -648,6 +710,9 @@ async function requestAIMove() {
             }
             
             console.log('✅ Ход ИИ обработан');
+        } else if (data.busy) {
+            showStatus('ИИ перегружен, повторяем запрос хода...');
+            setTimeout(() => requestAIMove(), (data.retry_after || 1) * 1000);
         } else {
             hideAIThinking(); // Скрываем прогресс-бар при ошибке
             showStatus(`Ошибка хода ИИ: ${data.error}`);
@@ -660,6 +725,145 @@ async function requestAIMove() {
     }
 }
 
+async function waitForAIJob(jobId) {
+    console.log(`🧾 Ожидание задания ИИ ${jobId}`);
+    showAIThinking();
+    
+    try {
+        // Long-poll: сервер держит запрос до готовности хода, но не дольше wait секунд
+        while (true) {
+            const response = await fetch(`/api/ai_job/${jobId}?wait=20&${new URLSearchParams(deltaParams())}`);
+            const data = await response.json();
+            console.log('🧾 Состояние задания ИИ:', data);
+            
+            if (!data.success || data.status === 'done') {
+                return data;
+            }
+            if (data.status === 'cancelled') {
+                return { success: false, error: 'Ход ИИ отменен' };
+            }
+        }
+    } finally {
+        hideAIThinking();
+    }
+}
+
+// ========== КАНАЛ СОБЫТИЙ ПАРТИИ (SSE) ==========
+
+let gameChannel = null;
+
+function channelOpen() {
+    return gameChannel !== null && gameChannel.readyState !== EventSource.CLOSED;
+}
+
+// Сервер сам присылает ходы, конец партии и полную доску для пересинхронизации
+function openGameChannel() {
+    closeGameChannel();
+    if (!window.EventSource) {
+        console.log('⚠️ EventSource не поддерживается, ход ИИ будет запрашиваться');
+        return;
+    }
+    
+    gameChannel = new EventSource(`/api/events?${new URLSearchParams(deltaParams())}`);
+    gameChannel.addEventListener('move', event => handleChannelPosition(JSON.parse(event.data)));
+    gameChannel.addEventListener('resync', event => handleChannelPosition(JSON.parse(event.data)));
+    gameChannel.addEventListener('game_over', event => {
+        handleChannelGameOver(JSON.parse(event.data));
+        closeGameChannel();
+    });
+    gameChannel.addEventListener('closed', () => closeGameChannel());
+    gameChannel.onerror = () => {
+        if (gameChannel.readyState !== EventSource.CLOSED) {
+            console.log('⚠️ Канал событий прервался, EventSource переподключится');
+            return;
+        }
+        // Сервер отказал (503: потоков событий слишком много) - ход ИИ ждем через long-poll
+        console.log('⚠️ Канал событий недоступен, ход ИИ будет запрашиваться');
+        closeGameChannel();
+        resumeAIJob();
+    };
+    console.log('📡 Канал событий партии открыт');
+}
+
+// Ход ИИ, который ждали по каналу, забираем через long-poll задания
+async function resumeAIJob() {
+    const jobId = gameState.aiJob;
+    if (!jobId) {
+        return;
+    }
+    const data = await waitForAIJob(jobId);
+    if (gameState.aiJob !== jobId) {
+        return;
+    }
+    gameState.aiJob = null;
+    if (!data.success) {
+        showStatus(`Ошибка хода ИИ: ${data.error}`);
+        return;
+    }
+    // Конец партии показывает handleChannelGameOver, а не updateGameInfo
+    const gameOver = data.game_over;
+    delete data.game_over;
+    handleChannelPosition(data);
+    if (gameOver) {
+        handleChannelGameOver(data);
+    }
+}
+
+function closeGameChannel() {
+    if (gameChannel) {
+        gameChannel.close();
+        gameChannel = null;
+        console.log('📡 Канал событий партии закрыт');
+    }
+}
+
+function handleChannelPosition(data) {
+    console.log('📡 Событие партии:', data);
+    
+    // Устаревшая дельта: ответ на запрос уже принес более новую позицию
+    if (!data.board && data.move_count < gameState.moveCount) {
+        return;
+    }
+    
+    applyPosition(data);
+    updateGameInfo(data);
+    
+    if (data.current_player === gameState.userSymbol) {
+        gameState.aiJob = null;
+        hideAIThinking();
+        if (data.ai_move) {
+            const [aiRow, aiCol] = data.ai_move;
+            highlightLastMove(aiRow, aiCol);
+            showStatus(`ИИ сходил на ${String.fromCharCode(65 + aiCol)}${aiRow + 1}. Ваш ход!`);
+        } else {
+            showStatus('Ваш ход!');
+        }
+    }
+}
+
+function handleChannelGameOver(data) {
+    hideAIThinking();
+    if (gameState.gameOver) {
+        return;
+    }
+    gameState.gameOver = true;
+    gameState.winner = data.winner;
+    
+    if (data.winner === gameState.userSymbol) {
+        showStatus('🎉 Поздравляем! Вы выиграли!');
+    } else if (data.winner === gameState.aiSymbol) {
+        showStatus('😔 ИИ выиграл. Попробуйте еще раз!');
+    } else {
+        showStatus('🤝 Ничья!');
+    }
+    
+    setTimeout(() => {
+        showGameResultModal(data.winner, {
+            move_count: data.move_count
+        });
+    }, 1000);
+}
+
 console.log('✅ JavaScript файл полностью загружен');
 
 // ========== ФУНКЦИИ ПРОГРЕСС-БАРА ИИ ==========
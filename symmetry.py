@@ -0,0 +1,88 @@
+from functools import lru_cache
+
+# Симметрии квадратной доски: 4 поворота и 4 отражения. Номер симметрии - три бита:
+# 4 - транспонирование, затем 1 - отражение строк, 2 - отражение столбцов
+SYMMETRY_COUNT = 8
+IDENTITY = 0
+
+
+def transform(row, col, board_size, symmetry):
+    """Клетка после симметрии доски номер symmetry"""
+    if symmetry & 4:
+        row, col = col, row
+    if symmetry & 1:
+        row = board_size - 1 - row
+    if symmetry & 2:
+        col = board_size - 1 - col
+    return row, col
+
+
+def inverse_transform(row, col, board_size, symmetry):
+    """Клетка до симметрии номер symmetry (обратное к transform)"""
+    if symmetry & 1:
+        row = board_size - 1 - row
+    if symmetry & 2:
+        col = board_size - 1 - col
+    if symmetry & 4:
+        row, col = col, row
+    return row, col
+
+
+@lru_cache(maxsize=None)
+def get_symmetry_maps(board_size):
+    """Для каждой симметрии: номер клетки -> номер ее образа (нумерация BoardGeometry, stride = board_size + 1)
+
+    Сторожевые номера вне доски отображаются в 0.
+    """
+    stride = board_size + 1
+    maps = []
+    for symmetry in range(SYMMETRY_COUNT):
+        mapping = [0] * (stride * board_size)
+        for row in range(board_size):
+            for col in range(board_size):
+                new_row, new_col = transform(row, col, board_size, symmetry)
+                mapping[row * stride + col] = new_row * stride + new_col
+        maps.append(tuple(mapping))
+    return tuple(maps)
+
+
+def canonical_key(game):
+    """(канонический ключ позиции, симметрия, переводящая доску в канонический вид)
+
+    Ключ - наименьший из хэшей Zobrist восьми симметричных копий позиции
+    (GameLogic.symmetric_hashes, поддерживаются при каждом ходе), поэтому у всех
+    копий он один и тот же. У симметричной позиции подходящих симметрий несколько,
+    берется первая.
+    """
+    hashes = game.symmetric_hashes
+    key = min(hashes)
+    return key, hashes.index(key)
+
+
+def transform_board(rows, symmetry):
+    """Доска (список списков) после симметрии номер symmetry"""
+    board_size = len(rows)
+    result = [['.'] * board_size for _ in range(board_size)]
+    for row, cells in enumerate(rows):
+        for col, cell in enumerate(cells):
+            new_row, new_col = transform(row, col, board_size, symmetry)
+            result[new_row][new_col] = cell
+    return result
+
+
+def canonical_board(game):
+    """(доска позиции game в каноническом виде, симметрия, которой она получена)"""
+    _, symmetry = canonical_key(game)
+    return transform_board(game.board, symmetry), symmetry
+
+
+def canonical_moves(moves, board_size):
+    """(ходы партии в каноническом виде, симметрия)
+
+    Канонический вид последовательности - наименьшая из восьми ее симметричных
+    копий, так что зеркальные и повернутые партии записываются одинаково.
+    """
+    copies = ([transform(row, col, board_size, symmetry) for row, col in moves]
+              for symmetry in range(SYMMETRY_COUNT))
+    best, symmetry = min((copy, symmetry) for symmetry, copy in enumerate(copies))
+    return best, symmetry
@@ -0,0 +1,89 @@
+"""
+Тесты протокола дельт: ходы после since против полной доски и откат к снимку
+"""
+
+import random
+
+import pytest
+
+from game_store import GameRecord
+
+
+@pytest.fixture
+def record():
+    """Партия из 20 случайных ходов по правилам"""
+    rng = random.Random(5)
+    record = GameRecord('X')
+    while len(record.moves) < 20:
+        game = record.game
+        assert record.play(*rng.choice(game.get_valid_moves()), game.current_player)
+        if game.game_over:
+            record = GameRecord('X')
+    return record
+
+
+def client_board(record, move_count):
+    """Доска клиента, у которого есть первые move_count ходов партии"""
+    size = record.game.board_size
+    board = [['.'] * size for _ in range(size)]
+    for row, col, player in record.moves[:move_count]:
+        board[row][col] = player
+    return board
+
+
+@pytest.mark.parametrize('since', [0, 1, 7, 19, 20])
+def test_delta_rebuilds_full_board(record, since):
+    """Доска клиента с дельтой после since совпадает с доской сервера"""
+    fields = record.position(since, record.checksum(since))
+    assert 'board' not in fields
+    assert fields['since'] == since
+    assert len(fields['moves']) == len(record.moves) - since
+    board = client_board(record, since)
+    for row, col, player in fields['moves']:
+        board[row][col] = player
+    assert board == record.game.board
+    assert fields['checksum'] == record.checksum()
+
+
+def test_checksum_matches_position_hash(record):
+    """Контрольная сумма всех ходов - хэш фигур живой позиции"""
+    assert int(record.checksum(), 16) == record.game._stone_hash
+
+
+def test_stale_checksum_gets_snapshot(record):
+    """Позиция клиента разошлась с партией: вместо дельты - вся доска"""
+    fields = record.position(10, record.checksum(9))
+    assert 'moves' not in fields
+    assert fields['board'] == record.game.board
+
+
+@pytest.mark.parametrize('since', [-1, 21, 100, '5', None])
+def test_bad_since_gets_snapshot(record, since):
+    """since вне партии или не число: вся доска"""
+    fields = record.position(since, record.checksum())
+    assert 'moves' not in fields
+    assert fields['board'] == record.game.board
+
+
+def test_since_zero_needs_no_checksum(record):
+    """С пустой доски дельта - вся партия, контрольная сумма не нужна"""
+    fields = record.position(0, None)
+    assert fields['since'] == 0
+    assert [tuple(move) for move in fields['moves']] == record.moves
+
+
+def test_api_sends_delta_after_client_moves(client):
+    """Ответы API: дельта по since/checksum из тела или URL, иначе и при расхождении - снимок"""
+    data = client.post('/api/new_game', json={'symbol': 'X'}).get_json()
+    checksum = data['checksum']
+    assert 'board' in data
+
+    data = client.post('/api/make_move', json={'row': 7, 'col': 7, 'since': 0, 'checksum': checksum}).get_json()
+    assert data['since'] == 0 and 'board' not in data
+    assert data['moves'][0] == [7, 7, 'X'] and len(data['moves']) == 2
+
+    state = client.get(f"/api/game_state?since=2&checksum={data['checksum']}").get_json()
+    assert state['since'] == 2 and state['moves'] == []
+    stale = client.get(f"/api/game_state?since=2&checksum={'0' * 16}").get_json()
+    assert 'moves' not in stale and stale['board'][7][7] == 'X'
+    assert client.get('/api/game_state?since=5').get_json()['board'][7][7] == 'X'
@@ -0,0 +1,125 @@
+"""
+Тесты пула движка: отмена хода по его номеру и замена завершившегося процесса
+"""
+
+import multiprocessing
+import os
+import random
+import signal
+import threading
+import time
+
+import pytest
+
+from engine_pool import EnginePool, TaskStop
+from game_logic import GameLogic
+from time_manager import Deadline
+
+
+@pytest.fixture
+def pool():
+    pool = EnginePool(1, queue_size=2)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture
+def game():
+    """Спокойная позиция вне дебютной книги: ход требует поиска"""
+    rng = random.Random(0)
+    game = GameLogic()
+    for _ in range(4):
+        game.make_move(*rng.choice(game.get_valid_moves()))
+    return game
+
+
+def wait_running(pool, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if pool.stats()['running']:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_task_stop_matches_only_its_task():
+    """Флаг отмены с номером другого хода не останавливает текущий"""
+    cancel_id = multiprocessing.get_context().RawValue('q', 0)
+    stop = TaskStop(cancel_id, 2)
+    assert not stop.is_set()
+    cancel_id.value = 1
+    assert not stop.is_set()
+    cancel_id.value = 2
+    assert stop.is_set()
+
+
+def test_late_cancel_does_not_abort_next_move(pool, game):
+    """Отмена прошлого хода, пришедшая, когда процесс уже считает следующий, его не прерывает"""
+    first = pool.get_move(game, game.current_player, Deadline(0.3))
+    assert first.move is not None
+    game.make_move(*first.move)
+    results = []
+    started = time.monotonic()
+    thread = threading.Thread(
+        target=lambda: results.append(pool.get_move(game, game.current_player, Deadline(1.0, 1.0))))
+    thread.start()
+    assert wait_running(pool)
+    # Так выглядит запоздавшая отмена хода 1: ждущий поток отменил его, когда ответ уже пришел
+    pool._workers[0].cancel_id.value = 1
+    thread.join(10.0)
+    assert results[0].move is not None and not results[0].degraded
+    # Прерванный поиск вернулся бы за миллисекунды, обычный идет сотни
+    assert time.monotonic() - started > 0.2
+
+
+def test_stop_event_cancels_running_move(pool, game):
+    """stop_event прерывает ход в процессе задолго до срока, процесс сразу свободен"""
+    stop_event = threading.Event()
+    stop_event.set()
+    started = time.monotonic()
+    result = pool.get_move(game, game.current_player, Deadline(20.0, 20.0), stop_event=stop_event)
+    assert result.move is None
+    while pool.stats()['running'] and time.monotonic() - started < 5.0:
+        time.sleep(0.01)
+    # Обычный поиск этой позиции идет сотни миллисекунд
+    assert time.monotonic() - started < 0.3
+    assert pool.stats()['cancelled'] == 1
+
+
+def test_dead_worker_is_replaced(pool, game):
+    """Ход убитого процесса получает облегченный ответ, процесс заменяется, очередь идет дальше"""
+    results = {}
+
+    def move(name, deadline):
+        results[name] = pool.get_move(game, game.current_player, deadline)
+
+    running = threading.Thread(target=move, args=('running', Deadline(20.0, 20.0)))
+    running.start()
+    assert wait_running(pool)
+    queued = threading.Thread(target=move, args=('queued', Deadline(10.0, 10.0)))
+    queued.start()
+    while not pool.stats()['queued']:
+        time.sleep(0.01)
+    os.kill(pool.stats()['per_worker'][0]['pid'], signal.SIGKILL)
+    running.join(10.0)
+    queued.join(15.0)
+    assert results['running'].move is not None and results['running'].degraded
+    assert results['queued'].move is not None and not results['queued'].degraded
+
+    stats = pool.stats()
+    assert (stats['restarts'], stats['lost'], stats['running'], stats['queued']) == (1, 1, 0, 0)
+    assert stats['per_worker'][0]['alive']
+    assert not pool.full()
+
+
+def test_cancelled_queued_move_leaves_queue(pool, game):
+    """Отмененный ход из очереди сразу освобождает место"""
+    running = threading.Thread(target=pool.get_move, args=(game, game.current_player, Deadline(1.0, 1.0)))
+    running.start()
+    assert wait_running(pool)
+    stop_event = threading.Event()
+    threading.Timer(0.1, stop_event.set).start()
+    assert pool.get_move(game, game.current_player, Deadline(5.0), stop_event=stop_event).move is None
+    stats = pool.stats()
+    assert (stats['running'], stats['queued'], stats['cancelled']) == (1, 0, 1)
+    running.join(10.0)
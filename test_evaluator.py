@@ -0,0 +1,59 @@
+"""
+Тесты инкрементальной оценки позиции: сравнение с пересчетом заново
+"""
+
+import random
+
+import pytest
+
+from game_logic import GameLogic
+from patterns import TABLE_SPECS, get_pattern_tables, window_key
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_totals_match_recomputed(seed, random_walk):
+    """Общая оценка, счетчики отрезков и оценки линий совпадают с пересчитанными"""
+    for game in random_walk(GameLogic(), random.Random(seed), 200):
+        evaluator = game.evaluator
+        totals, counts = evaluator.recompute_totals()
+        assert totals == evaluator.totals
+        assert counts == evaluator._counts
+        for player in ('X', 'O'):
+            assert sum(evaluator.line_scores[player]) == totals[player]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_gain_matches_score_change(seed):
+    """gain хода равен изменению оценки игрока после этого хода"""
+    rng = random.Random(seed)
+    game = GameLogic()
+    evaluator = game.evaluator
+    for _ in range(200):
+        moves = game.get_valid_moves()
+        if game.move_count and (not moves or game.game_over or rng.random() < 0.4):
+            game.pop()
+            continue
+        row, col = rng.choice(moves)
+        player = game.current_player
+        score_before = evaluator.score(player)
+        gain = evaluator.gain(game.geometry.index(row, col), player)
+        game.push(row, col)
+        assert evaluator.score(player) - score_before == gain
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_window_cache_matches_tables(seed, random_walk):
+    """Закэшированные значения окон совпадают с прочитанными из таблиц заново"""
+    rng = random.Random(seed)
+    tables = get_pattern_tables()
+    names = list(TABLE_SPECS)
+    for game in random_walk(GameLogic(), rng, 200):
+        moves = game.get_valid_moves()
+        for row, col in rng.sample(moves, min(len(moves), 5)):
+            idx = game.geometry.index(row, col)
+            name = rng.choice(names)
+            player = rng.choice('XO')
+            half = TABLE_SPECS[name][0]
+            fresh = tuple(getattr(tables, name)[window_key(game.line_codes[player][line_id], digit, half)]
+                          for line_id, digit in game.geometry.line_slots[idx])
+            assert game.evaluator.window_values(name, player, idx) == fresh
@@ -0,0 +1,40 @@
+"""
+Тесты предела потоков событий партий (SSE)
+"""
+
+import pytest
+
+from game_channel import ChannelFull, GameChannel
+
+
+def test_stream_over_limit_is_rejected():
+    """Сверх предела поток не открывается, закрытый поток освобождает место"""
+    channel = GameChannel(limit=2)
+    first = channel.stream('a')
+    channel.stream('b')
+    with pytest.raises(ChannelFull):
+        channel.stream('c')
+    assert channel.stats()['rejected'] == 1
+
+    first.close()
+    channel.stream('c')
+    assert channel.stats()['streams'] == 2
+
+
+def test_unstarted_stream_released_once():
+    """Ответ, закрытый до первого события, освобождает место ровно один раз"""
+    channel = GameChannel(limit=1)
+    stream = channel.stream('a')
+    stream.close()
+    stream.close()
+    assert channel.stats()['streams'] == 0
+    assert channel.stats()['games'] == 0
+
+
+def test_finished_stream_releases_place():
+    """Поток, дошедший до конца (партии нет), освобождает место"""
+    channel = GameChannel(limit=1)
+    events = list(channel.stream('нет такой партии'))
+    assert events[-1].startswith('event: closed')
+    assert channel.stats()['streams'] == 0
+    channel.stream('a')
@@ -0,0 +1,49 @@
+"""
+Тесты согласованности хэша Zobrist в GameLogic при push/pop
+"""
+
+import random
+
+import pytest
+
+from game_logic import GameLogic
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_hash_matches_recomputed(seed, random_walk):
+    """Инкрементальный хэш после push/pop совпадает с пересчитанным с нуля"""
+    for game in random_walk(GameLogic(), random.Random(seed), 400):
+        assert game._stone_hash == game._compute_hash()
+        assert game._symmetric_hashes[0] == game._stone_hash
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_same_position_same_hash(seed, random_walk):
+    """Одна и та же позиция всегда дает один и тот же хэш"""
+    seen = {}
+    for game in random_walk(GameLogic(), random.Random(seed), 400):
+        key = (game.bits['X'], game.bits['O'], game.current_player)
+        assert seen.setdefault(key, game.position_hash) == game.position_hash
+
+
+def test_full_rollback_restores_empty_hash(random_walk):
+    """После отката всех ходов хэш снова нулевой"""
+    game = GameLogic()
+    for game in random_walk(game, random.Random(1), 300):
+        pass
+    while game.move_count:
+        game.pop()
+    assert game.position_hash == 0
+
+
+def test_push_pop_round_trip(random_walk):
+    """push и pop одного хода возвращают прежний хэш"""
+    game = GameLogic()
+    for game in random_walk(game, random.Random(2), 60):
+        pass
+    before = game.position_hash
+    for row, col in game.get_valid_moves():
+        game.push(row, col)
+        assert game.position_hash != before
+        game.pop()
+        assert game.position_hash == before
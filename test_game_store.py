@@ -0,0 +1,140 @@
+"""
+Тесты хранилища партий: вытеснение в памяти, общий файл SQLite и пути приложения
+"""
+
+import os
+import types
+
+import pytest
+
+import game_store
+from game_store import GameRecord, MemoryGameStore, SqliteGameStore
+
+
+class Clock:
+    """Часы хранилища, которые тест переводит сам"""
+
+    def __init__(self, now=1000000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(game_store, 'time', types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'games.sqlite3')
+
+
+def played(moves, user_symbol='X'):
+    """Партия с ходами moves по очереди, начиная с X"""
+    record = GameRecord(user_symbol)
+    for row, col in moves:
+        assert record.play(row, col, record.game.current_player)
+    return record
+
+
+MOVES = [(7, 7), (7, 8), (8, 8), (6, 6), (8, 7)]
+
+
+def test_memory_store_evicts_least_recently_used():
+    """Сверх max_games вытесняется партия, к которой дольше всех не обращались"""
+    store = MemoryGameStore(max_games=2)
+    first, second, third = GameRecord('X'), GameRecord('X'), GameRecord('O')
+    store.put(first)
+    store.put(second)
+    assert store.get(first.game_id) is first
+    store.put(third)
+    assert store.get(second.game_id) is None
+    assert store.get(first.game_id) is first
+    assert store.get(third.game_id) is third
+    assert store.stats()['evicted'] == 1
+
+
+def test_memory_store_expires_idle_games(clock):
+    """Партия, простоявшая дольше idle_ttl, забывается при чтении и при записи другой"""
+    store = MemoryGameStore(idle_ttl=60.0)
+    idle, active, late = GameRecord('X'), GameRecord('X'), GameRecord('X')
+    store.put(idle)
+    store.put(active)
+    clock.now += 50.0
+    assert store.get(active.game_id) is active
+    clock.now += 20.0
+    store.put(late)
+    assert store.stats()['games'] == 2
+    assert store.get(idle.game_id) is None
+    clock.now += 61.0
+    assert store.get(active.game_id) is None
+    assert store.stats()['expired'] == 2
+
+
+def test_sqlite_game_replayed_by_second_instance(path):
+    """Другой процесс восстанавливает партию из файла повтором ходов, с тем же состоянием"""
+    record = played(MOVES)
+    record.ai_time_used = 1.5
+    SqliteGameStore(path).put(record)
+
+    other = SqliteGameStore(path)
+    restored = other.get(record.game_id)
+    assert restored is not record
+    assert restored.moves == record.moves
+    assert restored.game.board == record.game.board
+    assert restored.game.position_hash == record.game.position_hash
+    assert restored.game.evaluator.totals == record.game.evaluator.totals
+    assert (restored.user_symbol, restored.ai_time_used) == ('X', 1.5)
+    assert other.stats()['loads'] == 1
+
+
+def test_sqlite_reloads_game_changed_by_other_instance(path):
+    """Живая партия процесса берется из памяти, пока в файле не прибавилось ходов"""
+    first, second = SqliteGameStore(path), SqliteGameStore(path)
+    record = played(MOVES[:3])
+    first.put(record)
+    cached = second.get(record.game_id)
+    assert second.get(record.game_id) is cached
+
+    assert record.play(*MOVES[3], record.game.current_player)
+    first.put(record)
+    reloaded = second.get(record.game_id)
+    assert reloaded is not cached
+    assert reloaded.moves == record.moves
+    assert second.stats()['loads'] == 2
+
+
+def test_sqlite_expires_idle_games(path, clock):
+    """Простоявшая партия не выдается ни одним процессом"""
+    store = SqliteGameStore(path, idle_ttl=60.0)
+    record = played(MOVES)
+    store.put(record)
+    clock.now += 61.0
+    assert SqliteGameStore(path, idle_ttl=60.0).get(record.game_id) is None
+    assert store.get(record.game_id) is None
+
+
+def test_app_paths_in_scratch_dir(scratch_dir):
+    """Логи партий, кэш ходов и файл хранилища тестов не попадают в рабочее дерево"""
+    import app
+    import result_cache
+
+    for location in (app.LOGS_DIR, result_cache.RESULT_CACHE_PATH, game_store.GAME_STORE_PATH):
+        assert os.path.commonpath([scratch_dir, location]) == scratch_dir
+
+
+def test_app_keeps_game_in_store(client):
+    """Партия, начатая через API, лежит в хранилище и продолжается по cookie сессии"""
+    response = client.post('/api/new_game', json={'symbol': 'X'}).get_json()
+    assert response['success']
+    response = client.post('/api/make_move', json={'row': 7, 'col': 7}).get_json()
+    assert response['success']
+    assert response['move_count'] == 2
+
+    with client.session_transaction() as session:
+        record = game_store.get_game_store().get(session['game_id'])
+    assert [move[:2] for move in record.moves] == [(7, 7), tuple(response['ai_move'])]
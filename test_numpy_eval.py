@@ -0,0 +1,60 @@
+"""
+Тесты пакетного просмотра доски на NumPy и перехода на Python без NumPy
+"""
+
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+import ai_player
+import numpy_eval
+from ai_player import AIPlayer
+from game_logic import GameLogic
+from patterns import TABLE_SPECS
+
+
+def random_game(rng):
+    game = GameLogic()
+    target = rng.randrange(5, 120)
+    while game.move_count < target and not game.game_over:
+        game.make_move(*rng.choice(game.get_valid_moves()))
+    return game
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_numpy_scan_matches_incremental_evaluator(seed):
+    """NumPy-просмотр дает те же значения и суммы окон, что инкрементальная оценка"""
+    pytest.importorskip('numpy')
+    game = random_game(random.Random(seed))
+    scan = numpy_eval.NumpyBoardScan(game)
+    indices = [game.geometry.index(row, col) for row, col in game.get_valid_moves()]
+    for name in TABLE_SPECS:
+        for player in ('X', 'O'):
+            assert scan.window_sums(name, player, indices) == game.evaluator.window_sums(name, player, indices)
+            for idx in indices:
+                assert scan.window_values(name, player, idx) == game.evaluator.window_values(name, player, idx)
+
+
+def test_backend_falls_back_to_python_without_numpy(monkeypatch):
+    """Без NumPy backend='numpy' превращается в 'python', а ход ИИ считается как обычно"""
+    monkeypatch.setattr(ai_player, 'NUMPY_AVAILABLE', False)
+    monkeypatch.setattr(numpy_eval, 'NUMPY_AVAILABLE', False)
+    game = GameLogic()
+    for row, col in ((7, 7), (7, 8), (8, 8)):
+        game.make_move(row, col)
+    ai = AIPlayer(game.current_player, max_depth=1, backend='numpy')
+    assert ai.backend == 'python'
+    move = ai.get_move(game)
+    assert move is not None and game.is_valid_move(*move)
+    with pytest.raises(RuntimeError):
+        numpy_eval.NumpyBoardScan(game)
+
+
+def test_module_imports_without_numpy():
+    """numpy_eval загружается и без установленного NumPy"""
+    code = ("import sys; sys.modules['numpy'] = None; import numpy_eval; "
+            "assert not numpy_eval.NUMPY_AVAILABLE")
+    subprocess.run([sys.executable, '-c', code], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
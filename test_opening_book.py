@@ -0,0 +1,34 @@
+"""
+Тесты дебютной книги в выборе хода ИИ
+"""
+
+import pytest
+
+from ai_player import AIPlayer
+from game_logic import GameLogic
+from opening_book import BOOK_PATH, OpeningBook
+
+
+@pytest.fixture(scope='module')
+def book():
+    book = OpeningBook(BOOK_PATH)
+    if not len(book):
+        pytest.skip(f"книги {BOOK_PATH} нет: python build_opening_book.py")
+    return book
+
+
+def test_get_move_plays_book_move(book):
+    """Если позиция есть в книге, get_move отвечает ходом книги"""
+    game = GameLogic()
+    game.make_move(7, 7)
+    move = book.lookup(game)
+    assert move is not None
+    assert AIPlayer(game.current_player, opening_book=book).get_move(game) == move
+
+
+def test_opening_move_accepts_book_tuple(book):
+    """Ход книги (кортеж) проверяется по доске, а не поиском в списке кандидатов из списков"""
+    game = GameLogic()
+    game.make_move(7, 7)
+    ai = AIPlayer(game.current_player, opening_book=book)
+    assert ai._get_opening_move(game) == book.lookup(game)
@@ -0,0 +1,59 @@
+"""
+Тесты отмены параллельного поиска
+"""
+
+import threading
+import time
+
+import pytest
+
+from game_logic import GameLogic
+from move_ordering import HistoryTable, MoveOrdering
+from parallel_search import ParallelSearch, shutdown_pools
+from transposition import TranspositionTable
+
+
+@pytest.fixture
+def game():
+    game = GameLogic()
+    for row, col in ((7, 7), (7, 8), (8, 8), (6, 6), (8, 6), (9, 9)):
+        game.make_move(row, col)
+    yield game
+    shutdown_pools()
+
+
+def test_stop_event_stops_pool_workers(game):
+    """stop_event прерывает доли поиска в процессах пула задолго до срока хода"""
+    stop_event = threading.Event()
+    search = ParallelSearch(20, 30.0, workers=2, table=TranspositionTable(1 << 12), stop_event=stop_event)
+    threading.Timer(0.5, stop_event.set).start()
+    started = time.monotonic()
+    result = search.search(game)
+    assert time.monotonic() - started < 3.0
+    assert result.move is not None
+
+
+def test_search_without_stop_event(game):
+    """Без stop_event поиск идет до глубины или срока, как раньше"""
+    result = ParallelSearch(2, 5.0, workers=2, table=TranspositionTable(1 << 12)).search(game)
+    assert result.depth == 2
+
+
+def test_workers_update_game_history(game):
+    """Отсечения из процессов пула попадают в историю партии, прежний счет стареет"""
+    history = HistoryTable()
+    history.scores['X'][0] = 8
+    ParallelSearch(3, 5.0, workers=2, table=TranspositionTable(1 << 12),
+                   ordering=MoveOrdering(history)).search(game)
+    assert history.scores['X'][0] == 4
+    assert len(history.scores['X']) + len(history.scores['O']) > 1
+
+
+def test_history_merge_adds_only_gains():
+    """merge добавляет прирост копии над исходным счетом, а не весь ее счет"""
+    history = HistoryTable()
+    history.scores['O'] = {10: 4, 11: 2}
+    base = history.snapshot()
+    history.merge({'X': {5: 9}, 'O': {10: 4, 11: 7}}, base)
+    history.merge({'X': {5: 1}, 'O': {10: 6, 11: 2}}, base)
+    assert history.scores == {'X': {5: 10}, 'O': {10: 6, 11: 7}}
@@ -0,0 +1,52 @@
+"""
+Тесты таблиц паттернов: каждое значение совпадает со строковой функцией
+"""
+
+import random
+
+import pytest
+
+from ai_player import AIPlayer
+from game_logic import GameLogic
+from patterns import POW3, TABLE_SPECS, get_pattern_tables, window_key, window_string
+
+# Таблицы до 3^10 записей проверяются целиком, большие - по случайным окнам
+FULL_CHECK_SIZE = POW3[10]
+SAMPLED_KEYS = 20000
+
+
+@pytest.mark.parametrize('name', list(TABLE_SPECS))
+def test_table_matches_string_function(name):
+    """Значение таблицы для окна равно строковой функции на строке этого окна"""
+    half, center, function = TABLE_SPECS[name]
+    table = getattr(get_pattern_tables(), name)
+    size = POW3[2 * half]
+    assert len(table) == size
+    if size <= FULL_CHECK_SIZE:
+        keys = range(size)
+    else:
+        keys = random.Random(name).sample(range(size), SAMPLED_KEYS)
+    for key in keys:
+        line = window_string(key, half, center)
+        assert table[key] == int(function(line, 'X')), f"{name}: {line!r}"
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_windows_of_real_positions(seed):
+    """Окна реальных позиций для обоих игроков читаются из таблиц так же, как считаются по строке"""
+    rng = random.Random(seed)
+    tables = get_pattern_tables()
+    windows = AIPlayer('X').tables.windows
+    game = GameLogic()
+    while game.move_count < rng.randrange(5, 80) and not game.game_over:
+        game.make_move(*rng.choice(game.get_valid_moves()))
+    for row, col in rng.sample(game.get_valid_moves(), min(10, len(game.get_valid_moves()))):
+        idx = game.geometry.index(row, col)
+        for symbol in 'XO':
+            with game.temporary_move(row, col, symbol):
+                for name, (half, _, function) in TABLE_SPECS.items():
+                    codes = game.line_codes[symbol]
+                    for (line_id, digit), window in zip(game.geometry.line_slots[idx], windows[half][idx]):
+                        line = ''.join(game.cells[i] for i in window)
+                        key = window_key(codes[line_id], digit, half)
+                        assert getattr(tables, name)[key] == int(function(line, symbol)), f"{name}: {line!r}"
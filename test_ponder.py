@@ -0,0 +1,110 @@
+"""
+Тесты обдумывания: остановка и одновременная работа с обычным поиском той же партии
+"""
+
+import logging
+import random
+import sys
+import threading
+import time
+
+import pytest
+
+from ai_player import AIPlayer
+from game_logic import GameLogic
+from move_ordering import HistoryTable, get_game_history
+from ponder import CpuBudget, Ponderer
+from time_manager import Deadline
+
+
+@pytest.fixture
+def midgame():
+    """Спокойная позиция вне дебютной книги: ход ИИ требует поиска"""
+    rng = random.Random(0)
+    game = GameLogic()
+    for _ in range(4):
+        game.make_move(*rng.choice(game.get_valid_moves()))
+    return game
+
+
+@pytest.fixture
+def fast_switching():
+    """Частое переключение потоков, чтобы гонки проявлялись за доли секунды"""
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def wait_pondering(ponderer, game_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        current = ponderer._current
+        if current is not None and current[0] == game_id:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_history_add_and_age_from_two_threads(fast_switching):
+    """Отсечения одного поиска и старение таблицы другим не ломают итерацию по таблице"""
+    history = HistoryTable()
+    errors = []
+    done = threading.Event()
+
+    def add():
+        i = 0
+        try:
+            while not done.is_set():
+                history.add('X', i % 225, 30)
+                i += 1
+        except Exception as e:
+            errors.append(e)
+
+    def age():
+        try:
+            for _ in range(20000):
+                history.age()
+                history.snapshot()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            done.set()
+
+    threads = [threading.Thread(target=add), threading.Thread(target=age)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_live_search_during_pondering(midgame, caplog, fast_switching):
+    """Ход ИИ, посчитанный во время обдумывания той же партии, обходится без ошибок поиска"""
+    game_id = 'ponder-overlap'
+    symbol = 'O' if midgame.current_player == 'X' else 'X'
+    ponderer = Ponderer(CpuBudget(share=10.0))
+    ponderer.start(game_id, midgame, symbol)
+    try:
+        assert wait_pondering(ponderer, game_id)
+        with caplog.at_level(logging.ERROR):
+            for row, col in midgame.get_valid_moves()[:3]:
+                with midgame.temporary_move(row, col):
+                    move = AIPlayer(symbol, game_id=game_id).get_move(midgame, Deadline(0.5))
+                    assert move is not None
+        assert not [record for record in caplog.records if record.levelno >= logging.ERROR]
+        assert get_game_history(game_id).scores['X'] or get_game_history(game_id).scores['O']
+    finally:
+        ponderer.cancel(game_id)
+        ponderer.wait_idle(10.0)
+
+
+def test_stop_waits_for_pondering_search(midgame):
+    """stop() возвращается, когда прерванный поиск обдумывания уже закончился"""
+    game_id = 'ponder-stop'
+    ponderer = Ponderer(CpuBudget(share=10.0))
+    ponderer.start(game_id, midgame, 'O' if midgame.current_player == 'X' else 'X')
+    assert wait_pondering(ponderer, game_id)
+    assert ponderer.stop(game_id)
+    assert ponderer._current is None
+    assert ponderer.wait_idle(5.0)
@@ -0,0 +1,122 @@
+"""
+Тесты кэша результатов: симметричные позиции, общий файл, срок жизни и LRU-вытеснение
+"""
+
+import types
+
+import pytest
+
+import result_cache
+from game_logic import GameLogic
+from result_cache import TOUCH_INTERVAL, ResultCache
+from symmetry import SYMMETRY_COUNT, canonical_key, transform
+
+CONFIG = 'test'
+
+
+class Clock:
+    """Часы кэша, которые тест переводит сам"""
+
+    def __init__(self, now=1000000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(result_cache, 'time', types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'cache.sqlite3')
+
+
+def position(moves):
+    """Позиция после ходов moves по очереди, начиная с X"""
+    game = GameLogic()
+    for row, col in moves:
+        game.push(row, col)
+    return game
+
+
+def distinct_positions(count):
+    """count позиций с разными каноническими ключами"""
+    games, keys = [], set()
+    col = 0
+    while len(games) < count:
+        game = position([(7, 7), (7, 8), (8, col % 15), (6, col // 15 + 6)])
+        col += 1
+        key = canonical_key(game)[0]
+        if key not in keys:
+            keys.add(key)
+            games.append(game)
+    return games
+
+
+@pytest.mark.parametrize('symmetry', range(SYMMETRY_COUNT))
+def test_move_restored_in_rotated_position(path, symmetry, symmetric_copy):
+    """Ход, сохраненный в одной ориентации, выдается повернутой позиции в ее координатах"""
+    game = position([(7, 7), (8, 8), (6, 8)])
+    cache = ResultCache(path)
+    cache.put(game, 'O', CONFIG, (5, 9))
+    rotated = symmetric_copy(game, symmetry)
+    assert cache.get(rotated, 'O', CONFIG) == transform(5, 9, game.board_size, symmetry)
+
+
+def test_other_symbol_and_config_miss(path):
+    """Ключ записи включает символ ИИ и настройки движка"""
+    game = position([(7, 7), (8, 8)])
+    cache = ResultCache(path)
+    cache.put(game, 'X', CONFIG, (6, 6))
+    assert cache.get(game, 'O', CONFIG) is None
+    assert cache.get(game, 'X', 'other') is None
+    assert cache.stats()['misses'] == 2
+
+
+def test_entry_visible_to_second_instance(path):
+    """Запись одного экземпляра (процесса) видна другому, открывшему тот же файл"""
+    game = position([(7, 7), (8, 8)])
+    ResultCache(path).put(game, 'X', CONFIG, (6, 6))
+    other = ResultCache(path)
+    assert other.get(game, 'X', CONFIG) == (6, 6)
+    assert other.stats()['hits'] == 1
+
+
+def test_expired_entry_is_dropped(path, clock):
+    """Запись старше ttl не выдается и удаляется"""
+    game = position([(7, 7), (8, 8)])
+    cache = ResultCache(path, ttl=60.0)
+    cache.put(game, 'X', CONFIG, (6, 6))
+    clock.now += 30.0
+    assert cache.get(game, 'X', CONFIG) == (6, 6)
+    clock.now += 31.0
+    assert cache.get(game, 'X', CONFIG) is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_evict_keeps_recently_used(path, clock):
+    """Сверх entries вытесняются самые давно использованные записи, а не самые старые"""
+    games = distinct_positions(6)
+    cache = ResultCache(path, entries=3)
+    for game in games:
+        cache.put(game, 'X', CONFIG, (0, 0))
+        clock.now += 1.0
+    clock.now += TOUCH_INTERVAL + 1.0
+    assert cache.get(games[0], 'X', CONFIG) == (0, 0)
+    cache.evict()
+    assert cache.stats()['entries'] == 3
+    kept = [game for game in games if cache.get(game, 'X', CONFIG) is not None]
+    assert kept == [games[0], games[4], games[5]]
+
+
+def test_disabled_cache(path):
+    """Пустой путь отключает кэш: ничего не хранится и не выдается"""
+    game = position([(7, 7), (8, 8)])
+    cache = ResultCache('')
+    cache.put(game, 'X', CONFIG, (6, 6))
+    assert cache.get(game, 'X', CONFIG) is None
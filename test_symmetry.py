@@ -0,0 +1,44 @@
+"""
+Тесты канонизации позиций и партий по 8 симметриям доски
+"""
+
+import random
+
+import pytest
+
+from game_logic import GameLogic
+from symmetry import (SYMMETRY_COUNT, canonical_board, canonical_key, canonical_moves,
+                      inverse_transform, transform)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_symmetric_copies_share_canonical_key(seed, random_walk, symmetric_copy):
+    """У всех 8 копий позиции один канонический ключ, а хэш копии - ее симметричный хэш"""
+    for game in random_walk(GameLogic(), random.Random(seed), 40):
+        key, symmetry = canonical_key(game)
+        for other in range(SYMMETRY_COUNT):
+            copy = symmetric_copy(game, other)
+            assert canonical_key(copy)[0] == key
+            assert game.symmetric_hashes[other] == copy.position_hash
+        assert canonical_board(game)[0] == symmetric_copy(game, symmetry).board
+
+
+def test_transform_round_trip():
+    """inverse_transform возвращает клетку, переведенную transform"""
+    for symmetry in range(SYMMETRY_COUNT):
+        for row in range(15):
+            for col in range(15):
+                assert inverse_transform(*transform(row, col, 15, symmetry), 15, symmetry) == (row, col)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_canonical_moves_round_trip(seed):
+    """Копии партии канонизируются одинаково, а симметрия канонизации возвращает исходные ходы"""
+    rng = random.Random(seed)
+    moves = rng.sample([(row, col) for row in range(15) for col in range(15)], 12)
+    canonical, _ = canonical_moves(moves, 15)
+    for symmetry in range(SYMMETRY_COUNT):
+        mirrored = [transform(row, col, 15, symmetry) for row, col in moves]
+        mirrored_canonical, used = canonical_moves(mirrored, 15)
+        assert mirrored_canonical == canonical
+        assert [inverse_transform(row, col, 15, used) for row, col in mirrored_canonical] == mirrored
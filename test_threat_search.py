@@ -0,0 +1,84 @@
+"""
+Тесты поиска угроз на заданных позициях: победа VCF, ее отсутствие и исчерпание бюджета
+"""
+
+import pytest
+
+from game_logic import GameLogic
+from threat_search import NO_WIN, UNKNOWN, WIN, ThreatSpaceSearch
+
+# Семиходовая VCF за X: каждая четверка вынуждает единственный ответ
+VCF_X = [(4, 6), (5, 4), (7, 4), (7, 7), (8, 5), (9, 4), (9, 5)]
+VCF_O = [(4, 4), (4, 9), (5, 5), (5, 8), (7, 6), (7, 10), (8, 10)]
+
+# Разрозненные фигуры: четверку не поставить никому
+QUIET_X = [(7, 7), (9, 9)]
+QUIET_O = [(8, 8), (6, 9)]
+
+
+def load_stones(x_stones, o_stones):
+    """GameLogic с фигурами на заданных клетках; очередь хода - по числу фигур"""
+    game = GameLogic()
+    board = [['.'] * game.board_size for _ in range(game.board_size)]
+    for player, stones in (('X', x_stones), ('O', o_stones)):
+        for row, col in stones:
+            board[row][col] = player
+    game.board = board
+    game.move_count = len(x_stones) + len(o_stones)
+    game.current_player = 'X' if game.move_count % 2 == 0 else 'O'
+    return game
+
+
+@pytest.fixture
+def vcf_game():
+    return load_stones(VCF_X, VCF_O)
+
+
+def test_vcf_line_plays_out_to_five(vcf_game):
+    """Найденная линия VCF, сыгранная по очереди, заканчивается пятеркой атакующего"""
+    result = ThreatSpaceSearch().solve(vcf_game, 'X')
+    assert result.status == WIN
+    assert len(result.line) == 7
+    for i, (row, col) in enumerate(result.line):
+        vcf_game.push(row, col, 'XO'[i % 2])
+    assert vcf_game.winner == 'X'
+
+
+def test_vcf_replies_are_forced(vcf_game):
+    """Каждый ответ в линии VCF - единственная клетка, закрывающая пятерку"""
+    search = ThreatSpaceSearch()
+    line = search.solve(vcf_game, 'X').line
+    index = vcf_game.geometry.index
+    for i in range(0, len(line) - 1, 2):
+        vcf_game.push(*line[i], 'X')
+        squares = search._five_squares(vcf_game, 'X')
+        if i + 3 < len(line):
+            assert squares == [index(*line[i + 1])]
+        else:
+            # Последняя четверка двойная: закрыть обе пятерки нельзя
+            assert len(squares) >= 2
+        vcf_game.push(*line[i + 1], 'O')
+
+
+def test_solve_restores_position(vcf_game):
+    """После поиска позиция, хэш и оценка прежние"""
+    before = (vcf_game.position_hash, vcf_game.move_count, vcf_game.evaluator.totals.copy())
+    for threes in (False, True):
+        ThreatSpaceSearch().solve(vcf_game, 'X', threes=threes)
+        ThreatSpaceSearch().solve(vcf_game, 'O', threes=threes)
+    assert (vcf_game.position_hash, vcf_game.move_count, vcf_game.evaluator.totals) == before
+
+
+@pytest.mark.parametrize('attacker', ['X', 'O'])
+def test_quiet_position_has_no_win(attacker):
+    """Без четверок в запасе дерево угроз просматривается до конца: NO_WIN"""
+    result = ThreatSpaceSearch().solve(load_stones(QUIET_X, QUIET_O), attacker)
+    assert result.status == NO_WIN
+    assert result.move is None
+
+
+def test_node_budget_exhausted_is_unknown(vcf_game):
+    """Если бюджета узлов не хватило, итог UNKNOWN, а не NO_WIN"""
+    result = ThreatSpaceSearch(node_budget=3).solve(vcf_game, 'X')
+    assert result.status == UNKNOWN
+    assert result.line == []
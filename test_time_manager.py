@@ -0,0 +1,41 @@
+"""
+Тесты сроков хода: предел max_time и доля этапа поиска угроз
+"""
+
+import pytest
+
+from game_logic import GameLogic
+from time_manager import Deadline, TimeManager
+
+
+@pytest.mark.parametrize('max_time', [0.5, 3.0, 8.0])
+@pytest.mark.parametrize('time_used', [0.0, 100.0, 500.0])
+def test_hard_deadline_within_max_time(max_time, time_used):
+    """Жесткий срок хода не больше настроенного max_time"""
+    game = GameLogic()
+    for row, col in ((7, 7), (7, 8), (8, 8), (6, 6), (8, 7), (9, 9)):
+        game.make_move(row, col)
+    deadline = TimeManager(max_time).deadline(game, time_used)
+    assert deadline.soft_at <= deadline.hard_at
+    assert deadline.hard_at - deadline.start <= max_time
+
+
+def test_portion_leaves_time_after_it():
+    """Срок этапа - доля мягкого бюджета от начала хода и не позже жесткого срока"""
+    deadline = Deadline(2.0, 3.0, start=100.0)
+    part = deadline.portion(0.25)
+    assert part.start == 100.0
+    assert part.hard_at == part.soft_at == pytest.approx(100.5)
+    assert deadline.portion(2.0).hard_at == deadline.soft_at
+
+
+def test_full_budget_only_before_game_clock_runs_low():
+    """Срок хода полный, пока его не урезает оставшееся время партии"""
+    game = GameLogic()
+    for row, col in ((7, 7), (7, 8), (8, 8), (6, 6)):
+        game.make_move(row, col)
+    manager = TimeManager(3.0, game_time=180.0)
+    assert manager.full_budget(game, manager.deadline(game, 0.0))
+    assert manager.full_budget(game, manager.deadline(game, 60.0))
+    assert not manager.full_budget(game, manager.deadline(game, 170.0))
+    assert not manager.full_budget(game, Deadline(0.2))
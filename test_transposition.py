@@ -0,0 +1,46 @@
+"""
+Тесты общей таблицы транспозиций при одновременных поисках
+"""
+
+from transposition import EXACT, TranspositionTable
+
+
+def test_overlapping_searches_share_generation():
+    """Поиск, начатый во время другого, не меняет поколение записей"""
+    table = TranspositionTable(1 << 10)
+    first = table.new_search()
+    generation = table.generation
+    second = table.new_search()
+    assert table.generation == generation == first.generation == second.generation
+    first.finish()
+    second.finish()
+    table.new_search().finish()
+    assert table.generation != generation
+
+
+def test_overlapping_searches_keep_own_stats():
+    """Начало второго поиска не сбрасывает счетчики первого"""
+    table = TranspositionTable(1 << 10)
+    first = table.new_search()
+    first.store(1, 4, EXACT, 10)
+    assert first.probe(1) == (4, EXACT, 10, None)
+    second = table.new_search()
+    assert second.probe(2) is None
+    assert first.stats()['hit_rate'] == 1.0 and first.stats()['stores'] == 1
+    assert second.stats()['hit_rate'] == 0.0 and second.stats()['probes'] == 1
+    first.finish()
+    second.finish()
+
+
+def test_deep_entry_of_running_search_is_kept():
+    """Глубокую запись идущего поиска не вытесняет мелкая запись другого поиска"""
+    table = TranspositionTable(1 << 10)
+    deep, shallow, other = 1, 1 + (table.mask + 1), 1 + 2 * (table.mask + 1)
+    first = table.new_search()
+    first.store(deep, 8, EXACT, 1)
+    second = table.new_search()
+    second.store(shallow, 2, EXACT, 2)
+    second.store(other, 3, EXACT, 3)
+    assert first.probe(deep) is not None
+    first.finish()
+    second.finish()
@@ -0,0 +1,257 @@
+import logging
+import time
+
+from evaluator import COUNT_BITS, COUNT_MASK, SEGMENT_SPAN, get_line_reach
+from patterns import FEATURE_BITS, FEATURE_MASK, THREAT
+
+logger = logging.getLogger(__name__)
+
+# Итог поиска угроз
+WIN = 'win'          # форсированная победа найдена, line - выигрывающая линия
+NO_WIN = 'none'      # дерево угроз просмотрено до конца: победы в пределах глубины нет
+UNKNOWN = 'unknown'  # бюджет узлов или времени исчерпан раньше
+
+# Глубина в ходах атакующего: VCF - только четверки, VCT - четверки и тройки
+VCF_DEPTH = 12
+VCT_DEPTH = 4
+
+# Бюджет одного решения
+NODE_BUDGET = 20000
+TIME_LIMIT = 0.5
+TIME_CHECK_NODES = 256
+
+FOUR_SHIFT = 4 * COUNT_BITS
+FIVE_SHIFT = 5 * COUNT_BITS
+
+
+class ThreatBudgetExceeded(Exception):
+    """Бюджет узлов или времени поиска угроз исчерпан"""
+
+
+class ThreatSearchResult:
+    """Итог поиска угроз: статус, выигрывающая линия (ходы по очереди, с атакующего) и статистика"""
+
+    def __init__(self, status, line, attacker, nodes, elapsed):
+        self.status = status
+        self.line = line
+        self.attacker = attacker
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+    @property
+    def move(self):
+        """Первый ход выигрывающей линии или None"""
+        return self.line[0] if self.line else None
+
+
+class ThreatSpaceSearch:
+    """Поиск форсированной победы по пространству угроз (VCF/VCT)
+
+    Атакующий делает только ходы, создающие четверку (VCF) или тройку (VCT);
+    защищающийся отвечает только вынужденными ходами: закрывает пятерку после
+    четверки, а после тройки - клетки, без которых у атакующего не остается хода в
+    открытую четверку, или ставит свою четверку. Ветвление крошечное, поэтому
+    решения на 5-15 полуходов вглубь находятся намного дешевле полного перебора.
+
+    Защита от тройки учитывает только ее линии: ответ где-то еще считается
+    проигрывающим, как обычно в поиске по пространству угроз.
+    """
+
+    def __init__(self, node_budget=NODE_BUDGET, time_limit=TIME_LIMIT, stop_event=None):
+        self.node_budget = node_budget
+        self.time_limit = time_limit
+        self.stop_event = stop_event
+        self.nodes = 0
+
+    def solve(self, game, attacker=None, depth=VCF_DEPTH, threes=False, deadline=None) -> ThreatSearchResult:
+        """Найти форсированную победу attacker (по умолчанию - того, кто ходит)
+
+        Атакующий считается ходящим, даже если по очереди ходит соперник: так
+        проверяются угрозы соперника. Позиция game после поиска возвращается как была.
+        Решение укладывается и в time_limit, и в жесткий срок хода deadline (Deadline).
+        """
+        start_time = time.monotonic()
+        self.attacker = attacker or game.current_player
+        self.defender = 'O' if self.attacker == 'X' else 'X'
+        self.threes = threes
+        self.deadline = start_time + self.time_limit
+        if deadline is not None:
+            self.deadline = min(self.deadline, deadline.hard_at)
+        self.nodes = 0
+        self.reach = get_line_reach(game.geometry, SEGMENT_SPAN)
+        # Позиции, в которых победы нет: хэш -> глубина, на которой это проверено
+        self._failed = {}
+
+        try:
+            line = self._attack(game, depth)
+            status = WIN if line is not None else NO_WIN
+        except ThreatBudgetExceeded:
+            line, status = None, UNKNOWN
+
+        elapsed = time.monotonic() - start_time
+        coords = game.geometry.coords
+        result = ThreatSearchResult(status, [coords(idx) for idx in line or ()], self.attacker,
+                                    self.nodes, elapsed)
+        kind = 'VCT' if threes else 'VCF'
+        if status == WIN:
+            logger.info(f"⚔️ {kind} для {self.attacker}: победа {result.line} "
+                        f"({self.nodes} узлов за {elapsed:.3f}с)")
+        else:
+            logger.debug(f"⚔️ {kind} для {self.attacker}: {status} ({self.nodes} узлов за {elapsed:.3f}с)")
+        return result
+
+    def _count_node(self):
+        self.nodes += 1
+        if self.nodes > self.node_budget:
+            raise ThreatBudgetExceeded()
+        if self.nodes % TIME_CHECK_NODES == 0 and (
+                time.monotonic() > self.deadline or (self.stop_event is not None and self.stop_event.is_set())):
+            raise ThreatBudgetExceeded()
+
+    def _attack(self, game, depth):
+        """Ход атакующего: выигрывающая линия или None"""
+        self._count_node()
+        evaluator = game.evaluator
+        attacker, defender = self.attacker, self.defender
+        # Четверка уже стоит - пятерка этим ходом
+        if evaluator.segment_count(attacker, 4):
+            return [self._five_squares(game, attacker)[0]]
+        if depth == 0:
+            return None
+
+        key = game.position_hash
+        if self._failed.get(key, -1) >= depth:
+            return None
+        if evaluator.segment_count(defender, 4):
+            # Четверку соперника надо закрыть; инициатива сохраняется, только если
+            # закрывающий ход сам ставит четверку
+            squares = self._five_squares(game, defender)
+            if len(squares) != 1 or not self._count_field(game, squares[0], attacker, FOUR_SHIFT):
+                return None
+            candidates = squares
+        else:
+            candidates = self._attacks(game, depth)
+
+        coords = game.geometry.coords
+        for idx in candidates:
+            row, col = coords(idx)
+            game.push(row, col, attacker)
+            try:
+                line = self._defend(game, idx, depth - 1)
+            finally:
+                game.pop()
+            if line is not None:
+                return [idx] + line
+
+        self._failed[key] = depth
+        return None
+
+    def _defend(self, game, last, depth):
+        """Ответ защищающегося на угрозу хода last: линия, выигрывающая при любом ответе, или None"""
+        self._count_node()
+        attacker, defender = self.attacker, self.defender
+        # У защищающегося своя четверка - он ставит пятерку первым
+        if game.evaluator.segment_count(defender, 4):
+            return None
+
+        squares = self._five_squares(game, attacker)
+        if len(squares) >= 2:
+            # Открытая или двойная четверка: обе пятерки не закрыть
+            return squares[:2]
+        if squares:
+            replies = squares
+        elif self.threes:
+            replies = self._three_defenses(game, last)
+            if replies is None:
+                return None
+        else:
+            return None
+
+        coords = game.geometry.coords
+        line = None
+        for idx in replies:
+            row, col = coords(idx)
+            game.push(row, col, defender)
+            try:
+                reply_line = self._attack(game, depth)
+            finally:
+                game.pop()
+            if reply_line is None:
+                return None
+            if line is None:
+                line = [idx] + reply_line
+        return line
+
+    def _attacks(self, game, depth):
+        """Ходы атакующего: сначала четверки, затем (для VCT) тройки, каждые по приросту оценки"""
+        attacker = self.attacker
+        evaluator = game.evaluator
+        candidates = self._candidate_cells(game)
+        fours = [idx for idx in candidates if self._count_field(game, idx, attacker, FOUR_SHIFT)]
+        fours.sort(key=lambda idx: evaluator.gain(idx, attacker), reverse=True)
+        # Тройке нужно еще два хода атакующего: открытая четверка и пятерка
+        if not self.threes or depth < 2:
+            return fours
+
+        four_set = set(fours)
+        others = [idx for idx in candidates if idx not in four_set]
+        features = evaluator.window_sums('threat_features', attacker, others)
+        threes = [idx for idx, packed in zip(others, features)
+                  if (packed >> (THREAT * FEATURE_BITS)) & FEATURE_MASK]
+        threes.sort(key=lambda idx: evaluator.gain(idx, attacker), reverse=True)
+        return fours + threes
+
+    def _three_defenses(self, game, last):
+        """Ответы на тройку хода last или None, если тройка ничем не грозит
+
+        Тройка грозит, если в ее линиях есть клетка, дающая атакующему открытую или
+        двойную четверку. Ответы - клетки этих линий, после которых таких клеток не
+        остается, и ходы защищающегося, ставящие свою четверку.
+        """
+        attacker, defender = self.attacker, self.defender
+        cells = game.cells
+        zone = [idx for idx in self.reach[last] if cells[idx] == '.']
+        if not self._open_four_cells(game, zone):
+            return None
+
+        coords = game.geometry.coords
+        replies = []
+        for idx in zone:
+            row, col = coords(idx)
+            game.push(row, col, defender)
+            try:
+                if not self._open_four_cells(game, zone):
+                    replies.append(idx)
+            finally:
+                game.pop()
+        zone_replies = set(replies)
+        replies.extend(idx for idx in self._candidate_cells(game)
+                       if idx not in zone_replies and self._count_field(game, idx, defender, FOUR_SHIFT))
+        return replies
+
+    def _open_four_cells(self, game, zone):
+        """Пустые клетки zone, ход в которые дает атакующему две четверки сразу"""
+        cells = game.cells
+        return [idx for idx in zone
+                if cells[idx] == '.' and self._count_field(game, idx, self.attacker, FOUR_SHIFT) >= 2]
+
+    def _five_squares(self, game, player):
+        """Клетки, ход в которые ставит пятерку player"""
+        return [idx for idx in game.frontier if self._count_field(game, idx, player, FIVE_SHIFT)]
+
+    @staticmethod
+    def _count_field(game, idx, player, shift):
+        """Число отрезков через idx, которые ход player делает четверками/пятерками"""
+        return (game.evaluator.move_counts(idx, player) >> shift) & COUNT_MASK
+
+    @staticmethod
+    def _candidate_cells(game):
+        """Пустые клетки на расстоянии до двух от фигур: четверка или тройка дальше не строится"""
+        cells = game.cells
+        neighbors = game.geometry.neighbor_indices
+        candidates = set(game.frontier)
+        for idx in game.frontier:
+            for n in neighbors[idx]:
+                if cells[n] == '.':
+                    candidates.add(n)
+        return sorted(candidates)
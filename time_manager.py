@@ -0,0 +1,106 @@
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Жесткий предел одного хода: с большим запасом меньше timeout gunicorn (30 с)
+HARD_LIMIT = float(os.environ.get('GOMOKU_HARD_LIMIT', 10.0))
+# Во сколько раз жесткий срок хода больше мягкого (но не больше max_time)
+HARD_FACTOR = 2.0
+# Время ИИ на всю партию; оставшееся делится на ожидаемое число его ходов
+GAME_TIME = float(os.environ.get('GOMOKU_AI_GAME_TIME', 180.0))
+# Обычная длина партии в ходах и наименьшее число оставшихся ходов ИИ для деления времени
+EXPECTED_GAME_LENGTH = 60
+MIN_MOVES_LEFT = 10
+# Спокойная позиция получает CALM_SHARE бюджета, острая (SHARP_SEGMENTS отрезков с
+# тройками и четверками) - весь бюджет
+CALM_SHARE = 0.5
+SHARP_SEGMENTS = 6
+# Меньше этого ход не получает, даже если время партии кончилось
+MIN_MOVE_TIME = 0.2
+# Погрешность сравнения сроков в full_budget (секунды)
+BUDGET_TOLERANCE = 1e-6
+
+
+class Deadline:
+    """Срок хода по монотонным часам
+
+    Мягкий срок - не начинать новую работу (следующую итерацию углубления, новый
+    этап выбора хода), жесткий - прервать текущую и вернуть лучший ход на сейчас.
+    time.monotonic() общий для всех процессов машины, поэтому срок можно
+    передавать в процессы пула.
+    """
+
+    def __init__(self, soft, hard=None, start=None):
+        self.start = time.monotonic() if start is None else start
+        self.soft_at = self.start + soft
+        self.hard_at = self.start + (soft if hard is None else hard)
+
+    def elapsed(self):
+        return time.monotonic() - self.start
+
+    def remaining(self):
+        """Секунд до жесткого срока"""
+        return self.hard_at - time.monotonic()
+
+    def soft_expired(self):
+        return time.monotonic() > self.soft_at
+
+    def expired(self):
+        return time.monotonic() > self.hard_at
+
+    def portion(self, share):
+        """Срок для этапа хода: share мягкого бюджета от начала хода, не позже жесткого срока"""
+        deadline = Deadline(0, start=self.start)
+        deadline.soft_at = min(self.soft_at, self.start + share * (self.soft_at - self.start))
+        deadline.hard_at = min(self.hard_at, deadline.soft_at)
+        return deadline
+
+    def reserve(self, seconds):
+        """Тот же срок, раньше на seconds (запас на передачу результата)"""
+        deadline = Deadline(0, start=self.start)
+        deadline.soft_at = self.soft_at - seconds
+        deadline.hard_at = self.hard_at - seconds
+        return deadline
+
+    def __repr__(self):
+        return f"Deadline(soft={self.soft_at - self.start:.2f}s, hard={self.hard_at - self.start:.2f}s)"
+
+
+class TimeManager:
+    """Бюджет хода ИИ: из оставшегося времени партии и остроты позиции
+
+    max_time - предел хода: жесткий срок никогда не больше него (и HARD_LIMIT).
+    """
+
+    def __init__(self, max_time, game_time=GAME_TIME, hard_limit=HARD_LIMIT):
+        self.max_time = max_time
+        self.game_time = game_time
+        self.hard_limit = hard_limit
+
+    def deadline(self, game, time_used=0.0) -> Deadline:
+        """Срок для хода в позиции game, если ИИ уже потратил в партии time_used секунд"""
+        moves_left = max(MIN_MOVES_LEFT, (EXPECTED_GAME_LENGTH - game.move_count) // 2)
+        budget = min(self.max_time, max(0.0, self.game_time - time_used) / moves_left)
+        budget = max(MIN_MOVE_TIME, budget * self.sharpness(game))
+        hard = min(budget * HARD_FACTOR, self.max_time, self.hard_limit)
+        return Deadline(min(budget, hard), hard)
+
+    def full_budget(self, game, deadline):
+        """Не урезан ли срок deadline временем партии: он не короче срока хода game в начале партии
+
+        Ход с полным бюджетом зависит только от позиции и настроек, поэтому годится
+        для кэша результатов.
+        """
+        full = self.deadline(game)
+        return (deadline.soft_at - deadline.start >= full.soft_at - full.start - BUDGET_TOLERANCE and
+                deadline.hard_at - deadline.start >= full.hard_at - full.start - BUDGET_TOLERANCE)
+
+    @staticmethod
+    def sharpness(game):
+        """Доля бюджета от CALM_SHARE до 1 по числу отрезков с тройками и четверками"""
+        evaluator = game.evaluator
+        segments = sum(evaluator.segment_count(player, 3) + 2 * evaluator.segment_count(player, 4)
+                       for player in ('X', 'O'))
+        return CALM_SHARE + (1 - CALM_SHARE) * min(1.0, segments / SHARP_SEGMENTS)
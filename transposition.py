@@ -0,0 +1,186 @@
+import logging
+import os
+import threading
+from array import array
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Число записей общей таблицы по умолчанию (степень двойки); ~16 байт на запись
+DEFAULT_TABLE_ENTRIES = int(os.environ.get('GOMOKU_TT_ENTRIES', 1 << 18))
+
+# Тип оценки в записи
+EXACT, LOWER, UPPER = 1, 2, 3
+
+# Упаковка записи в 64 бита (от младших к старшим):
+# оценка + SCORE_OFFSET (32 бита), глубина (8), тип оценки (2, никогда не 0 - признак
+# занятой записи), поколение поиска (6), ход + 1 (16, 0 - хода нет)
+SCORE_OFFSET = 1 << 31
+DEPTH_SHIFT = 32
+FLAG_SHIFT = 40
+GENERATION_SHIFT = 42
+MOVE_SHIFT = 48
+GENERATIONS = 1 << 6
+
+
+class TranspositionTable:
+    """Таблица транспозиций фиксированного размера с корзинами по две записи
+
+    Запись в корзине 0 заменяется только более глубокой оценкой (или записью
+    предыдущего поиска), запись в корзине 1 - всегда. Память выделяется один раз
+    и не растет в длинных партиях.
+
+    Ключ хранится как key ^ data: запись, разорванная параллельным сохранением из
+    другого потока, просто не пройдет проверку ключа при чтении.
+
+    Таблицу делят поиски из разных потоков (ход ИИ, обдумывание, задания), поэтому
+    поиск работает через свой TableSearch из new_search(): счетчики у каждого
+    поиска свои, а поколение меняется, только когда других поисков нет, - один
+    поиск не старит записи другого посреди работы.
+    """
+
+    def __init__(self, entries=DEFAULT_TABLE_ENTRIES):
+        buckets = 1
+        while buckets * 2 < entries:
+            buckets *= 2
+        self.size = buckets * 2
+        self.mask = buckets - 1
+        self.keys = array('Q', bytes(8 * self.size))
+        self.data = array('Q', bytes(8 * self.size))
+        self.generation = 0
+        self.active_searches = 0
+        self._lock = threading.Lock()
+        self.reset_stats()
+        self.filled = 0
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def new_search(self):
+        """Начать поиск: записи прошлых поисков можно вытеснять из корзины 0
+
+        Возвращает TableSearch; по окончании поиска вызывается его finish().
+        """
+        with self._lock:
+            if not self.active_searches:
+                self.generation = (self.generation + 1) % GENERATIONS
+            self.active_searches += 1
+            return TableSearch(self, self.generation)
+
+    def _finish_search(self):
+        with self._lock:
+            self.active_searches -= 1
+
+    def clear(self):
+        """Очистить таблицу, не перевыделяя память"""
+        for i in range(self.size):
+            self.keys[i] = 0
+            self.data[i] = 0
+        self.filled = 0
+        self.reset_stats()
+
+    def probe(self, key, counters=None):
+        """Запись позиции key: (глубина, тип, оценка, ход или None) либо None
+
+        Попадания считаются в counters (по умолчанию - в самой таблице).
+        """
+        counters = counters or self
+        counters.probes += 1
+        slot = (key & self.mask) * 2
+        for i in (slot, slot + 1):
+            data = self.data[i]
+            if data and self.keys[i] ^ data == key:
+                counters.hits += 1
+                move = data >> MOVE_SHIFT
+                return ((data >> DEPTH_SHIFT) & 0xFF,
+                        (data >> FLAG_SHIFT) & 0b11,
+                        (data & 0xFFFFFFFF) - SCORE_OFFSET,
+                        move - 1 if move else None)
+        return None
+
+    def store(self, key, depth, flag, score, move=None, counters=None, generation=None):
+        """Сохранить оценку позиции key, найденную поиском на глубину depth"""
+        counters = counters or self
+        if generation is None:
+            generation = self.generation
+        counters.stores += 1
+        data = ((score + SCORE_OFFSET)
+                | depth << DEPTH_SHIFT
+                | flag << FLAG_SHIFT
+                | generation << GENERATION_SHIFT
+                | (0 if move is None else move + 1) << MOVE_SHIFT)
+
+        slot = (key & self.mask) * 2
+        old = self.data[slot]
+        old_key = self.keys[slot] ^ old
+        # Корзина 0: та же позиция, пустая запись, запись прошлого поиска или не глубже новой
+        if (not old or old_key == key
+                or (old >> GENERATION_SHIFT) & (GENERATIONS - 1) != generation
+                or (old >> DEPTH_SHIFT) & 0xFF <= depth):
+            self._write(slot, key, data, old, old_key, counters)
+        else:
+            # Корзина 1: заменяется всегда
+            old = self.data[slot + 1]
+            self._write(slot + 1, key, data, old, self.keys[slot + 1] ^ old, counters)
+
+    def _write(self, i, key, data, old, old_key, counters):
+        if not old:
+            self.filled += 1
+        elif old_key != key:
+            # Вытеснена запись другой позиции; ложных совпадений при чтении не бывает -
+            # их отсекает проверка key ^ data в probe()
+            counters.replacements += 1
+        self.keys[i] = key ^ data
+        self.data[i] = data
+
+    def stats(self):
+        """Доля попаданий, доля вытеснений чужих записей и заполненность"""
+        return table_stats(self, self)
+
+
+def table_stats(table, counters):
+    """Статистика таблицы table по счетчикам counters (таблицы или одного поиска)"""
+    return {
+        'hit_rate': counters.hits / counters.probes if counters.probes else 0.0,
+        'eviction_rate': counters.replacements / counters.stores if counters.stores else 0.0,
+        'fill': table.filled / table.size,
+        'probes': counters.probes,
+        'stores': counters.stores,
+    }
+
+
+class TableSearch:
+    """Один поиск в общей таблице: свое поколение записей и свои счетчики"""
+
+    def __init__(self, table, generation):
+        self.table = table
+        self.generation = generation
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def probe(self, key):
+        return self.table.probe(key, self)
+
+    def store(self, key, depth, flag, score, move=None):
+        self.table.store(key, depth, flag, score, move, self, self.generation)
+
+    def finish(self):
+        """Поиск окончен: поколение таблицы снова можно менять"""
+        self.table._finish_search()
+
+    def stats(self):
+        """Попадания и вытеснения этого поиска, заполненность всей таблицы"""
+        return table_stats(self.table, self)
+
+
+@lru_cache(maxsize=None)
+def get_transposition_table():
+    """Общая таблица процесса: позиции разных партий различаются хэшем"""
+    table = TranspositionTable()
+    logger.info(f"🗃️ Таблица транспозиций: {table.size} записей")
+    return table